@@ -0,0 +1,87 @@
+# bench/bench_decoder.py
+# Micro-benchmark: per-code decode cost, registry vs. de oorspronkelijke if-keten
+# (ongecachet), plus de kosten van een cache-hit via decoder.decode, en
+# decoder.decode_many tegen een decode-lus over unieke payloads.
+#
+# Gebruik (vanuit de repo-root):
+#     python -m bench.bench_decoder [--number 20000] [--batch 200000]
+import argparse
+import random
+import timeit
+
+from bench import legacy_decoder
+from mitm import decoder
+
+# Representatieve payloads per code (RF-vorm, zonder checksum)
+SAMPLES = {
+    "1081": "1B5801F401",
+    "10A0": "177000003C",
+    "10A1": "1B58113001F400C8",
+    "10E0": "31303135432A",
+    "10E1": "01020304AABBCCDDEE",
+    "1260": "157C17701388",
+    "1280": "4B03E80190FF",
+    "1290": "02E4",
+    "12C0": "2801FF",
+    "22D9": "1770",
+    "22DB": "17700190",
+    "30D0": "C811",
+    "3110": "01C8000F",
+    "3114": "0164000F",
+    "3120": "0301",
+    "3200": "1D4C1770",
+    "3E70": "C8000600000000A5",
+    "1F09": "FF0546",  # unknown to both decoders
+}
+
+
+def _bench(fn, code, payload, number):
+    best = min(timeit.repeat(lambda: fn(code, payload), number=number, repeat=5))
+    return best / number * 1e9
+
+
+def _batch_items(n):
+    # Unieke payloads (zoals bij herverwerken van opnames), lengte per code
+    # gelijk aan het sample zodat de gewone layout geraakt wordt.
+    rnd = random.Random(1)
+    codes = [c for c in SAMPLES if decoder.layouts(c) is not None]
+    items = []
+    for i in range(n):
+        code = codes[i % len(codes)]
+        size = len(SAMPLES[code]) // 2
+        items.append((code, rnd.getrandbits(8 * size).to_bytes(size, "big").hex().upper()))
+    return items
+
+
+def _bench_batch(n):
+    items = _batch_items(n)
+    loop = min(timeit.repeat(lambda: [decoder.decode(c, p) for c, p in items], number=1, repeat=3))
+    batch = min(timeit.repeat(lambda: decoder.decode_many(items), number=1, repeat=3))
+    print(f"\n{n} unique payloads: decode loop {loop * 1e3:.0f} ms, "
+          f"decode_many {batch * 1e3:.0f} ms ({loop / batch:.1f}x)")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="decoder micro-benchmark")
+    ap.add_argument("--number", type=int, default=20000)
+    ap.add_argument("--batch", type=int, default=200000, help="payloads for the decode_many comparison (0 = skip)")
+    args = ap.parse_args()
+
+    print(f"{'code':<6}{'legacy ns':>12}{'registry ns':>14}{'speedup':>10}{'cached ns':>12}")
+    total_old = total_new = total_cached = 0.0
+    for code, payload in SAMPLES.items():
+        assert decoder.decode(code, payload) == legacy_decoder.decode(code, payload), code
+        old = _bench(legacy_decoder.decode, code, payload, args.number)
+        new = _bench(decoder._decode, code, payload, args.number)
+        cached = _bench(decoder.decode, code, payload, args.number)
+        total_cached += cached
+        total_old += old
+        total_new += new
+        print(f"{code:<6}{old:>12.0f}{new:>14.0f}{old / new:>9.2f}x{cached:>12.0f}")
+    print(f"{'total':<6}{total_old:>12.0f}{total_new:>14.0f}{total_old / total_new:>9.2f}x{total_cached:>12.0f}")
+    if args.batch:
+        _bench_batch(args.batch)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# bench/bench_frame.py
+# Benchmark: frame-parsing, regex + str.split (v1.0.0) vs. ramses.parse_frame.
+#
+# Meet frames/sec voor het observe-pad (parse + code/payload) en het
+# limiter-pad (1F09 uitlezen + herschrijven), plus allocaties per frame.
+#
+# Gebruik (vanuit de repo-root):
+#     python -m bench.bench_frame [--frames 50000]
+import argparse
+import time
+import tracemalloc
+
+from bench import legacy_frame
+from mitm.ramses import parse_frame
+
+LINES = [
+    b"095 RQ --- 18:262143 10:061315 --:------ 3220 005 00C0000300",
+    b"045  I --- 10:061315 --:------ 10:061315 3E70 008 C8000600000000A5",
+    b"052  I --- 10:061315 --:------ 10:061315 3200 004 1D4C1770",
+    b"061  I --- 01:145038 --:------ 01:145038 1F09 003 FF01C2",
+    b"058 RP --- 10:061315 01:145038 --:------ 22D9 002 1770",
+]
+
+
+def _legacy_observe(raw):
+    text = raw.decode(errors="ignore").strip()
+    parsed = legacy_frame._parse_frame(text)
+    return parsed["code"], parsed["payload"]
+
+
+def _observe(raw):
+    frame = parse_frame(raw)
+    return frame.code, frame.payload
+
+
+def _legacy_limiter(raw):
+    frame = legacy_frame.RamsesFrame(raw)
+    if frame.is_ch_setpoint():
+        return frame.with_new_ch(frame.get_ch_value() - 1)
+    return frame
+
+
+def _limiter(raw):
+    frame = parse_frame(raw)
+    if frame.is_ch_setpoint():
+        return frame.with_new_ch(frame.get_ch_value() - 1)
+    return frame
+
+
+def _rate(fn, lines):
+    t0 = time.perf_counter()
+    for raw in lines:
+        fn(raw)
+    return len(lines) / (time.perf_counter() - t0)
+
+
+def _allocs(fn, lines):
+    # aantal nog levende allocaties per frame als de resultaten bewaard blijven
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = [fn(raw) for raw in lines]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    blocks = sum(s.count_diff for s in stats)
+    size = sum(s.size_diff for s in stats)
+    del kept
+    return blocks / len(lines), size / len(lines)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="frame parser benchmark")
+    ap.add_argument("--frames", type=int, default=50000)
+    args = ap.parse_args()
+    lines = [LINES[i % len(LINES)] for i in range(args.frames)]
+
+    print(f"{'path':<10}{'impl':<8}{'frames/s':>12}{'blocks/frame':>14}{'bytes/frame':>13}")
+    for name, old, new in (("observe", _legacy_observe, _observe), ("limiter", _legacy_limiter, _limiter)):
+        for impl, fn in (("legacy", old), ("new", new)):
+            rate = max(_rate(fn, lines) for _ in range(3))
+            blocks, size = _allocs(fn, lines)
+            print(f"{name:<10}{impl:<8}{rate:>12.0f}{blocks:>14.1f}{size:>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
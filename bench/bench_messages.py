@@ -0,0 +1,81 @@
+# bench/bench_messages.py
+# Geheugen en opmaaktijd: Message-klassen (decoder.decode) tegen de
+# oorspronkelijke dicts (legacy_decoder, zoals voorheen in een
+# MappingProxyType in cache en state bewaard).
+#
+# Geheugen wordt met tracemalloc gemeten over N bewaarde resultaten van
+# unieke payloads; opmaak is sinks._format_decoded zonder summary-cache.
+#
+# Gebruik (vanuit de repo-root):
+#     python -m bench.bench_messages [--count 100000]
+import argparse
+import gc
+import timeit
+import tracemalloc
+from collections import defaultdict
+from types import MappingProxyType
+
+from bench import legacy_decoder
+from bench.bench_decoder import _batch_items
+from mitm import decoder, sinks
+
+
+def _retained(build, items):
+    """(bytes allocated per retained result, per-code bytes) for ``build`` over ``items``."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        base = tracemalloc.take_snapshot()
+        kept = [build(c, p) for c, p in items]
+        snap = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    total = sum(stat.size_diff for stat in snap.compare_to(base, "filename"))
+    # lijst zelf niet meetellen
+    total -= kept.__sizeof__()
+    del kept
+    return total / len(items)
+
+
+def _per_code(items, count):
+    by_code = defaultdict(list)
+    for c, p in items:
+        by_code[c].append((c, p))
+    rows = []
+    for code, group in sorted(by_code.items()):
+        group = group[:count]
+        old = _retained(lambda c, p: MappingProxyType(legacy_decoder.decode(c, p)), group)
+        new = _retained(decoder._decode, group)
+        rows.append((code, old, new))
+    return rows
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Message class memory/format benchmark")
+    ap.add_argument("--count", type=int, default=100000, help="unique payloads to decode and retain")
+    args = ap.parse_args()
+
+    items = _batch_items(args.count)
+
+    old = _retained(lambda c, p: MappingProxyType(legacy_decoder.decode(c, p)), items)
+    new = _retained(decoder._decode, items)
+    print(f"retained per message: dict {old:.0f} B, Message {new:.0f} B ({old / new:.1f}x less)")
+
+    print(f"\n{'code':<6}{'dict B':>10}{'Message B':>12}")
+    for code, o, n in _per_code(items, 2000):
+        print(f"{code:<6}{o:>10.0f}{n:>12.0f}")
+
+    dicts = [legacy_decoder.decode(c, p) for c, p in items]
+    messages = [decoder._decode(c, p) for c, p in items]
+    t_dict = min(timeit.repeat(lambda: [sinks._format_mapping(d) for d in dicts], number=1, repeat=3))
+    t_msg = min(timeit.repeat(lambda: [sinks._format_decoded(m) for m in messages], number=1, repeat=3))
+    n = len(items)
+    print(f"\nsummary format: dict {t_dict / n * 1e9:.0f} ns, Message {t_msg / n * 1e9:.0f} ns ({t_dict / t_msg:.1f}x)")
+
+    t_old = min(timeit.repeat(lambda: [legacy_decoder.decode(c, p) for c, p in items], number=1, repeat=3))
+    t_new = min(timeit.repeat(lambda: [decoder._decode(c, p) for c, p in items], number=1, repeat=3))
+    print(f"decode (uncached): dict {t_old / n * 1e9:.0f} ns, Message {t_new / n * 1e9:.0f} ns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# bench/legacy_frame.py
+# Bevroren kopie van de oorspronkelijke regex-parser (main._parse_frame) en
+# RamsesFrame (v1.0.0), uitsluitend als referentie voor bench_frame.py.
+import re
+
+# Voorbeeld frame:
+# 095 RQ --- 18:262143 10:061315 --:------ 3220 005 00C0000300
+_FRAME_RE = re.compile(
+    r"^\s*(?P<rssi>\d+)\s+(?P<verb>RQ|RP|I)\s+---\s+"
+    r"(?P<src>\d{2}:\d{6})\s+"
+    r"(?P<dst>\d{2}:\d{6}|--:------)\s+"
+    r"(?P<via>--:------|\d{2}:\d{6})\s+"
+    r"(?P<code>[0-9A-F]{4})\s+"
+    r"(?P<len>[0-9A-F]{3})\s+"
+    r"(?P<payload>[0-9A-F]+)\s*$",
+    re.IGNORECASE,
+)
+
+
+def _parse_frame(text: str):
+    m = _FRAME_RE.match(text.strip())
+    if not m:
+        return None
+    return {
+        "rssi": int(m.group("rssi")),
+        "verb": m.group("verb").upper(),
+        "src": m.group("src"),
+        "dst": m.group("dst"),
+        "via": m.group("via"),
+        "code": m.group("code").upper(),
+        "payload": m.group("payload").upper(),
+        "raw": text.strip(),
+    }
+
+
+
+class RamsesFrame:
+    def __init__(self, raw: bytes):
+        self.raw = raw
+        self.text = raw.decode(errors="ignore").strip()
+
+        parts = self.text.split()
+        self.code = parts[6] if len(parts) > 6 else None
+        self.payload = parts[8] if len(parts) > 8 else ""
+
+    def is_ch_setpoint(self):
+        return " 1F09 " in self.text
+
+    def _payload_bytes(self):
+        # split: "... 1F09 003 FF0546"
+        parts = self.text.split()
+        try:
+            payload_hex = parts[-1]
+            return bytes.fromhex(payload_hex)
+        except Exception:
+            return None
+
+    def get_ch_value(self):
+        payload = self._payload_bytes()
+        if not payload or len(payload) < 2:
+            return None
+
+        # last two bytes = CH setpoint (big endian, /10 °C)
+        raw = (payload[-2] << 8) | payload[-1]
+        return raw / 10.0
+
+    def with_new_ch(self, value_c):
+        payload = self._payload_bytes()
+        if not payload or len(payload) < 2:
+            return self
+
+        raw = int(value_c * 10)
+        new_payload = payload[:-2] + bytes([(raw >> 8) & 0xFF, raw & 0xFF])
+
+        parts = self.text.split()
+        parts[-1] = new_payload.hex().upper()
+        new_text = " ".join(parts)
+
+        return RamsesFrame((new_text + "\r\n").encode())
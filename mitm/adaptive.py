@@ -1,32 +1,188 @@
+import time
+from bisect import bisect_right
+from math import isfinite
+
+
 def interpolate(x, x0, y0, x1, y1):
     if x1 == x0:
         return y0
     return y0 + (x - x0) * (y1 - y0) / (x1 - x0)
 
+
+class Curve:
+    """
+    Stooklijn compiled at load time: sorted breakpoints as float tuples,
+    lookup by bisect. With ``lut`` the whole range is precomputed per
+    ``LUT_STEP`` °C and a lookup is one index operation (input rounded
+    to 0.1 °C).
+
+    Below the first / above the last breakpoint the end values are
+    returned as-is; in between the result is clamped to ``[lo, hi]``.
+    NaN and infinite input give None (caller falls back to the fixed max).
+    """
+
+    LUT_STEP = 0.1
+
+    __slots__ = ("xs", "ys", "slopes", "lo", "hi", "_lut", "_lut_scale")
+
+    def __init__(self, points, lo, hi, lut=False):
+        points = sorted(points, key=lambda p: p["outdoor"])
+        if not points:
+            raise ValueError("adaptive curve needs at least one point")
+        self.xs = tuple(float(p["outdoor"]) for p in points)
+        self.ys = tuple(float(p["ch_max"]) for p in points)
+        self.slopes = tuple(
+            0.0 if x1 == x0 else (y1 - y0) / (x1 - x0)
+            for x0, y0, x1, y1 in zip(self.xs, self.ys, self.xs[1:], self.ys[1:])
+        )
+        self.lo = lo
+        self.hi = hi
+        self._lut = None
+        self._lut_scale = 1.0 / self.LUT_STEP
+        if lut:
+            first = self.xs[0]
+            steps = round((self.xs[-1] - first) * self._lut_scale)
+            self._lut = tuple(self._bisect(first + i * self.LUT_STEP) for i in range(steps + 1))
+
+    def __call__(self, t):
+        # NaN faalt elke vergelijking en zou voorbij het eind indexeren
+        if not isfinite(t):
+            return None
+        xs = self.xs
+        if t <= xs[0]:
+            return self.ys[0]
+        if t >= xs[-1]:
+            return self.ys[-1]
+        if self._lut is not None:
+            return self._lut[round((t - xs[0]) * self._lut_scale)]
+        return self._bisect(t)
+
+    def _bisect(self, t):
+        xs = self.xs
+        if t <= xs[0]:
+            return self.ys[0]
+        if t >= xs[-1]:
+            return self.ys[-1]
+        i = bisect_right(xs, t) - 1
+        value = self.ys[i] + (t - xs[i]) * self.slopes[i]
+        return max(self.lo, min(self.hi, value))
+
+    def many(self, temps):
+        """
+        Curve values for a sequence of outdoor temperatures (None stays None).
+        A numpy array gives a numpy array; numpy is only imported then
+        (optional, requirements-analysis.txt), lists work without it.
+        """
+        if hasattr(temps, "dtype"):
+            # numpy-array (simulaties): np.interp doet hetzelfde als _bisect;
+            # wie een array meegeeft heeft numpy al, de MITM zelf niet
+            import numpy as np
+
+            xs = np.asarray(self.xs)
+            values = np.clip(np.interp(temps, xs, self.ys), self.lo, self.hi)
+            values = np.where(temps <= xs[0], self.ys[0], values)
+            return np.where(temps >= xs[-1], self.ys[-1], values)
+        return [None if t is None else self(t) for t in temps]
+
+
+def _minutes(hhmm):
+    h, m = str(hhmm).split(":")
+    return int(h) * 60 + int(m)
+
+
 class AdaptiveCHMax:
-    def __init__(self, cfg):
+    """
+    Weather-compensated CH maximum. ``curve`` is the default curve;
+    ``curves`` adds named curves, chosen with ``select(name)`` or by the
+    ``schedule`` (first matching time-of-day window / month list wins,
+    re-evaluated once per minute).
+    """
+
+    DEFAULT = "default"
+
+    def __init__(self, cfg, clock=time.time):
         self.enabled = cfg.adaptive_enabled
-        self.curve = sorted(cfg.adaptive_curve, key=lambda p: p["outdoor"])
         self.min = cfg.adaptive_min
         self.max = cfg.adaptive_max
+        self.clock = clock
+
+        named = dict(cfg.adaptive_curves)
+        if cfg.adaptive_curve:
+            named.setdefault(self.DEFAULT, cfg.adaptive_curve)
+        self.curves = {name: Curve(points, self.min, self.max, cfg.adaptive_lut) for name, points in named.items() if points}
+
+        self.schedule = []
+        for entry in cfg.adaptive_schedule:
+            if entry["curve"] not in self.curves:
+                raise ValueError(f"adaptive schedule refers to unknown curve {entry['curve']!r}")
+            window = None
+            if "from" in entry:
+                window = (_minutes(entry["from"]), _minutes(entry["to"]))
+            months = frozenset(entry.get("months", ()))
+            self.schedule.append((entry["curve"], window, months))
+
+        default = cfg.adaptive_active or self.DEFAULT
+        if default not in self.curves and self.curves:
+            default = next(iter(self.curves))
+        self.default = default
+        self.active = default
+        self._curve = self.curves.get(default)
+        self._manual = False
+        self._next_check = 0.0
+
+    @property
+    def curve(self):
+        return self._curve
+
+    def select(self, name):
+        """Switch to a named curve (overrides the schedule); None returns to the schedule."""
+        if name is None:
+            self._manual = False
+            self._next_check = 0.0
+            return
+        curve = self.curves[name]
+        self._manual = True
+        self._curve = curve
+        self.active = name
+
+    def _scheduled(self, now):
+        lt = time.localtime(now)
+        minute = lt.tm_hour * 60 + lt.tm_min
+        for name, window, months in self.schedule:
+            if months and lt.tm_mon not in months:
+                continue
+            if window is not None:
+                start, end = window
+                inside = start <= minute < end if start <= end else (minute >= start or minute < end)
+                if not inside:
+                    continue
+            return name
+        return self.default
+
+    def _refresh(self):
+        now = self.clock()
+        if now >= self._next_check:
+            self._next_check = now - now % 60 + 60
+            name = self._scheduled(now)
+            if name != self.active:
+                self.active = name
+                self._curve = self.curves[name]
 
     def compute(self, outdoor_temp):
         if not self.enabled or outdoor_temp is None:
             return None
+        if self.schedule and not self._manual:
+            self._refresh()
+        curve = self._curve
+        if curve is None:
+            return None
+        return curve(outdoor_temp)
 
-        if outdoor_temp <= self.curve[0]["outdoor"]:
-            return self.curve[0]["ch_max"]
-        if outdoor_temp >= self.curve[-1]["outdoor"]:
-            return self.curve[-1]["ch_max"]
-
-        for i in range(len(self.curve) - 1):
-            p0 = self.curve[i]
-            p1 = self.curve[i + 1]
-            if p0["outdoor"] <= outdoor_temp <= p1["outdoor"]:
-                value = interpolate(
-                    outdoor_temp,
-                    p0["outdoor"], p0["ch_max"],
-                    p1["outdoor"], p1["ch_max"]
-                )
-                return max(self.min, min(self.max, value))
-        return None
+    def compute_many(self, outdoor_temps, curve=None):
+        """Vectorized compute for simulations; ``curve`` names a curve other than the active one."""
+        if not self.enabled:
+            return [None] * len(outdoor_temps)
+        c = self._curve if curve is None else self.curves[curve]
+        if c is None:
+            return [None] * len(outdoor_temps)
+        return c.many(outdoor_temps)
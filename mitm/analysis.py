@@ -0,0 +1,313 @@
+# mitm/analysis.py
+# Analyse van recorder-opnames (.evr) met NumPy over memory-mapped bestanden.
+#
+# NumPy is alleen nodig voor deze offline analyse, niet voor de MITM zelf:
+#     pip install -r requirements-analysis.txt
+# (in Docker: bouwen met build-arg ANALYSIS=true)
+#
+# Per opnamebestand wordt een klein index-bestand (<bestand>.idx.json)
+# bijgehouden met tijdsbereik en aantallen per code, zodat bestanden buiten
+# een gevraagde periode of zonder de gevraagde code niet geopend worden.
+# Binnen een bestand zijn records op tijd gesorteerd: begin en eind van een
+# periode worden met binary search op de ts-kolom gevonden.
+#
+# Gebruik:
+#     python -m mitm.analysis /logs/capture --from 2026-01-01 --to 2026-02-01 cycles
+#     python -m mitm.analysis /logs/capture deltas
+#     python -m mitm.analysis /logs/capture setpoints --outdoor
+import argparse
+import datetime
+import glob
+import json
+import os
+
+try:
+    import numpy as np
+except ImportError as e:  # pragma: no cover - afhankelijk van de omgeving
+    raise ImportError("mitm.analysis requires numpy (pip install -r requirements-analysis.txt, or build the image with ANALYSIS=true)") from e
+
+from mitm import decoder
+from mitm.recorder import HEADER, MAGIC, PAYLOAD_MAX, RECORD_SIZE, SUFFIX
+
+# Exact gelijk aan recorder.RECORD ("<dBBIIIHBB64s6x"), zonder alignment
+DTYPE = np.dtype([
+    ("ts", "<f8"),
+    ("rssi", "u1"),
+    ("verb", "u1"),
+    ("src", "<u4"),
+    ("dst", "<u4"),
+    ("via", "<u4"),
+    ("code", "<u2"),
+    ("plen", "u1"),
+    ("flags", "u1"),
+    ("payload", "u1", (PAYLOAD_MAX,)),
+    ("_pad", "V6"),
+])
+assert DTYPE.itemsize == RECORD_SIZE
+
+_STRUCT_TO_NUMPY = {"B": "u1", "b": "i1", "H": ">u2", "h": ">i2", "I": ">u4", "i": ">i4"}
+
+
+def open_capture(path):
+    """Memory-map one capture file as a structured array (read-only)."""
+    with open(path, "rb") as f:
+        magic, _, size, _ = HEADER.unpack_from(f.read(RECORD_SIZE))
+    if magic != MAGIC or size != RECORD_SIZE:
+        raise ValueError(f"{path}: not an evohome-mitm capture")
+    count = (os.path.getsize(path) - RECORD_SIZE) // RECORD_SIZE
+    if count <= 0:
+        return np.empty(0, dtype=DTYPE)
+    return np.memmap(path, dtype=DTYPE, mode="r", offset=RECORD_SIZE, shape=(count,))
+
+
+def _index(path):
+    idx_path = path + ".idx.json"
+    size = os.path.getsize(path)
+    try:
+        with open(idx_path) as f:
+            idx = json.load(f)
+        if idx.get("size") == size:
+            return idx
+    except (OSError, ValueError):
+        pass
+
+    rec = open_capture(path)
+    codes, counts = np.unique(rec["code"], return_counts=True)
+    idx = {
+        "size": size,
+        "records": int(len(rec)),
+        "t_min": float(rec["ts"][0]) if len(rec) else None,
+        "t_max": float(rec["ts"][-1]) if len(rec) else None,
+        "codes": {f"{c:04X}": int(n) for c, n in zip(codes, counts)},
+    }
+    try:
+        with open(idx_path, "w") as f:
+            json.dump(idx, f)
+    except OSError:
+        pass  # read-only opslag: index dan alleen in het geheugen
+    return idx
+
+
+class CaptureSet:
+    """All capture files in a directory, queried by time range and code."""
+
+    def __init__(self, directory):
+        self.paths = sorted(glob.glob(os.path.join(directory, "*" + SUFFIX)))
+
+    def query(self, start=None, end=None, codes=None):
+        """
+        Records with ``start <= ts < end`` and (optionally) a code in
+        ``codes`` (hex strings), concatenated over all matching files.
+        """
+        wanted = None if codes is None else {c.upper() for c in codes}
+        wanted_ints = None if wanted is None else np.array([int(c, 16) for c in wanted], dtype="<u2")
+        parts = []
+        for path in self.paths:
+            idx = _index(path)
+            if not idx["records"]:
+                continue
+            if start is not None and idx["t_max"] < start:
+                continue
+            if end is not None and idx["t_min"] >= end:
+                continue
+            if wanted is not None and not wanted.intersection(idx["codes"]):
+                continue
+            rec = open_capture(path)
+            ts = rec["ts"]
+            lo = 0 if start is None else int(np.searchsorted(ts, start, "left"))
+            hi = len(rec) if end is None else int(np.searchsorted(ts, end, "left"))
+            part = rec[lo:hi]
+            if wanted_ints is not None:
+                part = part[np.isin(part["code"], wanted_ints)]
+            parts.append(np.array(part))
+        if not parts:
+            return np.empty(0, dtype=DTYPE)
+        return np.concatenate(parts)
+
+
+# --- gevectoriseerde decoders op basis van decoder.Layout --------------------
+
+def _vector_scale(scale, column):
+    if scale is None:
+        return column
+    if scale is decoder._c_from_u16_0p01:
+        return column / 100.0
+    if scale is decoder._c_or_none:
+        return np.where(column == 0x7FFF, np.nan, column / 100.0)
+    if scale is decoder._pct_or_none:
+        return np.where(column == 0xFC, np.nan, column / 2.0)
+    if scale is decoder._is_force_off:
+        return column == 0xFC
+    if scale is float:
+        return column.astype(float)
+    # tekst/hex-weergaven: ruwe waarde teruggeven
+    return column
+
+
+def _layout_dtype(layout):
+    names, formats = [], []
+    i = 0
+    for count, char in _struct_items(layout.struct.format.lstrip("<>!=@")):
+        if char == "x":
+            names.append(f"_x{i}")
+            formats.append(f"V{count}")
+        elif char == "s":
+            names.append(f"f{i}")
+            formats.append(f"V{count}")
+            i += 1
+        else:
+            for _ in range(count):
+                names.append(f"f{i}")
+                formats.append(_STRUCT_TO_NUMPY[char])
+                i += 1
+    return np.dtype({"names": names, "formats": formats})
+
+
+def _struct_items(fmt):
+    count = ""
+    for ch in fmt:
+        if ch.isdigit():
+            count += ch
+            continue
+        yield int(count or 1), ch
+        count = ""
+
+
+def decode_fields(records, code):
+    """
+    Vectorized decode of ``code`` records using the decoder's struct layout.
+    Returns {"ts": ..., "src": ..., <field>: column, ...}; records whose
+    payload is shorter than the layout are skipped.
+    """
+    entry = decoder.layouts(code)
+    if entry is None:
+        raise ValueError(f"No table-driven layout for {code}")
+    _, layouts = entry
+    # langste layout (response-vorm) is de interessante voor analyse
+    layout = max(layouts, key=lambda lay: lay.size)
+    rec = records[(records["code"] == int(code, 16)) & (records["plen"] >= layout.size)]
+    raw = np.ascontiguousarray(rec["payload"][:, : layout.size]).view(_layout_dtype(layout)).reshape(-1)
+    out = {"ts": rec["ts"], "src": rec["src"]}
+    for name, idx, scale in layout.fields:
+        out[name] = _vector_scale(scale, raw[f"f{idx}"])
+    return out
+
+
+def ch_setpoints(records):
+    """1F09 CH setpoint (last two payload bytes, /10 °C) as (ts, value_c)."""
+    rec = records[(records["code"] == 0x1F09) & (records["plen"] >= 2)]
+    rows = np.arange(len(rec))
+    last = rec["plen"].astype(np.intp)
+    hi = rec["payload"][rows, last - 2].astype(np.uint16)
+    lo = rec["payload"][rows, last - 1].astype(np.uint16)
+    return rec["ts"], ((hi << 8) | lo) / 10.0
+
+
+# --- rapporten ---------------------------------------------------------------
+
+def burner_cycles(records, bucket=3600.0):
+    """
+    Burner starts (3E70 instantaneous state 00 → non-zero) per ``bucket``
+    seconds. Returns (bucket_start_ts, starts) summed over all devices.
+    """
+    f = decode_fields(records, "3E70")
+    ts, src, state = f["ts"], f["src"], f["instantaneous_state"]
+    if not len(ts):
+        return np.empty(0), np.empty(0, dtype=int)
+    order = np.lexsort((ts, src))
+    ts, src, on = ts[order], src[order], state[order] != 0
+    starts = on[1:] & ~on[:-1] & (src[1:] == src[:-1])
+    start_ts = ts[1:][starts]
+    first = np.floor(ts.min() / bucket) * bucket
+    edges = np.arange(first, ts.max() + bucket, bucket)
+    counts, _ = np.histogram(start_ts, bins=edges)
+    return edges[:-1], counts
+
+
+def supply_return_delta(records):
+    """3200 supply/return/delta columns (NaN where a sensor reports 7FFF)."""
+    f = decode_fields(records, "3200")
+    return {"ts": f["ts"], "supply_c": f["supply_c"], "return_c": f["return_c"],
+            "delta_c": f["supply_c"] - f["return_c"]}
+
+
+def setpoint_histogram(records, bins=np.arange(10.0, 80.5, 2.5)):
+    _, values = ch_setpoints(records)
+    return np.histogram(values, bins=bins)
+
+
+def setpoint_vs_outdoor(records, sp_bins=np.arange(10.0, 80.5, 5.0), outdoor_bins=np.arange(-15.0, 25.5, 5.0)):
+    """
+    2D histogram of 1F09 setpoints against the latest preceding 1290
+    outdoor temperature. Returns (counts, sp_edges, outdoor_edges).
+    """
+    sp_ts, sp = ch_setpoints(records)
+    od = decode_fields(records, "1290")
+    od_ts, od_val = od["ts"], od["value_c"]
+    order = np.argsort(od_ts)
+    od_ts, od_val = od_ts[order], od_val[order]
+    pos = np.searchsorted(od_ts, sp_ts, "right") - 1
+    valid = pos >= 0
+    outdoor = np.full(len(sp), np.nan)
+    outdoor[valid] = od_val[pos[valid]]
+    keep = ~np.isnan(outdoor)
+    return np.histogram2d(sp[keep], outdoor[keep], bins=(sp_bins, outdoor_bins))
+
+
+# --- CLI ---------------------------------------------------------------------
+
+def _ts(value):
+    return datetime.datetime.fromisoformat(value).timestamp() if value else None
+
+
+def _fmt_ts(ts):
+    return datetime.datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m mitm.analysis", description="capture analytics")
+    ap.add_argument("directory")
+    ap.add_argument("report", choices=("summary", "cycles", "deltas", "setpoints"))
+    ap.add_argument("--from", dest="start", help="ISO date/time (inclusive)")
+    ap.add_argument("--to", dest="end", help="ISO date/time (exclusive)")
+    ap.add_argument("--outdoor", action="store_true", help="setpoints versus outdoor temperature")
+    args = ap.parse_args(argv)
+
+    captures = CaptureSet(args.directory)
+    start, end = _ts(args.start), _ts(args.end)
+    codes = {"summary": None, "cycles": ["3E70"], "deltas": ["3200"], "setpoints": ["1F09", "1290"]}[args.report]
+    records = captures.query(start, end, codes)
+    print(f"{len(records)} records from {len(captures.paths)} file(s)")
+    if not len(records):
+        return
+
+    if args.report == "summary":
+        codes, counts = np.unique(records["code"], return_counts=True)
+        for c, n in sorted(zip(codes, counts), key=lambda x: -x[1]):
+            print(f"{c:04X} {n:>10}")
+    elif args.report == "cycles":
+        starts, counts = burner_cycles(records)
+        for t, n in zip(starts, counts):
+            print(f"{_fmt_ts(t)} {n:>4}")
+        hours = max(len(counts), 1)
+        print(f"mean {counts.sum() / hours:.2f} burner starts per hour")
+    elif args.report == "deltas":
+        d = supply_return_delta(records)
+        delta = d["delta_c"][~np.isnan(d["delta_c"])]
+        if len(delta):
+            print("supply-return delta °C: mean {:.2f} p10 {:.2f} p50 {:.2f} p90 {:.2f}".format(
+                delta.mean(), *np.percentile(delta, (10, 50, 90))))
+    elif args.report == "setpoints" and args.outdoor:
+        counts, sp_edges, od_edges = setpoint_vs_outdoor(records)
+        print("setpoint\\outdoor " + " ".join(f"{e:>6.0f}" for e in od_edges[:-1]))
+        for lo, row in zip(sp_edges, counts):
+            print(f"{lo:>16.1f} " + " ".join(f"{int(n):>6}" for n in row))
+    else:
+        counts, edges = setpoint_histogram(records)
+        for lo, n in zip(edges, counts):
+            if n:
+                print(f"{lo:>5.1f} °C {n:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+# mitm/backtest.py
+# Backtest van CHLimiter + AdaptiveCHMax op opgenomen verkeer, in versnelde tijd.
+#
+# 1F09-frames en buitentemperaturen (1290 uit de opname en/of een CSV met
+# MQTT-waarden) worden op volgorde van tijdstempel door een echte
+# CHLimiter gestuurd; buitentemperaturen gaan als payload door Context.update
+# met de contextsignalen uit de config, net als MQTT in productie; klok, context en curve lezen een gesimuleerde klok,
+# dus een hele winter kost seconden in plaats van maanden.
+#
+# Bronnen: recorder-bestanden (.evr, of een map daarmee) en
+# replay-captures (tekst, offsets vanaf --start).
+#
+# Gebruik:
+#     python -m mitm.backtest /logs/capture --config a.yaml --config b.yaml
+#     python -m mitm.backtest /logs/capture --set ch.ramp_step=1 --set ch.ramp_interval=60
+#     python -m mitm.backtest capture.txt --start 2026-01-10T00:00 --outdoor outdoor.csv --trace trace.csv
+import argparse
+import csv
+import datetime
+import glob
+import os
+import time
+
+import yaml
+
+from mitm.adaptive import AdaptiveCHMax
+from mitm.config import Config
+from mitm.context import Context
+from mitm.limiter import CHLimiter
+from mitm.ramses import parse_frame
+from mitm.recorder import SUFFIX, read_records
+from mitm.replay import load_capture
+
+OUTDOOR = 0
+SETPOINT = 1
+
+
+class SimClock:
+    """Clock for CHLimiter/Context/AdaptiveCHMax that only moves when told to."""
+
+    __slots__ = ("now",)
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _outdoor_c(payload):
+    # 1290 → payload zoals het MQTT-contextsignaal die zou krijgen; de
+    # bereikcheck doet Signal.parse
+    if len(payload) < 2:
+        return None
+    raw = int.from_bytes(payload[:2], "big", signed=True)
+    if raw == 0x7FFF:
+        return None
+    return f"{raw / 100.0:.2f}"
+
+
+def _events_evr(path):
+    for ts, _, _, _, _, _, code, payload in read_records(path):
+        if code == "1F09":
+            if len(payload) >= 2:
+                yield ts, SETPOINT, int.from_bytes(payload[-2:], "big") / 10.0
+        elif code == "1290":
+            value = _outdoor_c(payload)
+            if value is not None:
+                yield ts, OUTDOOR, value
+
+
+def _events_text(path, start):
+    for offset, line in load_capture(path):
+        if offset is None:
+            continue
+        frame = parse_frame(line)
+        if frame is None:
+            continue
+        if frame.is_ch_setpoint():
+            value = frame.get_ch_value()
+            if value is not None:
+                yield start + offset, SETPOINT, value
+        elif frame.code == "1290" and len(frame.payload) >= 4:
+            value = _outdoor_c(bytes.fromhex(frame.payload[:4]))
+            if value is not None:
+                yield start + offset, OUTDOOR, value
+
+
+def _events_csv(path):
+    # ts,value — ts als epoch of ISO-datum/tijd
+    with open(path, newline="") as f:
+        for row in csv.reader(f):
+            if not row or row[0].startswith("#"):
+                continue
+            try:
+                ts = float(row[0])
+            except ValueError:
+                try:
+                    ts = datetime.datetime.fromisoformat(row[0]).timestamp()
+                except ValueError:
+                    continue  # kopregel
+            if len(row) > 1:
+                yield ts, OUTDOOR, row[1]
+
+
+def load_events(paths, outdoor=None, start=0.0):
+    """
+    Time-ordered (ts, kind, value) events from captures and an optional
+    outdoor CSV; outdoor values are raw payload text, setpoints floats.
+    """
+    events = []
+    for path in paths:
+        files = sorted(glob.glob(os.path.join(path, "*" + SUFFIX))) if os.path.isdir(path) else [path]
+        for name in files:
+            if name.endswith(SUFFIX):
+                events.extend(_events_evr(name))
+            else:
+                events.extend(_events_text(name, start))
+    if outdoor:
+        events.extend(_events_csv(outdoor))
+    # bij gelijke tijd eerst de buitentemperatuur
+    events.sort(key=lambda e: (e[0], e[1]))
+    return events
+
+
+def run(cfg, events):
+    """
+    Feed ``events`` through a fresh CHLimiter/AdaptiveCHMax on a simulated
+    clock. Returns the trace as a list of
+    (ts, outdoor_c or None, effective_max_c, requested_c, output_c).
+    """
+    clock = SimClock(events[0][0] if events else 0.0)
+    # zelfde signaaldefinities (bereik, max_age) als in productie
+    context = Context(cfg.context_signals, clock=clock)
+    limiter = CHLimiter(cfg, context, AdaptiveCHMax(cfg, clock), clock)
+    trace = []
+    append = trace.append
+    update = context.update
+    for ts, kind, value in events:
+        clock.now = ts
+        if kind == OUTDOOR:
+            update("outdoor_temperature", value)
+            continue
+        outdoor = context.get_outdoor_temperature()
+        ch_max = limiter.effective_max()
+        append((ts, outdoor, ch_max, value, limiter.limit(value)))
+    return trace
+
+
+def summarize(trace):
+    if not trace:
+        return {"frames": 0}
+    n = len(trace)
+    limited = [req - out for _, _, _, req, out in trace if out < req]
+    ramps = sum(1 for a, b in zip(trace, trace[1:]) if b[4] > a[4])
+    span = trace[-1][0] - trace[0][0]
+    # tijdgewogen gemiddelde: elke waarde geldt tot het volgende frame
+    weighted = sum(a[4] * (b[0] - a[0]) for a, b in zip(trace, trace[1:]))
+    return {
+        "frames": n,
+        "days": span / 86400.0,
+        "no_outdoor": sum(1 for t in trace if t[1] is None),
+        "limited": len(limited),
+        "limited_pct": 100.0 * len(limited) / n,
+        "mean_requested": sum(t[3] for t in trace) / n,
+        "mean_output": sum(t[4] for t in trace) / n,
+        "time_weighted_output": weighted / span if span > 0 else trace[0][4],
+        "mean_cut": sum(limited) / len(limited) if limited else 0.0,
+        "max_cut": max(limited, default=0.0),
+        "ramp_steps": ramps,
+    }
+
+
+def write_trace(trace, path):
+    with open(path, "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(("ts", "outdoor_c", "effective_max_c", "requested_c", "output_c"))
+        for ts, outdoor, ch_max, req, out in trace:
+            w.writerow((f"{ts:.3f}", "" if outdoor is None else outdoor, ch_max, req, out))
+
+
+def _override(raw, assignment):
+    # "ch.ramp_step=1" → raw["ch"]["ramp_step"] = 1 (waarde als YAML)
+    key, _, value = assignment.partition("=")
+    *parents, leaf = key.split(".")
+    node = raw
+    for part in parents:
+        node = node.setdefault(part, {})
+    node[leaf] = yaml.safe_load(value)
+
+
+def load_config(path, overrides=()):
+    with open(path) as f:
+        raw = yaml.safe_load(f)
+    for assignment in overrides:
+        _override(raw, assignment)
+    return Config(**raw)
+
+
+def _ts(value):
+    return datetime.datetime.fromisoformat(value).timestamp() if value else 0.0
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m mitm.backtest", description="CH limiter backtest")
+    ap.add_argument("captures", nargs="+", help=".evr files/directories or replay captures")
+    ap.add_argument("--config", action="append", help="config.yaml to evaluate (repeatable)")
+    ap.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                    help="override applied to every config, e.g. ch.ramp_step=1")
+    ap.add_argument("--outdoor", help="CSV of ts,value outdoor temperatures (e.g. exported from MQTT)")
+    ap.add_argument("--start", help="ISO start time for replay captures (offsets are relative)")
+    ap.add_argument("--trace", help="write the setpoint trace as CSV (index appended per config)")
+    args = ap.parse_args(argv)
+
+    configs = args.config or [os.environ.get("MITM_CONFIG", "/config/config.yaml")]
+    t = time.perf_counter()
+    events = load_events(args.captures, args.outdoor, _ts(args.start))
+    print(f"{len(events)} events loaded in {time.perf_counter() - t:.2f} s")
+
+    for i, path in enumerate(configs):
+        cfg = load_config(path, args.set)
+        t = time.perf_counter()
+        trace = run(cfg, events)
+        elapsed = time.perf_counter() - t
+        stats = summarize(trace)
+        print(f"\n{path}" + (f" ({', '.join(args.set)})" if args.set else ""))
+        for key, value in stats.items():
+            print(f"  {key:<22}{value:>12.2f}" if isinstance(value, float) else f"  {key:<22}{value:>12}")
+        print(f"  {'simulated in':<22}{elapsed:>11.2f}s")
+        if args.trace:
+            out = args.trace if len(configs) == 1 else f"{os.path.splitext(args.trace)[0]}-{i}.csv"
+            write_trace(trace, out)
+            print(f"  trace written to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,19 @@
+import copy
 import os
 import yaml
 
+
+def _merge(base, override):
+    # geneste dicts samenvoegen, override wint
+    out = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(out.get(key), dict):
+            out[key] = _merge(out[key], value)
+        else:
+            out[key] = value
+    return out
+
+
 class Config:
     @staticmethod
     def load():
@@ -9,8 +22,27 @@ class Config:
             return Config(**yaml.safe_load(f))
 
     def __init__(self, **cfg):
-        self.serial_device = cfg["serial"]["device"]
-        self.serial_baud = cfg["serial"].get("baud", 115200)
+        self._raw = cfg
+        serial = cfg["serial"]
+        # meerdere sticks: serial.sticks, elk met device en optioneel eigen
+        # ch/context/forward-instellingen; anders één stick uit serial.device
+        sticks = serial.get("sticks") or [{"device": serial["device"]}]
+        self.serial_sticks = [
+            dict(stick, name=stick.get("name") or os.path.basename(stick["device"]))
+            for stick in sticks
+        ]
+        self.serial_device = serial.get("device", sticks[0]["device"])
+        self.serial_baud = serial.get("baud", 115200)
+        # line = het oorspronkelijke gedrag; meerdere sticks vereisen bulk
+        self.serial_reader = serial.get("reader", "bulk" if serial.get("sticks") else "line")
+        self.serial_dedup_window = serial.get("dedup_window", 1.0)
+
+        dedup = cfg.get("dedup", {})
+        self.dedup_enabled = dedup.get("enabled", False)
+        self.dedup_window = dedup.get("window", 1.0)
+
+        # include/exclude-regels: "all" vóór parse, overige sleutels per sink
+        self.filters = cfg.get("filters") or {}
 
         ch = cfg["ch"]
         self.ch_max = ch["max"]
@@ -23,7 +55,97 @@ class Config:
         self.adaptive_curve = adaptive.get("curve", [])
         self.adaptive_min = adaptive.get("min", self.ch_idle)
         self.adaptive_max = adaptive.get("max", self.ch_max)
+        self.adaptive_curves = adaptive.get("curves", {})
+        self.adaptive_schedule = adaptive.get("schedule", [])
+        self.adaptive_active = adaptive.get("active")
+        self.adaptive_lut = adaptive.get("lut", False)
 
         mqtt = cfg["mqtt"]
         self.mqtt_host = mqtt["host"]
         self.mqtt_port = mqtt.get("port", 1883)
+        self.mqtt_publish_raw = mqtt.get("publish_raw", False)
+        self.mqtt_queue_size = mqtt.get("queue_size", 1000)
+        self.mqtt_batch_interval = mqtt.get("batch_interval", 0)
+        self.mqtt_reconnect_min = mqtt.get("reconnect_min", 1)
+        self.mqtt_reconnect_max = mqtt.get("reconnect_max", 120)
+
+        context = cfg.get("context", {})
+        self.context_topic = context.get("topic", "evohome/context/#")
+        self.context_signals = context.get("signals", {})
+
+        cache = cfg.get("cache", {})
+        self.cache_size = cache.get("size", 1024)
+
+        runtime = cfg.get("runtime", {})
+        self.runtime_mode = runtime.get("mode", "sync")
+        self.queue_size = runtime.get("queue_size", 1000)
+        self.drop_policy = runtime.get("drop_policy", "drop_oldest")
+
+        metrics = cfg.get("metrics", {})
+        self.metrics_enabled = metrics.get("enabled", False)
+        self.metrics_http_port = metrics.get("http_port", 9108)
+        self.metrics_mqtt_interval = metrics.get("mqtt_interval", 0) if self.metrics_enabled else 0
+
+        forward = cfg.get("forward", {})
+        self.forward_enabled = forward.get("enabled", False)
+        self.forward_device = forward.get("device")
+        self.forward_baud = forward.get("baud", self.serial_baud)
+        self.forward_budget_ms = forward.get("latency_budget_ms", 20)
+
+        log = cfg.get("logging", {})
+        self.log_async = log.get("async", False)
+        self.log_queue_size = log.get("queue_size", 10000)
+        self.log_sample_every = log.get("sample", {})
+        self.log_max_per_minute = log.get("max_per_minute", {})
+
+        publish = cfg.get("publish", {})
+        self.publish_enabled = publish.get("enabled", False)
+        self.publish_prefix = publish.get("prefix", "evohome/mitm")
+        self.publish_deadband = publish.get("deadband", 0.0)
+        self.publish_deadbands = publish.get("deadbands", {})
+        self.publish_max_interval = publish.get("max_interval", 300)
+        self.publish_retain = publish.get("retain", True)
+        self.publish_fields = publish.get("fields", [])
+
+        state = cfg.get("state", {})
+        self.state_enabled = state.get("enabled", False)
+
+        snapshot = cfg.get("snapshot", {})
+        self.snapshot_enabled = snapshot.get("enabled", False)
+        self.snapshot_path = snapshot.get("path", "/logs/mitm-snapshot.bin")
+        self.snapshot_interval = snapshot.get("interval", 30)
+        self.snapshot_max_age = snapshot.get("max_age", 900)
+        self.snapshot_size_kb = snapshot.get("size_kb", 64)
+
+        profile = cfg.get("profile", {})
+        self.profile_enabled = profile.get("enabled", False)
+        self.profile_directory = profile.get("directory", "/logs/profile")
+        self.profile_duration = profile.get("duration", 30)
+        self.profile_top = profile.get("top", 25)
+        self.profile_sample_interval = profile.get("sample_interval", 0.005)
+        self.profile_topic = profile.get("topic", "evohome/mitm/profile")
+
+        recorder = cfg.get("recorder", {})
+        self.recorder_enabled = recorder.get("enabled", False)
+        self.recorder_directory = recorder.get("directory", "/logs/capture")
+        self.recorder_flush_interval = recorder.get("flush_interval", 60)
+        self.recorder_rotate_interval = recorder.get("rotate_interval", 86400)
+        self.recorder_rotate_size_mb = recorder.get("rotate_size_mb", 64)
+        self.recorder_retention_days = recorder.get("retention_days", 365)
+
+    def for_stick(self, stick):
+        """
+        Config for one entry of ``serial_sticks``: the top-level settings
+        with that stick's device and its ch/context/forward overrides.
+        """
+        raw = copy.deepcopy(self._raw)
+        serial = {k: v for k, v in raw["serial"].items() if k != "sticks"}
+        serial["device"] = stick["device"]
+        for key in ("baud", "reader"):
+            if key in stick:
+                serial[key] = stick[key]
+        raw["serial"] = serial
+        for section in ("ch", "context", "forward"):
+            if section in stick:
+                raw[section] = _merge(raw.get(section) or {}, stick[section])
+        return Config(**raw)
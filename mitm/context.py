@@ -1,21 +1,156 @@
-import time
+import json
+import logging
+import math
 import threading
+import time
+from types import MappingProxyType
+
+# Standaard altijd aanwezig; config kan grenzen en max_age overschrijven
+DEFAULT_SIGNALS = {
+    "outdoor_temperature": {"type": "float", "min": -30.0, "max": 50.0, "max_age": 900},
+}
+
+_TRUE = frozenset(("1", "true", "on", "yes"))
+_FALSE = frozenset(("0", "false", "off", "no"))
+
+
+def _finite(value):
+    # NaN haalt elke bereikcheck (alle vergelijkingen zijn False)
+    value = float(value)
+    if not math.isfinite(value):
+        raise ValueError(f"not a finite number: {value}")
+    return value
+
+
+def _no_constant(name):
+    # json.loads accepteert NaN, Infinity en -Infinity
+    raise ValueError(f"not a finite number: {name}")
+
+
+class Signal:
+    """Parsing, validation range and staleness limit of one context signal."""
+
+    __slots__ = ("name", "kind", "lo", "hi", "max_age", "values")
+
+    def __init__(self, name, type="float", min=None, max=None, max_age=900, values=None):
+        if type not in ("float", "bool", "str", "json"):
+            raise ValueError(f"context signal {name}: unknown type {type!r}")
+        self.name = name
+        self.kind = type
+        self.lo = min
+        self.hi = max
+        self.max_age = max_age
+        self.values = frozenset(values) if values else None
+
+    def parse(self, payload):
+        """Payload (str) → value; ValueError when it does not validate."""
+        text = payload.strip()
+        if self.kind == "float":
+            value = _finite(text)
+            if (self.lo is not None and value < self.lo) or (self.hi is not None and value > self.hi):
+                raise ValueError(f"{value} outside [{self.lo}, {self.hi}]")
+            return value
+        if self.kind == "bool":
+            low = text.lower()
+            if low in _TRUE:
+                return True
+            if low in _FALSE:
+                return False
+            raise ValueError(f"not a boolean: {text!r}")
+        value = json.loads(text, parse_float=_finite, parse_constant=_no_constant) if self.kind == "json" else text
+        if self.values is not None and value not in self.values:
+            raise ValueError(f"{value!r} not one of {sorted(self.values)}")
+        return value
+
+
+def _matches(pattern, name):
+    # MQTT-stijl: + = één niveau, # = de rest
+    p, n = pattern.split("/"), name.split("/")
+    for i, part in enumerate(p):
+        if part == "#":
+            return True
+        if i >= len(n) or (part != "+" and part != n[i]):
+            return False
+    return len(p) == len(n)
+
 
 class Context:
-    def __init__(self):
-        self._lock = threading.Lock()
-        self._outdoor_temp = None
-        self._updated = None
+    """
+    Named context signals (outdoor temperature, room temperatures,
+    heat-pump state, tariff, ...), typically fed from MQTT.
+
+    Writers build a new dict and swap it in as a read-only snapshot;
+    readers (the RF path) only load that reference and never lock.
+    """
+
+    def __init__(self, signals=None, clock=time.time):
+        self.clock = clock
+        specs = {name: dict(spec) for name, spec in DEFAULT_SIGNALS.items()}
+        for name, spec in (signals or {}).items():
+            specs.setdefault(name, {}).update(spec or {})
+        self._exact = {}
+        self._patterns = []
+        for name, spec in specs.items():
+            signal = Signal(name, **spec)
+            if "+" in name or "#" in name:
+                self._patterns.append(signal)
+            else:
+                self._exact[name] = signal
+        # name → (value, updated); alleen vervangen, nooit gewijzigd
+        self._snapshot = MappingProxyType({})
+        self._write_lock = threading.Lock()
+        self.rejected = 0
+
+    def signal(self, name):
+        """Spec for ``name`` (exact name first, then wildcard patterns), or None."""
+        signal = self._exact.get(name)
+        if signal is None:
+            for candidate in self._patterns:
+                if _matches(candidate.name, name):
+                    return candidate
+        return signal
+
+    def update(self, name, payload):
+        """Parse and store a raw (MQTT) payload; returns the value or None if rejected."""
+        signal = self.signal(name)
+        if signal is None:
+            logging.debug("Context signal %s not configured, ignored", name)
+            return None
+        try:
+            value = signal.parse(payload)
+        except (TypeError, ValueError) as e:
+            self.rejected += 1
+            logging.warning("Invalid %s payload %r: %s", name, payload, e)
+            return None
+        self.set(name, value)
+        return value
+
+    def set(self, name, value, updated=None):
+        entry = (value, self.clock() if updated is None else updated)
+        with self._write_lock:
+            new = dict(self._snapshot)
+            new[name] = entry
+            self._snapshot = MappingProxyType(new)
+
+    def snapshot(self):
+        """Immutable mapping name → (value, updated) as of now."""
+        return self._snapshot
+
+    def get(self, name, max_age=None):
+        """Current value of ``name``, or None when unknown or older than its max_age."""
+        entry = self._snapshot.get(name)
+        if entry is None:
+            return None
+        value, updated = entry
+        if max_age is None:
+            signal = self.signal(name)
+            max_age = signal.max_age if signal is not None else None
+        if max_age is not None and self.clock() - updated > max_age:
+            return None
+        return value
 
     def set_outdoor_temperature(self, value):
-        with self._lock:
-            self._outdoor_temp = value
-            self._updated = time.time()
-
-    def get_outdoor_temperature(self, max_age=900):
-        with self._lock:
-            if self._outdoor_temp is None:
-                return None
-            if time.time() - self._updated > max_age:
-                return None
-            return self._outdoor_temp
+        self.set("outdoor_temperature", value)
+
+    def get_outdoor_temperature(self, max_age=None):
+        return self.get("outdoor_temperature", max_age)
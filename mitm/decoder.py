@@ -1,11 +1,23 @@
 # mitm/decoder.py
 # Centrale RAMSES-II decoderlaag
 # Doel: menselijk leesbare interpretatie van RF-frames
+#
+# Decoders zijn tabelgestuurd: per message code staat in _REGISTRY één
+# callable. Vaste layouts worden bij import gecompileerd tot struct.Struct,
+# zodat dispatch één dict-lookup is en er per frame niet meer gesliced wordt.
 
-# mitm/decoder.py
 from __future__ import annotations
 
-from typing import Optional, Dict, Any
+import struct
+from array import array
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+from mitm.cache import LRUCache
+from mitm.messages import DecodeError, Message, message_class
+
+Decoder = Callable[[bytes], Mapping[str, Any]]
+# (output name, index in unpacked tuple, scale function or None for raw value)
+Field = Tuple[str, int, Optional[Callable[[Any], Any]]]
 
 
 def _hex_to_bytes(payload_hex: str) -> bytes:
@@ -15,25 +27,35 @@ def _hex_to_bytes(payload_hex: str) -> bytes:
     return bytes.fromhex(payload_hex)
 
 
-def _u8(b: int) -> int:
-    return b & 0xFF
+def _c_from_u16_0p01(v: int) -> float:
+    return v / 100.0
 
 
-def _u16_be(b: bytes) -> int:
-    return int.from_bytes(b, byteorder="big", signed=False)
+def _c_or_none(v: int) -> Optional[float]:
+    # 7FFF => sensor not available
+    return None if v == 0x7FFF else v / 100.0
 
 
-def _s16_be(b: bytes) -> int:
-    return int.from_bytes(b, byteorder="big", signed=True)
+def _pct_from_0_200(v: int) -> float:
+    # 0..200 => 0..100%
+    return v / 2.0
 
 
-def _c_from_u16_0p01(v: int) -> float:
-    return v / 100.0
+def _pct_or_none(v: int) -> Optional[float]:
+    # FC => force off
+    return None if v == 0xFC else v / 2.0
 
 
-def _pct_from_0_200(v: int) -> float:
-    # 0..200 => 0..100%
-    return v / 2.0
+def _is_force_off(v: int) -> bool:
+    return v == 0xFC
+
+
+def _hex8(v: int) -> str:
+    return f"0x{v:02X}"
+
+
+def _hexstr(b: bytes) -> str:
+    return b.hex().upper()
 
 
 def _sixbit_ascii_decode(b: bytes) -> str:
@@ -137,301 +159,591 @@ _DEVICE_STATUS_INST: Dict[int, str] = {
 }
 
 
-def decode(code: str, payload_hex: str) -> Optional[Dict[str, Any]]:
+class _Lookup:
+    # code → tekst; de tabel blijft zichtbaar zodat Message-klassen de
+    # tekst pas bij uitlezen hoeven op te zoeken
+    __slots__ = ("table",)
+
+    def __init__(self, table: Dict[int, str]):
+        self.table = table
+
+    def __call__(self, v: int) -> str:
+        return self.table.get(v, "Unknown")
+
+
+def _lookup(table: Dict[int, str]) -> Callable[[int], str]:
+    return _Lookup(table)
+
+
+class Layout:
+    """
+    Fixed payload layout for one message variant.
+
+    ``fmt`` is a big-endian struct format. The variant applies when
+    ``size <= len(payload) <= max_len``; trailing bytes (e.g. the adapter
+    checksum) are ignored.
+    """
+
+    __slots__ = ("struct", "size", "max_len", "fields", "message")
+
+    def __init__(self, fmt: str, *fields: Field, max_len: Optional[int] = None):
+        self.struct = struct.Struct(">" + fmt)
+        self.size = self.struct.size
+        self.max_len = max_len
+        self.fields = fields
+        # Message-klasse voor deze layout, gezet door register()
+        self.message: Optional[type] = None
+
+
+def _message_fields(fields: Sequence[Field]) -> List[Tuple[str, str, int, Any]]:
+    # schaalfunctie → soort veld in de Message-klasse
+    out = []
+    for name, idx, scale in fields:
+        if scale is _hex8:
+            out.append((name, "hex8", idx, None))
+        elif scale is _hexstr:
+            out.append((name, "hexstr", idx, None))
+        elif isinstance(scale, _Lookup):
+            out.append((name, "lookup", idx, scale.table))
+        else:
+            out.append((name, "value", idx, scale))
+    return out
+
+
+def _error(meaning: str, error: str, data: bytes) -> Message:
+    return DecodeError._from_values((meaning, error, bytes(data)))
+
+
+_REGISTRY: Dict[str, Decoder] = {}
+# code → (meaning, layouts) for table-driven entries; reused for columnar/vectorized decoding
+_LAYOUTS: Dict[str, Tuple[str, Tuple[Layout, ...]]] = {}
+
+
+def register_decoder(code: str, fn: Decoder) -> None:
+    """Register a decoder callable ``fn(payload: bytes) -> dict`` for ``code``."""
+    _REGISTRY[code.upper()] = fn
+    _LAYOUTS.pop(code.upper(), None)
+
+
+def register(code: str, meaning: str, *layouts: Layout, error: str = "payload_too_short") -> None:
+    """
+    Register a table-driven decoder: the first layout whose length bounds
+    match the payload is unpacked into that layout's Message class,
+    otherwise a DecodeError is returned.
+    """
+    code = code.upper()
+    for lay in layouts:
+        # Layout.message hoort bij één code; een gedeelde Layout zou overschreven worden
+        if lay.message is not None:
+            raise ValueError(f"{code}: layout {lay.struct.format!r} is already registered for {lay.message.code}")
+    for i, lay in enumerate(layouts):
+        name = f"Msg{code}" if i == 0 else f"Msg{code}_{i}"
+        lay.message = message_class(name, code, meaning, _message_fields(lay.fields))
+
+    if len(layouts) == 1 and layouts[0].max_len is None:
+        (lay,) = layouts
+        size, unpack, make = lay.size, lay.struct.unpack_from, lay.message._from_values
+
+        def fn(data: bytes) -> Message:
+            if len(data) < size:
+                return _error(meaning, error, data)
+            return make(unpack(data))
+    else:
+        variants = tuple((lay.size, lay.max_len, lay.struct.unpack_from, lay.message._from_values) for lay in layouts)
+
+        def fn(data: bytes) -> Message:
+            n = len(data)
+            for size, max_len, unpack, make in variants:
+                if size <= n and (max_len is None or n <= max_len):
+                    return make(unpack(data))
+            return _error(meaning, error, data)
+
+    register_decoder(code, fn)
+    _LAYOUTS[code] = (meaning, layouts)
+
+
+def codes() -> List[str]:
+    """All message codes with a registered decoder."""
+    return sorted(_REGISTRY)
+
+
+def layouts(code: str) -> Optional[Tuple[str, Tuple[Layout, ...]]]:
+    """(meaning, layouts) of a table-driven code, or None for custom decoders."""
+    return _LAYOUTS.get(code.upper())
+
+
+def _decode(code: str, payload_hex: str) -> Optional[Message]:
+    fn = _REGISTRY.get(code)
+    if fn is None:
+        fn = _REGISTRY.get((code or "").upper().strip())
+        if fn is None:
+            return None
+    return fn(_hex_to_bytes(payload_hex))
+
+
+# Most RF traffic repeats byte-for-byte (3E70, 3200, 1F09 every few seconds),
+# so decoded results are memoised per (code, payload).
+decode_cache = LRUCache(1024)
+_MISS = object()
+
+
+def decode(code: str, payload_hex: str) -> Optional[Message]:
     """
     Decoders for *all* message classes described in PDF 69-2644.
     Unknown codes => None.
     Adapter-format messages in the PDF often append a checksum byte; RF payloads typically do not.
     All decoders are therefore tolerant of an extra trailing checksum byte and ignore it.
+
+    Results are immutable Message objects (read-only mappings, see
+    mitm.messages) shared through ``decode_cache``.
+    """
+    key = (code, payload_hex)
+    result = decode_cache.get(key, _MISS)
+    if result is _MISS:
+        result = _decode(code, payload_hex)
+        decode_cache.put(key, result)
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Batch decoding (columnar)
+# ---------------------------------------------------------------------------
+
+# Schaalfuncties die per kolom in één comprehension kunnen; _hex8 levert in
+# kolomvorm de ruwe integer (geen "0x.." string per waarde).
+_NAN = float("nan")
+_COLUMN_SCALES: Dict[Any, Callable[[Sequence[Any]], Any]] = {
+    _c_from_u16_0p01: lambda raw: array("d", [v / 100.0 for v in raw]),
+    _c_or_none: lambda raw: array("d", [_NAN if v == 0x7FFF else v / 100.0 for v in raw]),
+    _pct_from_0_200: lambda raw: array("d", [v / 2.0 for v in raw]),
+    _pct_or_none: lambda raw: array("d", [_NAN if v == 0xFC else v / 2.0 for v in raw]),
+    _is_force_off: lambda raw: [v == 0xFC for v in raw],
+    float: lambda raw: array("d", raw),
+}
+
+
+class Batch:
+    """
+    Columnar decode result for one code.
+
+    ``columns`` maps field name → sequence (``array.array`` for numeric
+    fields, list otherwise); row ``i`` came from input position ``index[i]``.
+    Unavailable readings (7FFF, FC) are NaN instead of None, and ``_hex8``
+    fields hold the raw integer. Input positions whose payload matched no
+    layout are listed in ``errors``.
+    """
+
+    __slots__ = ("code", "meaning", "index", "columns", "errors")
+
+    def __init__(self, code: str, meaning: Optional[str]):
+        self.code = code
+        self.meaning = meaning
+        self.index: array = array("L")
+        self.columns: Dict[str, Any] = {}
+        self.errors: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __getitem__(self, field: str) -> Any:
+        return self.columns[field]
+
+    def __repr__(self) -> str:
+        return f"Batch({self.code} rows={len(self.index)} fields={list(self.columns)} errors={len(self.errors)})"
+
+
+def _item_types(layout: Layout) -> List[str]:
+    # struct-formaat → typecode per item in de unpack-tuple ("s" voor bytes)
+    types: List[str] = []
+    count = ""
+    for ch in layout.struct.format.lstrip("<>!=@"):
+        if ch.isdigit():
+            count += ch
+        elif ch == "x":
+            count = ""
+        elif ch == "s":
+            types.append("s")
+            count = ""
+        else:
+            types.extend(ch * int(count or 1))
+            count = ""
+    return types
+
+
+def _column(scale: Optional[Callable[[Any], Any]], raw: Sequence[Any], typecode: str) -> Any:
+    vectorized = _COLUMN_SCALES.get(scale)
+    if vectorized is not None:
+        return vectorized(raw)
+    if scale is None or scale is _hex8:
+        return list(raw) if typecode == "s" else array(typecode, raw)
+    if scale is _hexstr:
+        return list(raw)
+    # lookups en lambdas: één aanroep per verschillende waarde
+    memo = {v: scale(v) for v in set(raw)}
+    return list(map(memo.__getitem__, raw))
+
+
+def _missing(like: Any, n: int) -> Any:
+    # ontbrekende velden (kortere layout): NaN in float-kolommen, anders None
+    if isinstance(like, array) and like.typecode == "d":
+        return array("d", [_NAN]) * n
+    return [None] * n
+
+
+def _append_columns(batch: Batch, columns: Dict[str, Any], rows: int) -> None:
+    have = len(batch.index) - rows
+    merged = batch.columns
+    for name, col in columns.items():
+        cur = merged.get(name)
+        if cur is None:
+            if not have:
+                merged[name] = col
+                continue
+            cur = merged[name] = _missing(col, have)
+        if isinstance(cur, array) and isinstance(col, array) and cur.typecode == col.typecode:
+            cur.extend(col)
+        else:
+            merged[name] = list(cur) + list(col)
+    for name, cur in merged.items():
+        if name not in columns:
+            fill = _missing(cur, rows)
+            if type(fill) is type(cur):
+                cur.extend(fill)
+            else:
+                merged[name] = list(cur) + fill
+
+
+# (id(layout), rijlengte) → Struct met de layout plus padding tot de rijlengte
+_ROW_STRUCTS: Dict[Tuple[int, int], struct.Struct] = {}
+
+
+def _row_struct(lay: Layout, n: int) -> struct.Struct:
+    key = (id(lay), n)
+    st = _ROW_STRUCTS.get(key)
+    if st is None:
+        fmt = lay.struct.format
+        st = _ROW_STRUCTS[key] = struct.Struct(fmt + f"{n - lay.size}x" if n > lay.size else fmt)
+    return st
+
+
+def _decode_layout_rows(batch: Batch, layouts_: Tuple[Layout, ...], n: int, index: List[int], data: bytes) -> None:
+    # Alle rijen hebben lengte n, dus dezelfde layout: één iter_unpack over de hele groep
+    for lay in layouts_:
+        if lay.size <= n and (lay.max_len is None or n <= lay.max_len):
+            break
+    else:
+        batch.errors.extend(index)
+        return
+    raw = list(zip(*_row_struct(lay, n).iter_unpack(data)))
+    types = _item_types(lay)
+    columns = {name: _column(scale, raw[idx], types[idx]) for name, idx, scale in lay.fields}
+    batch.index.extend(index)
+    _append_columns(batch, columns, len(index))
+
+
+def _decode_rows(batch: Batch, fn: Decoder, index: List[int], rows_data: List[bytes]) -> None:
+    # Eigen decoders (10E0, 12C0): per rij, daarna naar kolommen
+    columns: Dict[str, List[Any]] = {}
+    rows = 0
+    for i, d in zip(index, rows_data):
+        out = fn(d)
+        if "decode_error" in out:
+            batch.errors.append(i)
+            continue
+        if batch.meaning is None:
+            batch.meaning = out.get("meaning")
+        for name, v in out.items():
+            if name != "meaning":
+                col = columns.get(name)
+                if col is None:
+                    col = columns[name] = [None] * rows
+                col.append(v)
+        rows += 1
+        for col in columns.values():
+            if len(col) < rows:
+                col.append(None)
+        batch.index.append(i)
+    _append_columns(batch, columns, rows)
+
+
+def _group_bytes(payloads: List[Any], is_hex: bool) -> Optional[bytes]:
+    # Een groep met gelijke lengte in één keer naar bytes; None bij rommel
+    if not is_hex:
+        return b"".join(payloads)
+    try:
+        return bytes.fromhex("".join(payloads))
+    except ValueError:
+        return None
+
+
+def decode_many(items: Iterable[Tuple[str, Union[str, bytes]]]) -> Dict[str, Batch]:
+    """
+    Decode many ``(code, payload)`` pairs at once; payloads are hex strings
+    or bytes. Pairs are grouped per code and payload length, and every
+    group is unpacked in one ``Struct.iter_unpack`` pass over its joined
+    payloads.
+
+    Returns ``{code: Batch}``; unknown codes are left out. Rows come out
+    grouped per payload length, ``Batch.index`` gives the input order.
+    Bypasses ``decode_cache``: meant for offline reprocessing and backfills.
     """
-    code = (code or "").upper().strip()
-    data = _hex_to_bytes(payload_hex)
-
-    # helper: ignore one trailing checksum byte if present
-    def strip_checksum(expected_len: int) -> bytes:
-        if len(data) == expected_len + 1:
-            return data[:expected_len]
-        return data
-
-    # 1081 — Supply High Limit
-    # R: 2 bytes setpoint (0.01C) + 2 bytes differential (0.01C) + 1 byte status
-    if code == "1081":
-        d = strip_checksum(5)
-        if len(d) >= 5:
-            sp = _c_from_u16_0p01(_u16_be(d[0:2]))
-            diff = _c_from_u16_0p01(_u16_be(d[2:4]))
-            status = _u8(d[4])
-            return {
-                "meaning": "Supply High Limit",
-                "setpoint_c": sp,
-                "differential_c": diff,
-                "status": status,
-            }
-        return {"meaning": "Supply High Limit", "decode_error": "payload_too_short", "payload": data.hex().upper()}
-
-    # 10A0 — DHW Setpoint
-    # C: 2 bytes setpoint (0.01C)
-    # R: 2 bytes setpoint + 1 byte reserved + 2 bytes differential
-    if code == "10A0":
-        # request can be 2 bytes; response is 5 bytes (plus optional checksum)
-        if len(data) in (2, 3):  # tolerate checksum on request
-            d = strip_checksum(2)
-            if len(d) == 2:
-                sp = _c_from_u16_0p01(_u16_be(d[0:2]))
-                return {"meaning": "DHW setpoint", "setpoint_c": sp}
-        d = strip_checksum(5)
-        if len(d) >= 5:
-            sp = _c_from_u16_0p01(_u16_be(d[0:2]))
-            reserved = _u8(d[2])
-            diff = _c_from_u16_0p01(_u16_be(d[3:5]))
-            return {
-                "meaning": "DHW setpoint",
-                "setpoint_c": sp,
-                "differential_c": diff,
-                "reserved": reserved,
-            }
-        return {"meaning": "DHW setpoint", "decode_error": "unexpected_length", "payload": data.hex().upper()}
-
-    # 10A1 — DHW Setpoint Limits
-    # R: 2 bytes max sp + 2 bytes min sp + 2 bytes max diff + 2 bytes min diff (0.01C)
-    if code == "10A1":
-        d = strip_checksum(8)
-        if len(d) >= 8:
-            return {
-                "meaning": "DHW setpoint limits",
-                "max_setpoint_c": _c_from_u16_0p01(_u16_be(d[0:2])),
-                "min_setpoint_c": _c_from_u16_0p01(_u16_be(d[2:4])),
-                "max_diff_c": _c_from_u16_0p01(_u16_be(d[4:6])),
-                "min_diff_c": _c_from_u16_0p01(_u16_be(d[6:8])),
-            }
-        return {"meaning": "DHW setpoint limits", "decode_error": "payload_too_short", "payload": data.hex().upper()}
-
-    # 10E0 — Node Identification (OS Number)
-    # Legacy: leading 2 bytes 0000, then 6 bytes (6-bit+32) => 8 chars
-    # New: ASCII string (e.g. "1015C") in payload (minus checksum)
-    if code == "10E0":
-        # try ASCII form first (strip checksum if present)
-        d = data[:-1] if len(data) and all(32 <= b <= 126 for b in data[:-1]) else data
-        if len(d) and all(32 <= b <= 126 for b in d):
-            s = d.decode(errors="ignore").strip()
-            return {"meaning": "Node identification (OS number)", "os_number": s}
-
-        d8 = strip_checksum(8)
-        if len(d8) >= 8 and d8[0:2] == b"\x00\x00":
-            osn = _sixbit_ascii_decode(d8[2:8]).strip()
-            return {"meaning": "Node identification (OS number)", "os_number": osn}
-
-        return {"meaning": "Node identification (OS number)", "decode_error": "unsupported_format", "payload": data.hex().upper()}
-
-    # 10E1 — Node Identification (Software/Version)
-    # R: 9 bytes total (plus optional checksum). PDF shows: unit-id + func? + major + minor + ... + checksum
-    if code == "10E1":
-        d = strip_checksum(9)
-        if len(d) >= 9:
-            return {
-                "meaning": "Node identification (software version)",
-                "functional_unit_id": f"0x{d[0]:02X}",
-                "field_1": f"0x{d[1]:02X}",
-                "major": d[2],
-                "minor": d[3],
-                "tail": d[4:9].hex().upper(),
-            }
-        return {"meaning": "Node identification (software version)", "decode_error": "payload_too_short", "payload": data.hex().upper()}
-
-    # 1260 — DHW Cylinder Temperature
-    # R: 3 x 2 bytes temps (0.01C): cyl / top / bottom
-    if code == "1260":
-        d = strip_checksum(6)
-        if len(d) >= 6:
-            return {
-                "meaning": "DHW cylinder temperature",
-                "cylinder_c": _c_from_u16_0p01(_u16_be(d[0:2])),
-                "top_c": _c_from_u16_0p01(_u16_be(d[2:4])),
-                "bottom_c": _c_from_u16_0p01(_u16_be(d[4:6])),
-            }
-        return {"meaning": "DHW cylinder temperature", "decode_error": "payload_too_short", "payload": data.hex().upper()}
-
-    # 1280 — Outdoor Humidity
-    # R: 1 byte humidity + 2 bytes temp (0.01C) + 2 bytes dewpoint (0.01C) + 1 byte reserved
-    if code == "1280":
-        d = strip_checksum(6)
-        if len(d) >= 6:
-            rh = d[0]
-            temp_raw = _u16_be(d[1:3])
-            dew_raw = _u16_be(d[3:5])
-            reserved = d[5]
-            return {
-                "meaning": "Outdoor humidity",
-                "rh_percent": float(rh),
-                "temperature_c": None if temp_raw == 0x7FFF else _c_from_u16_0p01(temp_raw),
-                "dewpoint_c": None if dew_raw == 0x7FFF else _c_from_u16_0p01(dew_raw),
-                "reserved": reserved,
-            }
-        return {"meaning": "Outdoor humidity", "decode_error": "payload_too_short", "payload": data.hex().upper()}
-
-    # 1290 — Outdoor Temperature
-    # R: 2 bytes signed (0.01C), 7FFF = not available
-    if code == "1290":
-        d = strip_checksum(2)
-        if len(d) >= 2:
-            raw = _u16_be(d[0:2])
-            if raw == 0x7FFF:
-                return {"meaning": "Outdoor temperature", "value_c": None}
-            return {"meaning": "Outdoor temperature", "value_c": _s16_be(d[0:2]) / 100.0}
-        return {"meaning": "Outdoor temperature", "decode_error": "payload_too_short", "payload": data.hex().upper()}
-
-    # 12C0 — Displayed Temperature
-    # R: 1 byte temp + 1 byte units + 1 byte reserved
-    # units: 00 => Fahrenheit (integer); 01 => Celsius (value * 0.5)
-    if code == "12C0":
-        d = strip_checksum(3)
-        if len(d) >= 3:
-            val = d[0]
-            units = d[1]
-            if units == 0x00:
-                return {"meaning": "Displayed temperature", "value_f": float(val), "units": "F"}
-            if units == 0x01:
-                return {"meaning": "Displayed temperature", "value_c": val / 2.0, "units": "C"}
-            return {"meaning": "Displayed temperature", "raw_value": val, "units_code": units, "reserved": d[2]}
-        return {"meaning": "Displayed temperature", "decode_error": "payload_too_short", "payload": data.hex().upper()}
-
-    # 22D9 — Desired Boiler Setpoint
-    # R: 2 bytes setpoint (0.01C)
-    if code == "22D9":
-        d = strip_checksum(2)
-        if len(d) >= 2:
-            return {"meaning": "Desired boiler setpoint", "setpoint_c": _c_from_u16_0p01(_u16_be(d[0:2]))}
-        return {"meaning": "Desired boiler setpoint", "decode_error": "payload_too_short", "payload": data.hex().upper()}
-
-    # 22DB — Central Heat Setpoint
-    # C: 2 bytes setpoint (0.01C)
-    # R: 2 bytes setpoint + 2 bytes differential (0.01C)
-    if code == "22DB":
-        if len(data) in (2, 3):
-            d = strip_checksum(2)
-            if len(d) == 2:
-                return {"meaning": "Central heat setpoint", "setpoint_c": _c_from_u16_0p01(_u16_be(d[0:2]))}
-        d = strip_checksum(4)
-        if len(d) >= 4:
-            return {
-                "meaning": "Central heat setpoint",
-                "setpoint_c": _c_from_u16_0p01(_u16_be(d[0:2])),
-                "differential_c": _c_from_u16_0p01(_u16_be(d[2:4])),
-            }
-        return {"meaning": "Central heat setpoint", "decode_error": "unexpected_length", "payload": data.hex().upper()}
-
-    # 30D0 — DHW Demand
-    # R: 1 byte demand (0..200 => 0..100%), + 1 byte equipment status/type
-    # demand can be FC for "force off"
-    if code == "30D0":
-        d = strip_checksum(2)
-        if len(d) >= 2:
-            demand = d[0]
-            status = d[1]
-            percent = None if demand == 0xFC else _pct_from_0_200(demand)
-            # PDF: 0x10 = gas, LSB indicates on/off (examples: 0x10 off, 0x11 on)
-            equip = "gas" if (status & 0x10) else "unknown"
-            on = bool(status & 0x01)
-            return {
-                "meaning": "DHW demand",
-                "percent": percent,
-                "force_off": demand == 0xFC,
-                "equipment": equip,
-                "on": on,
-                "status": f"0x{status:02X}",
-            }
-        return {"meaning": "DHW demand", "decode_error": "payload_too_short", "payload": data.hex().upper()}
-
-    # 3110 — Heat/Cool Demand
-    # R (PDF): 1 byte system_stage1 + 1 byte demand (0..200 => %) + 1 byte qualification + 1 byte system_stage1_echo
-    # plus checksum in adapter format
-    if code == "3110":
-        d = strip_checksum(4)
-        if len(d) >= 4:
-            stage1 = d[0]
-            demand = d[1]
-            qual = d[2]
-            stage1_echo = d[3]
-            percent = None if demand == 0xFC else _pct_from_0_200(demand)
-            return {
-                "meaning": "Heat/Cool demand",
-                "percent": percent,
-                "force_off": demand == 0xFC,
-                "system_stage1": stage1,
-                "qualification": qual,
-                "system_stage1_echo": stage1_echo,
-            }
-        return {"meaning": "Heat/Cool demand", "decode_error": "payload_too_short", "payload": data.hex().upper()}
-
-    # 3114 — Boiler Heat/Cool Demand
-    if code == "3114":
-        d = strip_checksum(4)
-        if len(d) >= 4:
-            stage1 = d[0]
-            demand = d[1]
-            qual = d[2]
-            stage1_echo = d[3]
-            percent = None if demand == 0xFC else _pct_from_0_200(demand)
-            return {
-                "meaning": "Boiler heat/cool demand",
-                "percent": percent,
-                "force_off": demand == 0xFC,
-                "system_stage1": stage1,
-                "qualification": qual,
-                "system_stage1_echo": stage1_echo,
-            }
-        return {"meaning": "Boiler heat/cool demand", "decode_error": "payload_too_short", "payload": data.hex().upper()}
-
-    # 3120 — Alarm
-    # R: 1 byte alarm_type + 1 byte alarm_status
-    if code == "3120":
-        d = strip_checksum(2)
-        if len(d) >= 2:
-            at = d[0]
-            st = d[1]
-            return {
-                "meaning": "Alarm",
-                "alarm_type": f"0x{at:02X}",
-                "alarm_type_text": _ALARM_TYPE.get(at, "Unknown"),
-                "alarm_status": f"0x{st:02X}",
-                "active": st == 0x01,  # PDF: 01 indicates alarm present
-            }
-        return {"meaning": "Alarm", "decode_error": "payload_too_short", "payload": data.hex().upper()}
-
-    # 3200 — Boiler Temperature
-    # R: 2 bytes supply (0.01C) + 2 bytes return (0.01C)
-    if code == "3200":
-        d = strip_checksum(4)
-        if len(d) >= 4:
-            sup = _u16_be(d[0:2])
-            ret = _u16_be(d[2:4])
-            return {
-                "meaning": "Boiler temperature",
-                "supply_c": None if sup == 0x7FFF else _c_from_u16_0p01(sup),
-                "return_c": None if ret == 0x7FFF else _c_from_u16_0p01(ret),
-            }
-        return {"meaning": "Boiler temperature", "decode_error": "payload_too_short", "payload": data.hex().upper()}
-
-    # 3E70 — Device Status
-    # R: 8 bytes (plus checksum in adapter format)
-    # From figures: byte0 instantaneous state, byte2 sequence state, last 2 bytes flame current (nA)
-    if code == "3E70":
-        d = strip_checksum(8)
-        if len(d) >= 8:
-            inst = d[0]
-            unk1 = d[1]
-            seq = d[2]
-            flame_raw = _u16_be(d[6:8])
-            return {
-                "meaning": "Device status",
-                "instantaneous_state": f"0x{inst:02X}",
-                "instantaneous_text": _DEVICE_STATUS_INST.get(inst, "Unknown"),
-                "sequence_state": f"0x{seq:02X}",
-                "sequence_text": _DEVICE_STATUS_SEQ.get(seq, "Unknown"),
-                "flame_current_na": flame_raw,
-                "field_1": f"0x{unk1:02X}",
-                "reserved": d[3:6].hex().upper(),
-            }
-        return {"meaning": "Device status", "decode_error": "payload_too_short", "payload": data.hex().upper()}
-
-    return None
+    items = items if isinstance(items, list) else list(items)
+    groups: Dict[Tuple[str, int, bool], List[int]] = {}
+    for i, (code, payload) in enumerate(items):
+        try:
+            groups[code, len(payload), payload.__class__ is str].append(i)
+        except KeyError:
+            groups[code, len(payload), payload.__class__ is str] = [i]
+
+    result: Dict[str, Batch] = {}
+    for (code, length, is_hex), index in groups.items():
+        if code not in _REGISTRY:
+            code = (code or "").upper().strip()
+            if code not in _REGISTRY:
+                continue
+        batch = result.get(code)
+        if batch is None:
+            entry = _LAYOUTS.get(code)
+            batch = result[code] = Batch(code, entry[0] if entry else None)
+
+        payloads = [items[i][1] for i in index]
+        n = length // 2 if is_hex else length
+        data = _group_bytes(payloads, is_hex) if not (is_hex and length % 2) else None
+        if data is None or len(data) != n * len(index):
+            # oneven/ongeldige hex of spaties: per rij omzetten, zoals decode()
+            by_len: Dict[int, Tuple[List[int], List[bytes]]] = {}
+            for i, p in zip(index, payloads):
+                try:
+                    d = _hex_to_bytes(p)
+                except ValueError:
+                    batch.errors.append(i)
+                    continue
+                rows = by_len.setdefault(len(d), ([], []))
+                rows[0].append(i)
+                rows[1].append(d)
+            for n, (rows_index, rows_data) in by_len.items():
+                _decode_group(batch, code, n, rows_index, b"".join(rows_data))
+            continue
+        _decode_group(batch, code, n, index, data)
+    return result
+
+
+def _decode_group(batch: Batch, code: str, n: int, index: List[int], data: bytes) -> None:
+    entry = _LAYOUTS.get(code)
+    if entry is not None:
+        _decode_layout_rows(batch, entry[1], n, index, data)
+    else:
+        rows = [data[k:k + n] for k in range(0, len(data), n)] if n else [b""] * len(index)
+        _decode_rows(batch, _REGISTRY[code], index, rows)
+
+
+# ---------------------------------------------------------------------------
+# Message classes (PDF 69-2644)
+# ---------------------------------------------------------------------------
+
+# 1081 — Supply High Limit
+# R: 2 bytes setpoint (0.01C) + 2 bytes differential (0.01C) + 1 byte status
+register(
+    "1081", "Supply High Limit",
+    Layout("HHB",
+           ("setpoint_c", 0, _c_from_u16_0p01),
+           ("differential_c", 1, _c_from_u16_0p01),
+           ("status", 2, None)),
+)
+
+# 10A0 — DHW Setpoint
+# C: 2 bytes setpoint (0.01C) (plus optional checksum)
+# R: 2 bytes setpoint + 1 byte reserved + 2 bytes differential
+register(
+    "10A0", "DHW setpoint",
+    Layout("H", ("setpoint_c", 0, _c_from_u16_0p01), max_len=3),
+    Layout("HBH",
+           ("setpoint_c", 0, _c_from_u16_0p01),
+           ("differential_c", 2, _c_from_u16_0p01),
+           ("reserved", 1, None)),
+    error="unexpected_length",
+)
+
+# 10A1 — DHW Setpoint Limits
+# R: 2 bytes max sp + 2 bytes min sp + 2 bytes max diff + 2 bytes min diff (0.01C)
+register(
+    "10A1", "DHW setpoint limits",
+    Layout("HHHH",
+           ("max_setpoint_c", 0, _c_from_u16_0p01),
+           ("min_setpoint_c", 1, _c_from_u16_0p01),
+           ("max_diff_c", 2, _c_from_u16_0p01),
+           ("min_diff_c", 3, _c_from_u16_0p01)),
+)
+
+
+# 10E0 — Node Identification (OS Number)
+# Legacy: leading 2 bytes 0000, then 6 bytes (6-bit+32) => 8 chars
+# New: ASCII string (e.g. "1015C") in payload (minus checksum)
+Msg10E0 = message_class("Msg10E0", "10E0", "Node identification (OS number)", (("os_number", "value", 0, None),))
+
+
+def _decode_10e0(data: bytes) -> Message:
+    meaning = Msg10E0.meaning
+    # try ASCII form first (strip checksum if present)
+    d = data[:-1] if len(data) and all(32 <= b <= 126 for b in data[:-1]) else data
+    if len(d) and all(32 <= b <= 126 for b in d):
+        return Msg10E0._from_values((d.decode(errors="ignore").strip(),))
+
+    if len(data) >= 8 and data[0:2] == b"\x00\x00":
+        return Msg10E0._from_values((_sixbit_ascii_decode(data[2:8]).strip(),))
+
+    return _error(meaning, "unsupported_format", data)
+
+
+register_decoder("10E0", _decode_10e0)
+
+# 10E1 — Node Identification (Software/Version)
+# R: 9 bytes total (plus optional checksum). PDF shows: unit-id + func? + major + minor + ... + checksum
+register(
+    "10E1", "Node identification (software version)",
+    Layout("BBBB5s",
+           ("functional_unit_id", 0, _hex8),
+           ("field_1", 1, _hex8),
+           ("major", 2, None),
+           ("minor", 3, None),
+           ("tail", 4, _hexstr)),
+)
+
+# 1260 — DHW Cylinder Temperature
+# R: 3 x 2 bytes temps (0.01C): cyl / top / bottom
+register(
+    "1260", "DHW cylinder temperature",
+    Layout("HHH",
+           ("cylinder_c", 0, _c_from_u16_0p01),
+           ("top_c", 1, _c_from_u16_0p01),
+           ("bottom_c", 2, _c_from_u16_0p01)),
+)
+
+# 1280 — Outdoor Humidity
+# R: 1 byte humidity + 2 bytes temp (0.01C) + 2 bytes dewpoint (0.01C) + 1 byte reserved
+register(
+    "1280", "Outdoor humidity",
+    Layout("BHHB",
+           ("rh_percent", 0, float),
+           ("temperature_c", 1, _c_or_none),
+           ("dewpoint_c", 2, _c_or_none),
+           ("reserved", 3, None)),
+)
+
+# 1290 — Outdoor Temperature
+# R: 2 bytes signed (0.01C), 7FFF = not available
+register(
+    "1290", "Outdoor temperature",
+    Layout("h", ("value_c", 0, _c_or_none)),
+)
+
+# 12C0 — Displayed Temperature
+# R: 1 byte temp + 1 byte units + 1 byte reserved
+# units: 00 => Fahrenheit (integer); 01 => Celsius (value * 0.5)
+_S_12C0 = struct.Struct(">BBB")
+
+
+_MEANING_12C0 = "Displayed temperature"
+Msg12C0F = message_class("Msg12C0F", "12C0", _MEANING_12C0, (("value_f", "value", 0, float), ("units", "value", 1, None)))
+Msg12C0C = message_class("Msg12C0C", "12C0", _MEANING_12C0, (("value_c", "value", 0, None), ("units", "value", 1, None)))
+Msg12C0 = message_class(
+    "Msg12C0", "12C0", _MEANING_12C0,
+    (("raw_value", "value", 0, None), ("units_code", "value", 1, None), ("reserved", "value", 2, None)),
+)
+
+
+def _decode_12c0(data: bytes) -> Message:
+    if len(data) < 3:
+        return _error(_MEANING_12C0, "payload_too_short", data)
+    val, units, reserved = _S_12C0.unpack_from(data)
+    if units == 0x00:
+        return Msg12C0F._from_values((val, "F"))
+    if units == 0x01:
+        return Msg12C0C._from_values((val / 2.0, "C"))
+    return Msg12C0._from_values((val, units, reserved))
+
+
+register_decoder("12C0", _decode_12c0)
+
+# 22D9 — Desired Boiler Setpoint
+# R: 2 bytes setpoint (0.01C)
+register(
+    "22D9", "Desired boiler setpoint",
+    Layout("H", ("setpoint_c", 0, _c_from_u16_0p01)),
+)
+
+# 22DB — Central Heat Setpoint
+# C: 2 bytes setpoint (0.01C)
+# R: 2 bytes setpoint + 2 bytes differential (0.01C)
+register(
+    "22DB", "Central heat setpoint",
+    Layout("H", ("setpoint_c", 0, _c_from_u16_0p01), max_len=3),
+    Layout("HH",
+           ("setpoint_c", 0, _c_from_u16_0p01),
+           ("differential_c", 1, _c_from_u16_0p01)),
+    error="unexpected_length",
+)
+
+# 30D0 — DHW Demand
+# R: 1 byte demand (0..200 => 0..100%), + 1 byte equipment status/type
+# demand can be FC for "force off"
+# PDF: 0x10 = gas, LSB indicates on/off (examples: 0x10 off, 0x11 on)
+register(
+    "30D0", "DHW demand",
+    Layout("BB",
+           ("percent", 0, _pct_or_none),
+           ("force_off", 0, _is_force_off),
+           ("equipment", 1, lambda v: "gas" if (v & 0x10) else "unknown"),
+           ("on", 1, lambda v: bool(v & 0x01)),
+           ("status", 1, _hex8)),
+)
+
+# 3110 — Heat/Cool Demand
+# R (PDF): 1 byte system_stage1 + 1 byte demand (0..200 => %) + 1 byte qualification + 1 byte system_stage1_echo
+# plus checksum in adapter format
+_DEMAND_FIELDS = (
+    ("percent", 1, _pct_or_none),
+    ("force_off", 1, _is_force_off),
+    ("system_stage1", 0, None),
+    ("qualification", 2, None),
+    ("system_stage1_echo", 3, None),
+)
+register("3110", "Heat/Cool demand", Layout("BBBB", *_DEMAND_FIELDS))
+
+# 3114 — Boiler Heat/Cool Demand
+register("3114", "Boiler heat/cool demand", Layout("BBBB", *_DEMAND_FIELDS))
+
+# 3120 — Alarm
+# R: 1 byte alarm_type + 1 byte alarm_status
+register(
+    "3120", "Alarm",
+    Layout("BB",
+           ("alarm_type", 0, _hex8),
+           ("alarm_type_text", 0, _lookup(_ALARM_TYPE)),
+           ("alarm_status", 1, _hex8),
+           ("active", 1, lambda v: v == 0x01)),  # PDF: 01 indicates alarm present
+)
+
+# 3200 — Boiler Temperature
+# R: 2 bytes supply (0.01C) + 2 bytes return (0.01C)
+register(
+    "3200", "Boiler temperature",
+    Layout("HH",
+           ("supply_c", 0, _c_or_none),
+           ("return_c", 1, _c_or_none)),
+)
+
+# 3E70 — Device Status
+# R: 8 bytes (plus checksum in adapter format)
+# From figures: byte0 instantaneous state, byte2 sequence state, last 2 bytes flame current (nA)
+register(
+    "3E70", "Device status",
+    Layout("BBB3sH",
+           ("instantaneous_state", 0, _hex8),
+           ("instantaneous_text", 0, _lookup(_DEVICE_STATUS_INST)),
+           ("sequence_state", 2, _hex8),
+           ("sequence_text", 2, _lookup(_DEVICE_STATUS_SEQ)),
+           ("flame_current_na", 4, None),
+           ("field_1", 1, _hex8),
+           ("reserved", 3, _hexstr)),
+)
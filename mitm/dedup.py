@@ -0,0 +1,89 @@
+# mitm/dedup.py
+# Onderdrukking van RF-herhalingen vóór parse/decode.
+#
+# RAMSES-II-apparaten zenden hetzelfde frame vaak meerdere keren kort na
+# elkaar; evofw3 geeft elke kopie door. De sleutel is de regel zonder
+# RSSI (verb, adressen, code, lengte, payload): een kopie binnen `window`
+# seconden na de eerste doorgelaten kopie kost één slice en één dict-
+# lookup. Het venster schuift niet mee met onderdrukte kopieën, zodat een
+# apparaat dat continu hetzelfde zendt nog elke `window` seconden zichtbaar
+# blijft.
+#
+# Verlopen gaat via een timing wheel: het venster is verdeeld in `slots`
+# ticks, elke tick heeft een bak met de sleutels die toen zijn ingevoegd.
+# Bij het doorschuiven van de klok worden alleen de verlopen bakken
+# geleegd, dus het geheugen blijft begrensd tot wat binnen één venster
+# binnenkomt en er is geen periodieke scan over de hele tabel.
+import time
+from collections import Counter
+
+# offset van de code in een evofw3-regel ("045  I --- 01:...")
+_CODE = slice(41, 45)
+
+
+class Deduplicator:
+    """Drops repeated copies of an RF frame seen within ``window`` seconds."""
+
+    def __init__(self, window=1.0, slots=8, clock=time.monotonic):
+        if window <= 0:
+            raise ValueError("dedup window must be positive")
+        self.window = window
+        self.clock = clock
+        self._ticks = slots
+        self._resolution = window / slots
+        # tick t gebruikt bak t % (slots + 1); zo is de bak die hergebruikt
+        # wordt altijd ouder dan het venster
+        self._wheel = [[] for _ in range(slots + 1)]
+        self._seen = {}
+        self._tick = int(clock() / self._resolution)
+        self.passed = 0
+        self.suppressed = Counter()
+
+    def __len__(self):
+        return len(self._seen)
+
+    def stats(self):
+        """Suppressed copies per code."""
+        return {code.decode("ascii", "replace"): n for code, n in self.suppressed.items()}
+
+    def _advance(self, tick):
+        wheel = self._wheel
+        size = len(wheel)
+        if tick - self._tick >= size:
+            # langer stil dan het hele venster: alles is verlopen
+            self._seen.clear()
+            for bucket in wheel:
+                bucket.clear()
+        else:
+            seen = self._seen
+            for t in range(self._tick + 1, tick + 1):
+                bucket = wheel[t % size]
+                expired = t - size
+                for key in bucket:
+                    # opnieuw ingevoegd na verlopen: staat in een nieuwere bak
+                    if seen.get(key) == expired:
+                        del seen[key]
+                bucket.clear()
+        self._tick = tick
+
+    def filter(self, frames):
+        """The frames from ``frames`` that are not a repeat within the window."""
+        tick = int(self.clock() / self._resolution)
+        if tick != self._tick:
+            self._advance(tick)
+        seen = self._seen
+        ticks = self._ticks
+        bucket = self._wheel[tick % len(self._wheel)]
+        out = []
+        for raw in frames:
+            # RSSI (en de spatie-uitlijning van " I") hoort niet bij het frame
+            key = raw[5:] if raw[4:5] == b" " else raw[4:]
+            prev = seen.get(key)
+            if prev is not None and tick - prev < ticks:
+                self.suppressed[raw[_CODE]] += 1
+                continue
+            seen[key] = tick
+            bucket.append(key)
+            out.append(raw)
+        self.passed += len(out)
+        return out
@@ -0,0 +1,149 @@
+# mitm/filters.py
+# Include/exclude-regels op ruwe RF-regels, vóór parse en decode.
+#
+# Regels komen uit config (`filters`): per regel velden code, verb, src,
+# dst, addr (src of dst), type/src_type/dst_type (apparaattype, bijv. 01
+# of "controller"); een lijst binnen een veld = één van, meerdere velden
+# = allemaal. Een frame gaat door als het op een include-regel past (of
+# er geen include-regels zijn) en op geen enkele exclude-regel.
+#
+# Bij het laden worden de regels omgezet naar één Python-expressie met
+# alleen slices op vaste offsets van de evofw3-regel en set-lookups, en
+# eenmalig gecompileerd. Regels met één veld worden per veld samengevoegd
+# tot één set. Niet-canonieke regels worden eerst genormaliseerd; regels
+# die geen RAMSES-II-frame zijn passen op geen enkele regel.
+from mitm.ramses import _normalise
+
+# veld → offsets in de canonieke regel (één of meer; meer = één van)
+FIELDS = {
+    "code": ((41, 45),),
+    "verb": ((4, 6),),
+    "src": ((11, 20),),
+    "dst": ((21, 30),),
+    "addr": ((11, 20), (21, 30)),
+    "type": ((11, 13), (21, 23)),
+    "src_type": ((11, 13),),
+    "dst_type": ((21, 23),),
+}
+
+# gangbare RAMSES-II apparaattypes (eerste twee cijfers van het adres)
+DEVICE_TYPES = {
+    "controller": "01",
+    "ufh": "02",
+    "trv": "04",
+    "dhw": "07",
+    "otb": "10",
+    "bdr": "13",
+    "hgi": "18",
+    "thermostat": "34",
+}
+
+
+def _values(field, value):
+    values = value if isinstance(value, (list, tuple, set)) else [value]
+    out = set()
+    for v in values:
+        v = str(v)
+        if field == "code":
+            # YAML maakt van 1290 een int en van 0004 een 4
+            v = v.upper().zfill(4)
+        elif field == "verb":
+            v = v.upper().rjust(2)
+        elif field.endswith("type"):
+            v = DEVICE_TYPES.get(v.lower(), v).zfill(2)
+        out.add(v.encode("ascii"))
+    return frozenset(out)
+
+
+def _compile_rules(rules, namespace):
+    """Rules → Python expression over ``l`` (the canonical line), or None if empty."""
+    merged = {}
+    exprs = []
+    for rule in rules:
+        unknown = set(rule) - set(FIELDS)
+        if unknown or not rule:
+            raise ValueError(f"filter rule {rule!r}: unknown or missing fields {sorted(unknown)}")
+        checks = [(field, _values(field, value)) for field, value in rule.items()]
+        if len(checks) == 1:
+            field, values = checks[0]
+            merged[field] = merged.get(field, frozenset()) | values
+            continue
+        exprs.append(" and ".join(_check(field, values, namespace) for field, values in checks))
+    exprs[:0] = [_check(field, values, namespace) for field, values in merged.items()]
+    if not exprs:
+        return None
+    return " or ".join(f"({e})" for e in exprs)
+
+
+def _check(field, values, namespace):
+    name = f"_v{len(namespace)}"
+    namespace[name] = values
+    return "(" + " or ".join(f"l[{a}:{b}] in {name}" for a, b in FIELDS[field]) + ")"
+
+
+class FrameFilter:
+    """Compiled include/exclude predicate on raw evofw3 lines."""
+
+    def __init__(self, include=(), exclude=(), name="all"):
+        self.name = name
+        namespace = {"_normalise": _normalise}
+        inc = _compile_rules(include or (), namespace)
+        exc = _compile_rules(exclude or (), namespace)
+        test = " and ".join(
+            part for part in (inc and f"({inc})", exc and f"not ({exc})") if part
+        ) or "True"
+        source = (
+            "def match(raw):\n"
+            # snelle vormcheck; anders normaliseren (of b"": past nergens op)
+            "    l = raw if len(raw) > 49 and raw[3] == 32 and raw[40] == 32 and raw[45] == 32 "
+            "else (_normalise(raw) or b'')\n"
+            f"    return {test}\n"
+        )
+        exec(compile(source, f"<filter {name}>", "exec"), namespace)
+        self.match = namespace["match"]
+        self.source = source
+        self.dropped = 0
+
+    @classmethod
+    def from_config(cls, name, spec):
+        spec = spec or {}
+        return cls(spec.get("include"), spec.get("exclude"), name)
+
+    def filter(self, frames):
+        """The frames that pass; the rest is counted in ``dropped``."""
+        match = self.match
+        out = [raw for raw in frames if match(raw)]
+        self.dropped += len(frames) - len(out)
+        return out
+
+
+class FilteredSink:
+    """Wraps a sink so that it only sees frames passing its own rule set."""
+
+    def __init__(self, inner, frame_filter):
+        self.inner = inner
+        self.name = inner.name
+        self.blocking = inner.blocking
+        self.filter = frame_filter
+
+    def handle(self, frame, decoded):
+        if self.filter.match(frame.raw):
+            self.inner.handle(frame, decoded)
+        else:
+            self.filter.dropped += 1
+
+
+def build(filters):
+    """
+    Config ``filters`` → (pre-parse FrameFilter or None, {sink name: FrameFilter}).
+    Key ``all`` applies before parsing, other keys are sink names.
+    """
+    pre = None
+    per_sink = {}
+    for name, spec in (filters or {}).items():
+        frame_filter = FrameFilter.from_config(name, spec)
+        if name == "all":
+            pre = frame_filter
+        else:
+            per_sink[name] = frame_filter
+    return pre, per_sink
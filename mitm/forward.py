@@ -0,0 +1,127 @@
+# mitm/forward.py
+# Doorgeefmodus: frames worden direct na het lezen teruggestuurd naar de
+# stick (of naar een tweede stick). Alleen 1F09 wordt herschreven, in de
+# hex-bytes van de regel zelf; alle andere frames gaan ongeparsed door.
+# Regels die geen RAMSES-II-frame zijn (evofw3-banner, #/!-statusregels,
+# CRC-fouten, ruis) worden nooit naar TX gestuurd: die kunnen de stick
+# herconfigureren.
+import logging
+import time
+
+from mitm.ramses import _is_canonical, _normalise, parse_frame, patch_ch_value
+
+# Onze eigen uitzendingen komen via de stick terug; binnen dit venster
+# worden ze niet nogmaals doorgegeven.
+_ECHO_WINDOW = 2.0
+
+
+class Forwarder:
+    """
+    ``handle(raw, t_read)`` forwards one received line if it is a valid
+    RAMSES-II frame (normalised first, counted in ``rejected`` otherwise).
+    The RSSI column is dropped (evofw3 TX lines start at the verb). A 1F09 rewrite that takes
+    longer than ``budget`` seconds since ``t_read``, or for which the
+    limiter raises, is discarded and the original frame is sent instead;
+    the limiter is then rolled back to its state before that frame.
+    """
+
+    def __init__(self, tx, limiter, budget=0.02, metrics=None, sent=None):
+        self.tx = tx
+        self.limiter = limiter
+        self.budget = budget
+        self.metrics = metrics
+        # gedeeld tussen sticks op één locatie: wat stick A uitzendt en
+        # stick B hoort is voor B ook een echo
+        self._sent = {} if sent is None else sent
+        self._purged = 0.0
+        self.forwarded = 0
+        self.rewritten = 0
+        self.over_budget = 0
+        self.echoes = 0
+        self.rejected = 0
+        self.errors = 0
+
+    def stats(self):
+        return {
+            "forwarded": self.forwarded,
+            "rewritten": self.rewritten,
+            "over_budget": self.over_budget,
+            "echoes": self.echoes,
+            "rejected": self.rejected,
+            "errors": self.errors,
+        }
+
+    def handle(self, raw, t_read):
+        line = raw if _is_canonical(raw) else _normalise(raw)
+        if line is None:
+            self.rejected += 1
+            return
+        # TX-regel begint bij het verb: RSSI-kolom en uitlijnspatie vervallen
+        body = line[5:] if line[4] == 32 else line[4:]
+        sent = self._sent
+        if body in sent:
+            self.echoes += 1
+            return
+
+        out = body
+        if line[41:45] == b"1F09":
+            out = self._rewrite(line, body, t_read)
+
+        self.tx.write_frame(out)
+        self.forwarded += 1
+
+        now = time.monotonic()
+        sent[out] = now
+        if now - self._purged > _ECHO_WINDOW:
+            self._purged = now
+            for key in [k for k, t in sent.items() if now - t > _ECHO_WINDOW]:
+                del sent[key]
+
+    def _rewrite(self, line, body, t_read):
+        frame = parse_frame(line)
+        if frame is None:
+            return body
+        requested = frame.get_ch_value()
+        if requested is None:
+            return body
+
+        elapsed = time.perf_counter() - t_read
+        if elapsed > self.budget:
+            # budget al op: limiter niet raadplegen
+            return self._over_budget(body, elapsed)
+
+        limiter = self.limiter
+        checkpoint = limiter.checkpoint()
+        try:
+            value = limiter.limit(requested)
+        except Exception:
+            # een fout in limiter/curve mag de 1F09 niet tegenhouden
+            limiter.rollback(checkpoint)
+            self.errors += 1
+            logging.exception("CH limiter failed, forwarding original 1F09")
+            return body
+        if value is None or value == requested:
+            return body
+
+        buf = bytearray(body)
+        patch_ch_value(buf, value)
+
+        elapsed = time.perf_counter() - t_read
+        if self.metrics is not None:
+            self.metrics.observe("rewrite", elapsed)
+        if elapsed > self.budget:
+            # het origineel gaat de lucht in: de ramp mag niet verder staan
+            limiter.rollback(checkpoint)
+            return self._over_budget(body, elapsed)
+
+        self.rewritten += 1
+        logging.debug("1F09 CH setpoint %.1f → %.1f °C", requested, value)
+        return bytes(buf)
+
+    def _over_budget(self, body, elapsed):
+        self.over_budget += 1
+        logging.warning(
+            "1F09 rewrite took %.1f ms (budget %.1f ms), forwarding original",
+            elapsed * 1000, self.budget * 1000,
+        )
+        return body
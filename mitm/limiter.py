@@ -1,9 +1,11 @@
 import time
 
 class CHLimiter:
-    def __init__(self, cfg, context, adaptive):
+    def __init__(self, cfg, context, adaptive, clock=time.time, metrics=None):
         self.context = context
+        self.clock = clock
         self.adaptive = adaptive
+        self.metrics = metrics
 
         self.base_max = cfg.ch_max
         self.ramp_step = cfg.ramp_step
@@ -19,12 +21,34 @@ class CHLimiter:
         return adaptive_max if adaptive_max is not None else self.base_max
 
     def process(self, frame):
+        if not frame.is_ch_setpoint():
+            return frame
+
         requested = frame.get_ch_value()
         if requested is None:
             return frame
 
+        return frame.with_new_ch(self.limit(requested))
+
+    def limit(self, requested):
+        """Apply the CH-max and ramp to a requested setpoint (°C)."""
+        if self.metrics is None:
+            return self._limit(requested)
+        t = time.perf_counter()
+        value = self._limit(requested)
+        self.metrics.observe("limiter", time.perf_counter() - t)
+        return value
+
+    def checkpoint(self):
+        """Ramp state, to undo a limit() whose result was not sent."""
+        return self.last_value, self.last_time
+
+    def rollback(self, state):
+        self.last_value, self.last_time = state
+
+    def _limit(self, requested):
         target = min(requested, self.effective_max())
-        now = time.time()
+        now = self.clock()
 
         if self.last_value is None or target < self.last_value:
             self.last_value = target
@@ -35,4 +59,4 @@ class CHLimiter:
             )
             self.last_time = now
 
-        return frame.with_new_ch(self.last_value)
+        return self.last_value
@@ -0,0 +1,102 @@
+# mitm/logsetup.py
+# Niet-blokkerend loggen voor de per-frame RF-log.
+#
+# Met `logging.async: true` gaan records via een begrensde queue naar een
+# QueueListener-thread; opmaak (msg % args) en schrijven naar stdout
+# gebeuren daar, niet op het RF-pad. Bij een volle queue wordt een record
+# weggegooid en geteld in plaats van te wachten.
+import atexit
+import logging
+import queue
+import time
+from collections import Counter
+from logging.handlers import QueueHandler, QueueListener
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread."""
+
+    def __init__(self, q):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Standaard formatteert QueueHandler hier al; args zijn bij ons
+        # onveranderlijk (str/float), dus dat kan veilig later.
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_handler = None
+
+
+def configure(cfg):
+    """Move the root handlers behind a queue when ``cfg.log_async`` is set."""
+    global _handler
+    if not cfg.log_async or _handler is not None:
+        return None
+
+    root = logging.getLogger()
+    handlers = list(root.handlers)
+    q = queue.Queue(cfg.log_queue_size)
+    _handler = _DeferredQueueHandler(q)
+    listener = QueueListener(q, *handlers, respect_handler_level=True)
+    root.handlers[:] = [_handler]
+    listener.start()
+    atexit.register(listener.stop)
+    return _handler
+
+
+def dropped():
+    return _handler.dropped if _handler is not None else 0
+
+
+def _code_key(code):
+    # YAML maakt van 1290 een int en van 0004 een 4
+    return str(code).upper().zfill(4)
+
+
+class CodeSampler:
+    """
+    Per-code log throttling, checked before a log line is built.
+
+    ``every``: {code: N} logs one frame in N; ``per_minute``: {code: N}
+    logs at most N frames per code per minute.
+    """
+
+    def __init__(self, every=None, per_minute=None):
+        self.every = {_code_key(k): int(v) for k, v in (every or {}).items() if int(v) > 1}
+        self.per_minute = {_code_key(k): int(v) for k, v in (per_minute or {}).items()}
+        self.suppressed = Counter()
+        self._seen = Counter()
+        self._window = {}
+
+    def __bool__(self):
+        return bool(self.every or self.per_minute)
+
+    def allow(self, code):
+        n = self.every.get(code)
+        if n is not None:
+            seen = self._seen[code]
+            self._seen[code] = seen + 1
+            if seen % n:
+                self.suppressed[code] += 1
+                return False
+
+        limit = self.per_minute.get(code)
+        if limit is not None:
+            now = time.monotonic()
+            start, count = self._window.get(code, (now, 0))
+            if now - start >= 60.0:
+                start, count = now, 0
+            if count >= limit:
+                self.suppressed[code] += 1
+                self._window[code] = (start, count)
+                return False
+            self._window[code] = (start, count + 1)
+        return True
@@ -1,11 +1,15 @@
 # mitm/main.py
+import asyncio
+import atexit
 import os
 import logging
-import re
+import signal
 
+from mitm import logsetup, sinks
 from mitm.config import Config
+from mitm.decoder import decode_cache
+from mitm.pipeline import Pipeline
 from mitm.serial_if import SerialInterface
-from mitm.decoder import decode
 
 log_level = os.getenv("LOG_LEVEL", "INFO").upper()
 logging.basicConfig(
@@ -13,125 +17,233 @@ logging.basicConfig(
     format="%(asctime)s %(levelname)s %(message)s",
 )
 
-# Voorbeeld frame:
-# 095 RQ --- 18:262143 10:061315 --:------ 3220 005 00C0000300
-_FRAME_RE = re.compile(
-    r"^\s*(?P<rssi>\d+)\s+(?P<verb>RQ|RP|I)\s+---\s+"
-    r"(?P<src>\d{2}:\d{6})\s+"
-    r"(?P<dst>\d{2}:\d{6}|--:------)\s+"
-    r"(?P<via>--:------|\d{2}:\d{6})\s+"
-    r"(?P<code>[0-9A-F]{4})\s+"
-    r"(?P<len>[0-9A-F]{3})\s+"
-    r"(?P<payload>[0-9A-F]+)\s*$",
-    re.IGNORECASE,
-)
+
+def _exit_on_sigterm(signum, frame):
+    # docker stop stuurt SIGTERM; via SystemExit lopen de atexit-handlers
+    # (recorder, snapshot) nog, zonder handler zou het proces direct stoppen
+    logging.info("SIGTERM received, shutting down")
+    raise SystemExit(0)
 
 
-def _parse_frame(text: str):
-    m = _FRAME_RE.match(text.strip())
-    if not m:
-        return None
-    return {
-        "rssi": int(m.group("rssi")),
-        "verb": m.group("verb").upper(),
-        "src": m.group("src"),
-        "dst": m.group("dst"),
-        "via": m.group("via"),
-        "code": m.group("code").upper(),
-        "payload": m.group("payload").upper(),
-        "raw": text.strip(),
-    }
-
-
-def _format_decoded(d: dict) -> str:
-    # Eén compacte “business-grade” beschrijving per frame
-    meaning = d.get("meaning", "known")
-
-    # Prefer meest relevante velden (temperaturen/setpoints/percent)
-    if "percent" in d and d["percent"] is not None:
-        return f"{meaning} | {d['percent']:.1f}%"
-    if d.get("force_off"):
-        return f"{meaning} | force_off"
-    if "setpoint_c" in d:
-        sp = d["setpoint_c"]
-        if sp is None:
-            return f"{meaning} | setpoint=N/A"
-        extra = []
-        if "differential_c" in d and d["differential_c"] is not None:
-            extra.append(f"diff={d['differential_c']:.2f}°C")
-        return f"{meaning} | setpoint={sp:.2f}°C" + (f" ({', '.join(extra)})" if extra else "")
-    if "value_c" in d:
-        v = d["value_c"]
-        return f"{meaning} | {('N/A' if v is None else f'{v:.2f}°C')}"
-    if "supply_c" in d or "return_c" in d:
-        sup = d.get("supply_c")
-        ret = d.get("return_c")
-        sup_s = "N/A" if sup is None else f"{sup:.2f}°C"
-        ret_s = "N/A" if ret is None else f"{ret:.2f}°C"
-        return f"{meaning} | supply={sup_s} return={ret_s}"
-    if "os_number" in d:
-        return f"{meaning} | os={d['os_number']}"
-    if "alarm_type_text" in d:
-        return f"{meaning} | {d['alarm_type_text']} (active={d.get('active')})"
-    if meaning == "Device status":
-        inst = d.get("instantaneous_text", "Unknown")
-        seq = d.get("sequence_text", "Unknown")
-        flame = d.get("flame_current_na")
-        return f"{meaning} | inst={inst} seq={seq} flame={flame}nA"
-
-    # Fallback: alleen meaning
-    return meaning
+def _profiling_disabled(signum, frame):
+    # zonder handler zou SIGUSR1 (standaardactie: stoppen) de container doden
+    logging.warning("SIGUSR1 ignored: profiling is disabled (profile.enabled: false)")
 
 
 def main():
+    signal.signal(signal.SIGTERM, _exit_on_sigterm)
     cfg = Config.load()
-
-    serial = SerialInterface(
-        cfg.serial_device,
-        cfg.serial_baud,
-    )
-
-    logging.info("evohome-mitm started (RF observe-only mode)")
-
-    while True:
-        raw = serial.read_frame()
-        if not raw:
-            continue
-
-        if isinstance(raw, (bytes, bytearray)):
-            text = raw.decode(errors="ignore").strip()
-        else:
-            text = str(raw).strip()
-
-        if not text:
-            continue
-
-        parsed = _parse_frame(text)
-        if not parsed:
-            logging.info("RF %s", text)
-            continue
-
-        code = parsed["code"]
-        payload = parsed["payload"]
-
-        d = decode(code, payload)
-        if d:
-            summary = _format_decoded(d)
-            logging.info(
-                "RF %s %s --- %s %s %s %s %s | %s",
-                f"{parsed['rssi']:03d}",
-                parsed["verb"],
-                parsed["src"],
-                parsed["dst"],
-                parsed["via"],
-                code,
-                f"{len(payload)//2:03d}",
-                payload,
-                summary,
-            )
-        else:
-            # Exact 1 logregel per frame, maar zonder extra decode-regel
-            logging.info("RF %s", parsed["raw"])
+    logsetup.configure(cfg)
+    decode_cache.resize(cfg.cache_size)
+    sinks._summary_cache.resize(cfg.cache_size)
+
+    metrics = None
+    if cfg.metrics_enabled:
+        from mitm.metrics import Metrics
+
+        metrics = Metrics()
+
+    # per stick een eigen config (ch/context/forward kunnen afwijken)
+    stick_cfgs = [(stick["name"], cfg.for_stick(stick)) for stick in cfg.serial_sticks]
+    serials = [
+        SerialInterface(scfg.serial_device, scfg.serial_baud, scfg.serial_reader, metrics)
+        for _, scfg in stick_cfgs
+    ]
+    forward_enabled = any(scfg.forward_enabled for _, scfg in stick_cfgs)
+
+    # één Context per context-topic; sticks op dezelfde locatie delen die
+    contexts = {}
+    if forward_enabled:
+        from mitm.context import Context
+
+        for _, scfg in stick_cfgs:
+            if scfg.forward_enabled and scfg.context_topic not in contexts:
+                contexts[scfg.context_topic] = Context(scfg.context_signals)
+
+    client = None
+    if forward_enabled or cfg.mqtt_publish_raw or cfg.metrics_mqtt_interval or cfg.publish_enabled:
+        from mitm.mqtt_if import MQTTClient
+
+        client = MQTTClient(cfg, contexts.get(cfg.context_topic))
+        for topic, context in contexts.items():
+            client.add_context(topic, context)
+        try:
+            client.connect()
+        except OSError as e:
+            # fail-safe: zonder MQTT geldt de vaste CH-max uit config
+            logging.warning("MQTT connect to %s:%s failed: %s", cfg.mqtt_host, cfg.mqtt_port, e)
+
+    log_sink = sinks.LogSink(logsetup.CodeSampler(cfg.log_sample_every, cfg.log_max_per_minute), metrics)
+    if cfg.log_async:
+        # opmaak en I/O gebeuren op de QueueListener-thread
+        log_sink.blocking = False
+    outputs = [log_sink]
+    if cfg.mqtt_publish_raw:
+        outputs.append(sinks.MQTTSink(client))
+    state = None
+    if cfg.state_enabled:
+        from mitm.state import StateStore
+
+        state = StateStore()
+        outputs.append(state)
+    recorder = None
+    if cfg.recorder_enabled:
+        from mitm.recorder import Recorder
+
+        recorder = Recorder(
+            cfg.recorder_directory,
+            flush_interval=cfg.recorder_flush_interval,
+            rotate_interval=cfg.recorder_rotate_interval,
+            rotate_size=cfg.recorder_rotate_size_mb * 1024 * 1024,
+            retention_days=cfg.recorder_retention_days,
+        )
+        recorder.start()
+        atexit.register(recorder.close)
+        outputs.append(recorder)
+    publisher = None
+    if cfg.publish_enabled:
+        from mitm.publisher import ChangePublisher
+
+        publisher = ChangePublisher(
+            client,
+            prefix=cfg.publish_prefix,
+            deadband=cfg.publish_deadband,
+            deadbands=cfg.publish_deadbands,
+            max_interval=cfg.publish_max_interval,
+            retain=cfg.publish_retain,
+            fields=cfg.publish_fields,
+        )
+        outputs.append(publisher)
+
+    frame_filters = {}
+    pre_filter = None
+    if cfg.filters:
+        from mitm.filters import FilteredSink, build
+
+        pre_filter, sink_filters = build(cfg.filters)
+        unknown = set(sink_filters) - {sink.name for sink in outputs}
+        if unknown:
+            raise ValueError(f"filters for unknown or disabled sinks: {sorted(unknown)}")
+        outputs = [
+            FilteredSink(sink, sink_filters[sink.name]) if sink.name in sink_filters else sink
+            for sink in outputs
+        ]
+        frame_filters = dict(sink_filters)
+        if pre_filter is not None:
+            frame_filters["all"] = pre_filter
+
+    pipeline = Pipeline(outputs, cfg.queue_size, cfg.drop_policy, metrics)
+    pipeline.filter = pre_filter
+
+    mode = "RF observe-only mode"
+    forwarders = [None] * len(serials)
+    limiters = {}
+    if forward_enabled:
+        from mitm.adaptive import AdaptiveCHMax
+        from mitm.forward import Forwarder
+        from mitm.limiter import CHLimiter
+
+        # gedeelde echotabel: een herhaling van stick A is ook voor B een echo
+        sent = {}
+        for i, ((name, scfg), serial) in enumerate(zip(stick_cfgs, serials)):
+            if not scfg.forward_enabled:
+                continue
+            adaptive = AdaptiveCHMax(scfg)
+            limiter = CHLimiter(scfg, contexts[scfg.context_topic], adaptive, metrics=metrics)
+            limiters[name] = limiter
+            if client is not None:
+                client.adaptives.append(adaptive)
+            tx = serial
+            if scfg.forward_device:
+                tx = SerialInterface(scfg.forward_device, scfg.forward_baud)
+            forwarders[i] = Forwarder(tx, limiter, scfg.forward_budget_ms / 1000.0, metrics, sent)
+        mode = "RF forwarding mode"
+
+    if len(serials) == 1:
+        source = serials[0]
+        pipeline.forwarder = forwarders[0]
+    else:
+        from mitm.sticks import Stick, StickSet
+
+        source = StickSet(
+            [Stick(name, serial, fwd) for (name, _), serial, fwd in zip(stick_cfgs, serials, forwarders)],
+            cfg.serial_dedup_window,
+        )
+        mode += f", {len(serials)} sticks"
+
+    dedup = None
+    if cfg.dedup_enabled:
+        from mitm.dedup import Deduplicator
+
+        dedup = Deduplicator(cfg.dedup_window)
+        pipeline.dedup = dedup
+
+    warm = None
+    if cfg.snapshot_enabled:
+        from mitm.snapshot import WarmState
+
+        warm = WarmState(cfg.snapshot_path, cfg.snapshot_interval, cfg.snapshot_max_age, cfg.snapshot_size_kb * 1024)
+        warm.limiters = limiters
+        warm.contexts = contexts
+        warm.state = state
+        warm.restore()
+        warm.start()
+
+    profiler = None
+    if cfg.profile_enabled:
+        from mitm.profiler import Profiler
+
+        profiler = Profiler(cfg.profile_directory, cfg.profile_duration, cfg.profile_top, cfg.profile_sample_interval)
+        profiler.install()
+        if client is not None:
+            client.profiler = profiler
+            client.profile_topic = cfg.profile_topic
+            if cfg.profile_topic and client.client.is_connected():
+                client.client.subscribe(cfg.profile_topic)
+    else:
+        signal.signal(signal.SIGUSR1, _profiling_disabled)
+
+    if metrics is not None:
+        metrics.add_gauge("decode_cache", "Decode cache statistics", decode_cache.stats)
+        metrics.add_gauge("summary_cache", "Summary cache statistics", sinks._summary_cache.stats)
+        metrics.add_gauge("queue_dropped", "Frames dropped per pipeline queue", lambda: dict(pipeline.dropped))
+        metrics.add_gauge("log_dropped", "Log records dropped on a full log queue", logsetup.dropped)
+        if log_sink.sampler is not None:
+            metrics.add_gauge("log_suppressed", "Frames not logged by sampling/rate limit", lambda: dict(log_sink.sampler.suppressed))
+        if state is not None:
+            metrics.add_gauge("state_records", "Device/code records in the state table", state.__len__)
+        if recorder is not None:
+            metrics.add_gauge("recorder", "Binary recorder counters", recorder.stats)
+        if publisher is not None:
+            metrics.add_gauge("publish", "Change-of-value publisher counters", publisher.stats)
+        if frame_filters:
+            metrics.add_gauge("filtered", "Frames dropped by filter rules (all = before parsing)", lambda: {n: f.dropped for n, f in frame_filters.items()})
+        if dedup is not None:
+            metrics.add_gauge("dedup_suppressed", "Repeated RF frames dropped before parsing", dedup.stats)
+        if profiler is not None:
+            metrics.add_gauge("profile", "On-demand profiler runs", profiler.stats)
+        if warm is not None:
+            metrics.add_gauge("snapshot", "Warm-restart snapshot writes", warm.stats)
+        if client is not None:
+            metrics.add_gauge("mqtt", "MQTT outbox counters", client.stats)
+        if len(serials) > 1:
+            metrics.add_gauge("stick_frames", "Frames passed per stick", lambda: {n: s["frames"] for n, s in source.stats().items()})
+            metrics.add_gauge("stick_duplicates", "Frames dropped as seen by another stick", lambda: {n: s["duplicates"] for n, s in source.stats().items()})
+        for (name, _), fwd in zip(stick_cfgs, forwarders):
+            if fwd is not None:
+                gauge = "forward" if len(serials) == 1 else "forward_" + "".join(c if c.isalnum() else "_" for c in name)
+                metrics.add_gauge(gauge, f"Forwarding counters ({name})", fwd.stats)
+        if cfg.metrics_http_port:
+            metrics.serve(cfg.metrics_http_port)
+        if cfg.metrics_mqtt_interval:
+            metrics.publish_periodically(client, cfg.metrics_mqtt_interval)
+
+    if cfg.runtime_mode == "sync":
+        logging.info("evohome-mitm started (%s)", mode)
+        pipeline.run_sync(source)
+    else:
+        logging.info("evohome-mitm started (%s, async pipeline)", mode)
+        asyncio.run(pipeline.run_async(source))
 
 
 if __name__ == "__main__":
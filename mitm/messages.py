@@ -0,0 +1,154 @@
+# mitm/messages.py
+# Getypeerde, onveranderlijke resultaten van decoder.decode.
+#
+# Per message code (en per layout-variant) één klasse met __slots__.
+# Getallen worden bij het decoderen geschaald en opgeslagen; hex-weergaven
+# ("0x06", "AABBCC") en teksten uit opzoektabellen worden pas gemaakt als
+# iemand ze opvraagt. Als attribuut geven hex-velden de ruwe integer/bytes
+# terug, via de Mapping-interface de oude string-weergave.
+#
+# Message is een Mapping met dezelfde sleutels, volgorde en waarden als de
+# vroegere dicts, dus ``"decode_error" in d``, ``d.get(...)``, ``items()``
+# en vergelijken met een dict blijven werken; as_dict() geeft een gewone
+# dict.
+from collections.abc import Mapping
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+_new = object.__new__
+
+
+def _hex8(v: int) -> str:
+    return f"0x{v:02X}"
+
+
+def _hexstr(b: bytes) -> str:
+    return b.hex().upper()
+
+
+class Message(Mapping):
+    """Base class of decoded messages; see ``message_class``."""
+
+    __slots__ = ()
+
+    code: Optional[str] = None
+    meaning: Optional[str] = None
+    # sleutel → functie(message) → waarde zoals in de vroegere dict
+    _render: Dict[str, Any] = {}
+    _keys: Tuple[str, ...] = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __getitem__(self, key: str) -> Any:
+        render = self._render.get(key)
+        if render is None:
+            raise KeyError(key)
+        return render(self)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._render
+
+    def get(self, key: str, default: Any = None) -> Any:
+        render = self._render.get(key)
+        return default if render is None else render(self)
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {key: render(self) for key, render in self._render.items()}
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{key}={value!r}" for key, value in self.items() if key != "meaning")
+        return f"{type(self).__name__}({fields})"
+
+
+def _slot_getter(name):
+    return lambda m: getattr(m, name)
+
+
+def message_class(name: str, code: Optional[str], meaning: Optional[str],
+                  fields: Sequence[Tuple[str, str, int, Any]]) -> type:
+    """
+    Build a Message subclass.
+
+    ``fields`` are ``(key, kind, index, arg)`` in mapping order; ``index``
+    points into the tuple given to ``_from_values``:
+
+    - ``value``:  stored; ``arg`` is a scale function or None (stored as-is)
+    - ``hex8``:   stored as int, rendered as ``"0x%02X"``
+    - ``hexstr``: stored as bytes, rendered as upper-case hex
+    - ``lookup``: not stored; ``arg`` is a {int: text} table applied to the
+      raw integer at ``index`` (missing → ``"Unknown"``)
+
+    A ``meaning`` field makes the meaning per instance instead of per class.
+    """
+    stored = []  # (slot, index, scale)
+    render = {} if any(key == "meaning" for key, *_ in fields) else {"meaning": _slot_getter("meaning")}
+    props = {}
+    raw_slot = {}  # index → slot met de ruwe integer
+
+    for key, kind, index, arg in fields:
+        if kind in ("value", "hex8", "hexstr"):
+            stored.append((key, index, arg if kind == "value" else None))
+            if kind == "hex8" or (kind == "value" and arg is None):
+                raw_slot.setdefault(index, key)
+    for key, kind, index, arg in fields:
+        if kind == "lookup" and index not in raw_slot:
+            slot = raw_slot[index] = f"_raw{index}"
+            stored.append((slot, index, None))
+
+    for key, kind, index, arg in fields:
+        if kind == "value":
+            render[key] = _slot_getter(key)
+        elif kind == "hex8":
+            render[key] = (lambda slot: lambda m: _hex8(getattr(m, slot)))(key)
+        elif kind == "hexstr":
+            render[key] = (lambda slot: lambda m: _hexstr(getattr(m, slot)))(key)
+        elif kind == "lookup":
+            get = render[key] = (lambda slot, get: lambda m: get(getattr(m, slot), "Unknown"))(raw_slot[index], arg.get)
+            props[key] = property(get)
+        else:
+            raise ValueError(f"{name}: unknown field kind {kind!r}")
+
+    namespace = {
+        "__slots__": tuple(slot for slot, _, _ in stored),
+        "code": code,
+        "_render": render,
+        "_keys": tuple(render),
+    }
+    if "meaning" not in namespace["__slots__"]:
+        namespace["meaning"] = meaning
+    namespace.update(props)
+    cls = type(name, (Message,), namespace)
+
+    # _from_values(values): één gegenereerde functie, velden via de
+    # slot-descriptors gezet (om __setattr__ heen)
+    env = {"_new": _new, "cls": cls}
+    lines = ["def _from_values(v):", "    m = _new(cls)"]
+    for i, (slot, index, scale) in enumerate(stored):
+        env[f"_s{i}"] = cls.__dict__[slot].__set__
+        if scale is None:
+            lines.append(f"    _s{i}(m, v[{index}])")
+        else:
+            env[f"_f{i}"] = scale
+            lines.append(f"    _s{i}(m, _f{i}(v[{index}]))")
+    lines.append("    return m")
+    exec(compile("\n".join(lines), f"<message {name}>", "exec"), env)
+    cls._from_values = staticmethod(env["_from_values"])
+    return cls
+
+
+DecodeError = message_class(
+    "DecodeError", None, None,
+    (("meaning", "value", 0, None),
+     ("decode_error", "value", 1, None),
+     ("payload", "hexstr", 2, None)),
+)
+DecodeError.__doc__ = "Payload that matched no layout of its code; ``payload`` holds the raw bytes."
@@ -0,0 +1,175 @@
+# mitm/metrics.py
+# Latency-histogrammen en tellers voor het RF-pad.
+#
+# Alleen actief met `metrics.enabled: true`; uitgeschakeld worden de
+# getimede varianten van de stappen niet eens geïnstalleerd, zodat het
+# RF-pad dan geen extra werk doet.
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_TOPIC = "evohome/mitm/metrics"
+PREFIX = "evohome_mitm"
+
+# Bucket-grenzen in seconden: 1 µs … 100 ms
+BUCKETS = (
+    1e-6, 2.5e-6, 5e-6, 10e-6, 25e-6, 50e-6, 100e-6, 250e-6, 500e-6,
+    1e-3, 2.5e-3, 5e-3, 10e-3, 25e-3, 50e-3, 100e-3,
+)
+
+COUNTERS = {
+    "frames_in": "Lines read from the RF stick",
+    "parse_failures": "Lines that are not valid RAMSES-II frames",
+    "unknown_codes": "Frames with a message code the decoder does not know",
+    "decode_errors": "Frames whose payload could not be decoded",
+}
+
+
+class Histogram:
+    """Fixed-bucket histogram; counts are stored per bucket, rendered cumulative."""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bucket bound containing quantile ``q`` (None if empty)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class Metrics:
+    def __init__(self):
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.stages = {}
+        self._gauges = []
+        self._server = None
+
+    # --- hot path -----------------------------------------------------------
+
+    def inc(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, stage, seconds):
+        hist = self.stages.get(stage)
+        if hist is None:
+            hist = self.stages[stage] = Histogram()
+        hist.observe(seconds)
+
+    # --- uitlezen -----------------------------------------------------------
+
+    def add_gauge(self, name, help_, fn):
+        """``fn()`` returns a number or a dict {label_value: number} (label ``key``)."""
+        self._gauges.append((name, help_, fn))
+
+    def render(self):
+        """Prometheus text exposition format."""
+        out = []
+        for name, help_ in COUNTERS.items():
+            out.append(f"# HELP {PREFIX}_{name}_total {help_}")
+            out.append(f"# TYPE {PREFIX}_{name}_total counter")
+            out.append(f"{PREFIX}_{name}_total {self.counters.get(name, 0)}")
+
+        name = f"{PREFIX}_stage_seconds"
+        out.append(f"# HELP {name} Time spent per RF pipeline stage")
+        out.append(f"# TYPE {name} histogram")
+        for stage, hist in sorted(self.stages.items()):
+            cumulative = 0
+            for bound, n in zip(hist.buckets, hist.counts):
+                cumulative += n
+                out.append(f'{name}_bucket{{stage="{stage}",le="{bound:g}"}} {cumulative}')
+            out.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {hist.count}')
+            out.append(f'{name}_sum{{stage="{stage}"}} {hist.sum:.9f}')
+            out.append(f'{name}_count{{stage="{stage}"}} {hist.count}')
+
+        for gname, help_, fn in self._gauges:
+            try:
+                value = fn()
+            except Exception:
+                logging.exception("Metrics gauge %s failed", gname)
+                continue
+            out.append(f"# HELP {PREFIX}_{gname} {help_}")
+            out.append(f"# TYPE {PREFIX}_{gname} gauge")
+            if isinstance(value, dict):
+                for key, v in sorted(value.items()):
+                    out.append(f'{PREFIX}_{gname}{{key="{key}"}} {v}')
+            else:
+                out.append(f"{PREFIX}_{gname} {value}")
+        return "\n".join(out) + "\n"
+
+    def snapshot(self):
+        """Compact JSON-friendly summary (for MQTT)."""
+        stages = {}
+        for stage, hist in self.stages.items():
+            stages[stage] = {
+                "count": hist.count,
+                "mean_us": round(1e6 * hist.sum / hist.count, 2) if hist.count else None,
+                "p99_us_le": None if hist.quantile(0.99) is None else 1e6 * hist.quantile(0.99),
+            }
+        return {"counters": dict(self.counters), "stages": stages}
+
+    # --- export -------------------------------------------------------------
+
+    def serve(self, port, host="0.0.0.0"):
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, fmt, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        logging.info("Metrics endpoint on http://%s:%d/metrics", host, port)
+
+    def publish_periodically(self, client, interval, topic=METRICS_TOPIC):
+        def loop():
+            while True:
+                time.sleep(interval)
+                client.publish(topic, json.dumps(self.snapshot()))
+
+        threading.Thread(target=loop, name="metrics-mqtt", daemon=True).start()
+
+
+class TimedSink:
+    """Wraps a sink and records its handle() time as stage ``sink.name``."""
+
+    def __init__(self, inner, metrics):
+        self.inner = inner
+        self.name = inner.name
+        self.blocking = inner.blocking
+        self.metrics = metrics
+
+    def handle(self, frame, decoded):
+        t = time.perf_counter()
+        self.inner.handle(frame, decoded)
+        self.metrics.observe(self.name, time.perf_counter() - t)
@@ -1,45 +1,248 @@
 import logging
+import threading
+from collections import deque
+
 import paho.mqtt.client as mqtt
 
 OUTDOOR_TOPIC = "evohome/context/outdoor_temperature"
+CURVE_TOPIC = "evohome/context/ch_curve"
+CONTEXT_TOPIC = "evohome/context/#"
+RAW_TOPIC = "evohome/mitm/raw"
+PROFILE_TOPIC = "evohome/mitm/profile"
+
+
+class Outbox:
+    """
+    Bounded ring buffer between the RF path and paho.
+
+    ``put`` never waits on paho: it appends under a short lock and, when
+    full, drops the oldest message. A sender thread hands messages to paho
+    only while connected; with ``batch_interval`` the messages for
+    ``batch_topics`` are sent as one newline-separated message per topic
+    per interval. Messages paho cannot take now (not connected, its queue
+    full) go back to the front and are retried; if ``put`` filled the
+    ring meanwhile, the oldest are dropped and counted, as in ``put``.
+    """
+
+    def __init__(self, client, size=1000, batch_interval=0.0, batch_topics=(RAW_TOPIC,)):
+        self.client = client
+        self.size = size
+        self.batch_interval = batch_interval
+        self.batch_topics = frozenset(batch_topics) if batch_interval else frozenset()
+        # geen maxlen: een volle deque zou bij appendleft juist het nieuwste
+        # bericht wegduwen; de grens bewaken put() en _requeue() onder _lock
+        self._ring = deque()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = False
+        self._thread = None
+        self.queued = 0
+        self.sent = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def stats(self):
+        return {
+            "queued": self.queued,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "pending": len(self._ring),
+        }
+
+    def put(self, topic, payload, retain=False):
+        ring = self._ring
+        with self._lock:
+            n = len(ring)
+            ring.append((topic, payload, retain))
+            self.queued += 1
+            if n >= self.size:
+                ring.popleft()
+                self.dropped += 1
+        if not n and not self.batch_interval:
+            self._wake.set()
+
+    def _requeue(self, items):
+        """Put unsent ``items`` back in front, in order; overflow drops the oldest."""
+        ring = self._ring
+        with self._lock:
+            ring.extendleft(reversed(items))
+            while len(ring) > self.size:
+                ring.popleft()
+                self.dropped += 1
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="mqtt-outbox", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+
+    def _run(self):
+        wait = self.batch_interval or 1.0
+        while not self._stop:
+            self._wake.wait(wait)
+            self._wake.clear()
+            if self.client.is_connected():
+                self._drain()
+
+    def _drain(self):
+        ring = self._ring
+        batches = {}
+        retry = []  # (volgnummer, bericht): terug in de oorspronkelijke volgorde
+        seq = 0
+        while True:
+            with self._lock:
+                if not ring:
+                    break
+                item = ring.popleft()
+            topic, payload, retain = item
+            if topic in self.batch_topics:
+                batches.setdefault(topic, []).append((seq, item))
+            elif not self._send(topic, payload, retain):
+                # paho-queue vol of verbinding weg: terug voorin, later opnieuw
+                retry.append((seq, item))
+                break
+            seq += 1
+        for topic, items in batches.items():
+            if not self._send(topic, "\n".join(item[1] for _, item in items), False, len(items)):
+                retry.extend(items)
+        if retry:
+            retry.sort(key=lambda entry: entry[0])
+            self._requeue([item for _, item in retry])
+
+    def _send(self, topic, payload, retain, count=1):
+        """False when paho cannot take the message now (not connected, queue full)."""
+        rc = self.client.publish(topic, payload, retain=retain).rc
+        if rc == mqtt.MQTT_ERR_SUCCESS:
+            self.sent += count
+            return True
+        if rc in (mqtt.MQTT_ERR_NO_CONN, mqtt.MQTT_ERR_QUEUE_SIZE):
+            return False
+        self.failed += count
+        return True
+
 
 class MQTTClient:
     def __init__(self, cfg, context):
-        self.context = context
+        # (wildcard-topic, vast prefix, Context); per locatie/stick één
+        self.contexts = []
+        # AdaptiveCHMax per stick in forward-modus; stooklijn kiesbaar via CURVE_TOPIC
+        self.adaptives = []
+        # Profiler; een bericht op profile_topic start/stopt een opname
+        self.profiler = None
+        self.profile_topic = PROFILE_TOPIC
         self.client = mqtt.Client()
         self.client.on_message = self._on_message
+        self.client.on_connect = self._on_connect
+        self.client.on_disconnect = self._on_disconnect
         self.host = cfg.mqtt_host
         self.port = cfg.mqtt_port
+        self.reconnect_min = cfg.mqtt_reconnect_min
+        self.reconnect_max = cfg.mqtt_reconnect_max
+        # paho's eigen uitgaande queue ook begrenzen (0 = onbeperkt)
+        self.client.max_queued_messages_set(cfg.mqtt_queue_size)
+        self.outbox = Outbox(self.client, cfg.mqtt_queue_size, cfg.mqtt_batch_interval)
+        self.add_context(cfg.context_topic, context)
+
+    @property
+    def context(self):
+        return self.contexts[0][2] if self.contexts else None
+
+    def add_context(self, topic, context):
+        """Feed ``context`` (may be None in observe mode) from the wildcard ``topic``."""
+        for i, (existing, prefix, current) in enumerate(self.contexts):
+            if existing == topic:
+                if current is None:
+                    self.contexts[i] = (topic, prefix, context)
+                return
+        # signaalnaam = topic zonder het vaste deel van de wildcard
+        prefix = topic.rstrip("#+").rstrip("/") + "/"
+        self.contexts.append((topic, prefix, context))
+        if self.client.is_connected():
+            self.client.subscribe(topic)
 
     def connect(self):
-        self.client.connect(self.host, self.port)
-        self.client.subscribe(OUTDOOR_TOPIC)
+        # connect_async + loop_start: paho verbindt op de achtergrond en
+        # probeert het daarna opnieuw met exponentiële backoff
+        self.client.reconnect_delay_set(self.reconnect_min, self.reconnect_max)
+        self.client.connect_async(self.host, self.port)
         self.client.loop_start()
+        self.outbox.start()
+
+    def stats(self):
+        return self.outbox.stats()
+
+    def publish(self, topic, payload, retain=False):
+        self.outbox.put(topic, payload, retain)
 
     def publish_frame(self, frame):
-        # publish is non-blocking; failures are acceptable in observe-mode
-        self.client.publish("evohome/mitm/raw", frame.text)
+        # via de outbox: nooit wachten op de broker, bij overloop oudste eerst weg
+        self.outbox.put(RAW_TOPIC, frame.text)
+
+    def _on_connect(self, client, userdata, flags, rc, properties=None):
+        if rc != 0:
+            logging.warning("MQTT connect to %s:%s refused: %s", self.host, self.port, rc)
+            return
+        logging.info("MQTT connected to %s:%s", self.host, self.port)
+        # (her)abonneren bij elke verbinding; een nieuwe sessie kent ze niet meer
+        topics = [topic for topic, _, _ in self.contexts]
+        for topic in topics:
+            client.subscribe(topic)
+        if not any(mqtt.topic_matches_sub(topic, CURVE_TOPIC) for topic in topics):
+            client.subscribe(CURVE_TOPIC)
+        if self.profiler is not None and self.profile_topic:
+            client.subscribe(self.profile_topic)
+        self.outbox._wake.set()
+
+    def _on_disconnect(self, client, userdata, *args):
+        logging.warning("MQTT disconnected from %s:%s, reconnecting", self.host, self.port)
 
     def _on_message(self, client, userdata, msg):
-        if msg.topic != OUTDOOR_TOPIC:
+        if msg.topic == CURVE_TOPIC:
+            self._select_curve(msg.payload.decode(errors="replace").strip())
+            return
+        if msg.topic == self.profile_topic and self.profiler is not None:
+            self.profiler.request(msg.payload.decode(errors="replace"))
+            return
+        for _, prefix, context in self.contexts:
+            if msg.topic.startswith(prefix):
+                break
+        else:
             return
+        name = msg.topic[len(prefix):]
 
-        try:
-            value = float(msg.payload.decode())
-        except ValueError:
-            logging.warning("Invalid outdoor temperature payload: %r", msg.payload)
+        if context is None:
+            # observe-only mode: no context, but still visibility
+            logging.debug("Context %s = %r received (no context attached)", name, msg.payload)
             return
 
-        if not (-30.0 <= value <= 50.0):
-            logging.warning("Outdoor temperature out of range: %.1f °C", value)
+        try:
+            payload = msg.payload.decode()
+        except UnicodeDecodeError:
+            logging.warning("Invalid %s payload: %r", name, msg.payload)
             return
+        value = context.update(name, payload)
+        if value is not None:
+            logging.info("Context %s = %s", name, value)
 
-        if self.context is not None:
-            self.context.set_outdoor_temperature(value)
-            logging.info("Outdoor temperature %.1f °C", value)
-        else:
-            # observe-only mode: no context, but still visibility
-            logging.debug(
-                "Outdoor temperature %.1f °C received (no context attached)",
-                value
-            )
+    def _select_curve(self, name):
+        if not self.adaptives:
+            logging.debug("Curve selection %r ignored (not in forward mode)", name)
+            return
+        if name in ("", "auto"):
+            for adaptive in self.adaptives:
+                adaptive.select(None)
+            logging.info("Adaptive curve back on schedule")
+            return
+        selected = [adaptive for adaptive in self.adaptives if name in adaptive.curves]
+        if not selected:
+            logging.warning("Unknown adaptive curve: %r", name)
+            return
+        for adaptive in selected:
+            adaptive.select(name)
+        logging.info("Adaptive curve %s selected", name)
@@ -0,0 +1,264 @@
+# mitm/pipeline.py
+# RF-verwerking: serial → parse → decode → sinks (log/MQTT).
+#
+# Twee runtimes delen dezelfde stappen:
+# - sync:  alles inline in één lus (oorspronkelijk gedrag, fallback)
+# - async: elke stap een eigen asyncio-taak, verbonden via begrensde queues.
+#   De serial-lezer draait op een eigen thread en wacht nooit op een sink;
+#   bij een volle queue wordt volgens de drop-policy een frame weggegooid.
+import asyncio
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from mitm.decoder import decode
+from mitm.metrics import TimedSink
+from mitm.ramses import RamsesFrame, parse_frame
+
+DROP_POLICIES = ("drop_oldest", "drop_newest")
+
+_DROP_LOG_INTERVAL = 60.0
+
+
+class Pipeline:
+    def __init__(self, sinks, queue_size=1000, drop_policy="drop_oldest", metrics=None):
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy: {drop_policy!r}")
+        self.sinks = list(sinks)
+        self.metrics = metrics
+        # optioneel: Forwarder die frames direct na het lezen doorstuurt
+        self.forwarder = None
+        # optioneel: FrameFilter en Deduplicator, beide vóór parse
+        self.filter = None
+        self.dedup = None
+        if metrics is not None:
+            # getimede varianten alleen installeren als metrics aan staan
+            self.parse = self._timed_parse
+            self.decode = self._timed_decode
+            self.sinks = [TimedSink(sink, metrics) for sink in self.sinks]
+        self.queue_size = queue_size
+        self.drop_policy = drop_policy
+        self.dropped = Counter()
+        self._last_drop_log = 0.0
+        self._stop = threading.Event()
+
+    # --- stappen ------------------------------------------------------------
+
+    @staticmethod
+    def parse(raw):
+        return parse_frame(raw) or RamsesFrame.unparsed(raw)
+
+    @staticmethod
+    def decode(frame):
+        code = frame.code
+        if code is None:
+            return None
+        try:
+            return decode(code, frame.payload)
+        except ValueError:
+            # oneven aantal hex-tekens in de payload
+            return None
+
+    def _timed_parse(self, raw):
+        m = self.metrics
+        t = time.perf_counter()
+        frame = parse_frame(raw)
+        m.observe("parse", time.perf_counter() - t)
+        if frame is None:
+            m.inc("parse_failures")
+            return RamsesFrame.unparsed(raw)
+        return frame
+
+    def _timed_decode(self, frame):
+        code = frame.code
+        if code is None:
+            return None
+        m = self.metrics
+        t = time.perf_counter()
+        try:
+            decoded = decode(code, frame.payload)
+        except ValueError:
+            decoded = None
+            m.inc("decode_errors")
+        else:
+            if decoded is None:
+                m.inc("unknown_codes")
+            elif "decode_error" in decoded:
+                m.inc("decode_errors")
+        m.observe("decode", time.perf_counter() - t)
+        return decoded
+
+    def dispatch(self, frame, decoded):
+        for sink in self.sinks:
+            try:
+                sink.handle(frame, decoded)
+            except Exception:
+                logging.exception("Sink %s failed", sink.name)
+
+    def stop(self):
+        self._stop.set()
+
+    def _count_in(self, frames):
+        # alles wat van de stick komt, vóór filter en dedup
+        if self.metrics is not None and frames:
+            self.metrics.inc("frames_in", len(frames))
+
+    # --- sync runtime -------------------------------------------------------
+
+    def run_sync(self, serial):
+        while not self._stop.is_set():
+            frames = serial.read_frames()
+            self._count_in(frames)
+            if self.forwarder is not None and frames:
+                self._forward(frames)
+            if self.filter is not None and frames:
+                frames = self.filter.filter(frames)
+            if self.dedup is not None and frames:
+                frames = self.dedup.filter(frames)
+            for raw in frames:
+                frame = self.parse(raw)
+                self.dispatch(frame, self.decode(frame))
+
+    def _forward(self, frames):
+        # doorsturen gaat vóór parse/decode/log: die mogen het nooit vertragen
+        t_read = time.perf_counter()
+        handle = self.forwarder.handle
+        for raw in frames:
+            try:
+                handle(raw, t_read)
+            except Exception:
+                logging.exception("Forwarding failed")
+
+    # --- async runtime ------------------------------------------------------
+
+    def _offer(self, name, queue, item):
+        """Non-blocking put; applies the drop policy when ``queue`` is full."""
+        try:
+            queue.put_nowait(item)
+            return
+        except asyncio.QueueFull:
+            pass
+        if self.drop_policy == "drop_oldest":
+            queue.get_nowait()
+            queue.task_done()
+            queue.put_nowait(item)
+        self.dropped[name] += 1
+
+        now = time.monotonic()
+        if now - self._last_drop_log >= _DROP_LOG_INTERVAL:
+            self._last_drop_log = now
+            logging.warning("Pipeline queue full, frames dropped: %s", dict(self.dropped))
+
+    def _offer_many(self, name, queue, items):
+        for item in items:
+            self._offer(name, queue, item)
+
+    def _read_loop(self, serial, loop, queue):
+        offer_many = self._offer_many
+        while not self._stop.is_set():
+            try:
+                frames = serial.read_frames()
+            except Exception:
+                logging.exception("Serial read failed")
+                loop.call_soon_threadsafe(self._stop.set)
+                return
+            if frames:
+                self._count_in(frames)
+                if self.forwarder is not None:
+                    self._forward(frames)
+                if self.filter is not None:
+                    frames = self.filter.filter(frames)
+                if self.dedup is not None and frames:
+                    frames = self.dedup.filter(frames)
+                if not frames:
+                    continue
+                # één callback per gelezen blok, niet per frame
+                loop.call_soon_threadsafe(offer_many, "serial", queue, frames)
+
+    @staticmethod
+    async def _get_burst(queue):
+        # wacht op één item en neem alles mee wat al klaarstaat
+        items = [await queue.get()]
+        get = queue.get_nowait
+        for _ in range(queue.qsize()):
+            items.append(get())
+        return items
+
+    async def _parse_stage(self, inq, outq):
+        parse = self.parse
+        while True:
+            burst = await self._get_burst(inq)
+            for raw in burst:
+                frame = parse(raw)
+                if outq.full():
+                    # backpressure: parse wacht op decode, de lezer niet
+                    await outq.put(frame)
+                else:
+                    outq.put_nowait(frame)
+                inq.task_done()
+
+    async def _decode_stage(self, inq, sink_queues):
+        offer, decode_ = self._offer, self.decode
+        while True:
+            for frame in await self._get_burst(inq):
+                item = (frame, decode_(frame))
+                for sink, queue in sink_queues:
+                    offer(sink.name, queue, item)
+                inq.task_done()
+
+    async def _sink_stage(self, sink, queue):
+        if not sink.blocking:
+            while True:
+                batch = await self._get_burst(queue)
+                self._handle_batch(sink, batch)
+                for _ in batch:
+                    queue.task_done()
+
+        # Blokkerende sinks krijgen een eigen thread; wat zich intussen
+        # in de queue verzamelt wordt in één batch afgehandeld.
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(1, thread_name_prefix=f"sink-{sink.name}") as executor:
+            while True:
+                batch = await self._get_burst(queue)
+                await loop.run_in_executor(executor, self._handle_batch, sink, batch)
+                for _ in batch:
+                    queue.task_done()
+
+    @staticmethod
+    def _handle_batch(sink, batch):
+        for frame, decoded in batch:
+            try:
+                sink.handle(frame, decoded)
+            except Exception:
+                logging.exception("Sink %s failed", sink.name)
+
+    async def run_async(self, serial):
+        loop = asyncio.get_running_loop()
+        raw_q = asyncio.Queue(self.queue_size)
+        frame_q = asyncio.Queue(self.queue_size)
+        sink_queues = [(sink, asyncio.Queue(self.queue_size)) for sink in self.sinks]
+
+        tasks = [
+            asyncio.create_task(self._parse_stage(raw_q, frame_q)),
+            asyncio.create_task(self._decode_stage(frame_q, sink_queues)),
+        ]
+        tasks += [asyncio.create_task(self._sink_stage(s, q)) for s, q in sink_queues]
+
+        reader = threading.Thread(
+            target=self._read_loop, args=(serial, loop, raw_q), name="serial-reader", daemon=True
+        )
+        reader.start()
+        try:
+            while not self._stop.is_set():
+                await asyncio.sleep(0.5)
+                for task in tasks:
+                    if task.done() and task.exception() is not None:
+                        raise task.exception()
+        finally:
+            self._stop.set()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await loop.run_in_executor(None, reader.join)
@@ -0,0 +1,177 @@
+# mitm/profiler.py
+# Profileren op verzoek in de draaiende container, zonder herstart.
+#
+# SIGUSR1 (docker kill -s USR1 evohome-mitm) of een bericht op het
+# profile-topic start een opname van `duration` seconden; een tweede
+# SIGUSR1 stopt eerder. Tijdens de opname:
+# - cProfile op de hoofdthread (sync: de hele RF-lus; async: parse,
+#   decode en de niet-blokkerende sinks),
+# - een sampler die elke `sample_interval` s de stacks van alle threads
+#   noteert (serial-lezer, blokkerende sinks, log-listener, MQTT),
+# - tracemalloc, zodat de top-N toont wat er tijdens de opname is
+#   gealloceerd en nog leeft.
+# Daarna drie bestanden in `directory`: .pstats (snakeviz/pstats), .txt
+# (top-functies + tracemalloc top-N) en .stacks (collapsed, voor
+# flamegraph.pl/speedscope).
+#
+# Uitgeschakeld registreert main alleen een SIGUSR1-handler die een
+# waarschuwing logt (anders zou het signaal het proces stoppen); het
+# RF-pad zelf kent de profiler niet.
+import cProfile
+import io
+import logging
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+
+class Profiler:
+    def __init__(self, directory="/logs/profile", duration=30.0, top=25, sample_interval=0.005):
+        self.directory = directory
+        self.duration = duration
+        self.top = top
+        self.sample_interval = sample_interval
+        self.runs = 0
+        self._signum = signal.SIGUSR1
+        self._profile = None
+        self._started = 0.0
+        self._pending = None
+        self._stop_sampler = None
+        self._sampler = None
+        self._samples = None
+        self._timer = None
+        self._own_trace = False
+
+    @property
+    def active(self):
+        return self._profile is not None
+
+    def stats(self):
+        return {"runs": self.runs, "active": int(self.active)}
+
+    def install(self, signum=signal.SIGUSR1):
+        """Register the toggle signal handler; must be called from the main thread."""
+        self._signum = signum
+        signal.signal(signum, self._on_signal)
+
+    def request(self, payload=""):
+        """
+        Start (or stop) from another thread, e.g. an MQTT message; the
+        payload is the duration in seconds, empty for the default.
+        """
+        text = payload.strip()
+        try:
+            self._pending = float(text) if text else None
+        except ValueError:
+            logging.warning("Invalid profile duration %r", payload)
+            return
+        # cProfile moet op de hoofdthread aan/uit: via het signaal daarheen
+        os.kill(os.getpid(), self._signum)
+
+    # --- hoofdthread (signal handler) ---------------------------------------
+
+    def _on_signal(self, signum, frame):
+        if self._profile is None:
+            duration, self._pending = self._pending or self.duration, None
+            self._start(duration)
+        else:
+            self._stop()
+
+    def _start(self, duration):
+        # al lopende tracemalloc (PYTHONTRACEMALLOC) laten we aan
+        self._own_trace = not tracemalloc.is_tracing()
+        if self._own_trace:
+            tracemalloc.start()
+        self._samples = Counter()
+        self._stop_sampler = threading.Event()
+        self._sampler = threading.Thread(
+            target=self._sample, args=(self._samples, self._stop_sampler), name="profile-sampler", daemon=True
+        )
+        self._sampler.start()
+        self._profile = profile = cProfile.Profile()
+        self._timer = threading.Timer(duration, self._expire, (profile,))
+        self._timer.daemon = True
+        self._timer.start()
+        self._started = time.time()
+        profile.enable()
+        logging.info("Profiling for %.0f s", duration)
+
+    def _stop(self):
+        profile, self._profile = self._profile, None
+        profile.disable()
+        self._timer.cancel()
+        self._stop_sampler.set()
+        snapshot = tracemalloc.take_snapshot()
+        if self._own_trace:
+            tracemalloc.stop()
+        elapsed = time.time() - self._started
+        # wegschrijven buiten de hoofdthread: de RF-lus loopt meteen door
+        threading.Thread(
+            target=self._write,
+            args=(profile, snapshot, self._sampler, self._samples, self._started, elapsed),
+            name="profile-writer",
+            daemon=True,
+        ).start()
+
+    # --- achtergrond --------------------------------------------------------
+
+    def _expire(self, profile):
+        # alleen als deze opname nog loopt (niet al met de hand gestopt)
+        if self._profile is profile:
+            os.kill(os.getpid(), self._signum)
+
+    def _sample(self, samples, stop):
+        me = threading.get_ident()
+        names = {}
+        wait = stop.wait
+        while not wait(self.sample_interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                name = names.get(ident)
+                if name is None:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                    name = names.get(ident, str(ident))
+                # regelnummer alleen in het bovenste frame, anders valt elke
+                # aanroeper per regel uiteen in de flamegraph
+                code = frame.f_code
+                stack = [f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"]
+                frame = frame.f_back
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)})")
+                    frame = frame.f_back
+                stack.append(name)
+                samples[";".join(reversed(stack))] += 1
+
+    def _write(self, profile, snapshot, sampler, samples, started, elapsed):
+        sampler.join()
+        base = os.path.join(self.directory, time.strftime("profile-%Y%m%d-%H%M%S", time.localtime(started)))
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            profile.dump_stats(base + ".pstats")
+
+            out = io.StringIO()
+            out.write(f"evohome-mitm profile, {elapsed:.1f} s, pid {os.getpid()}\n\n")
+            stats = pstats.Stats(profile, stream=out)
+            stats.sort_stats("cumulative").print_stats(self.top)
+            stats.sort_stats("tottime").print_stats(self.top)
+            out.write(f"tracemalloc: top {self.top} allocations made during the run and still alive\n\n")
+            for stat in snapshot.statistics("lineno")[: self.top]:
+                out.write(f"{stat}\n")
+            with open(base + ".txt", "w") as f:
+                f.write(out.getvalue())
+
+            with open(base + ".stacks", "w") as f:
+                for stack, count in samples.most_common():
+                    f.write(f"{stack} {count}\n")
+        except OSError as e:
+            logging.error("Writing profile to %s failed: %s", self.directory, e)
+            return
+        self.runs += 1
+        logging.info("Profile written to %s.{pstats,txt,stacks}", base)
@@ -0,0 +1,85 @@
+# mitm/publisher.py
+# Change-of-value publicatie van gedecodeerde velden naar MQTT.
+#
+# Topic per apparaat, code en veld, bijvoorbeeld:
+#     evohome/mitm/10_061315/3200/supply_c  →  47.5
+# De code zit in het topic omdat meerdere codes hetzelfde veld hebben
+# (setpoint_c in 10A0, 22D9, 22DB). Payload is JSON (getal, string,
+# true/false of null), standaard retained zodat consumers warm starten.
+import json
+import time
+
+_SKIP_FIELDS = frozenset(("meaning", "payload", "decode_error"))
+
+
+class ChangePublisher:
+    """
+    Sink that publishes a field only when it moved more than its deadband
+    (numbers) or changed at all (other values), or when ``max_interval``
+    seconds passed since it was last published (heartbeat).
+    """
+
+    name = "publish"
+    blocking = False
+
+    def __init__(self, client, prefix="evohome/mitm", deadband=0.0, deadbands=None,
+                 max_interval=300.0, retain=True, fields=None):
+        self.client = client
+        self.prefix = prefix.rstrip("/")
+        self.deadband = deadband
+        self.deadbands = dict(deadbands or {})
+        self.max_interval = max_interval
+        self.retain = retain
+        self.fields = frozenset(fields) if fields else None
+        # topic → (laatst gepubliceerde waarde, tijdstip)
+        self._published = {}
+        # (src, code) → (laatst geziene decode-resultaat, tijdstip oudste heartbeat)
+        self._last = {}
+        self.sent = 0
+        self.suppressed = 0
+
+    def stats(self):
+        return {"sent": self.sent, "suppressed": self.suppressed, "topics": len(self._published)}
+
+    def handle(self, frame, decoded):
+        if not decoded or "decode_error" in decoded:
+            return
+        src = frame.src
+        code = frame.code
+        now = time.monotonic()
+
+        # Decode-resultaten komen uit de LRU-cache: zelfde payload = zelfde
+        # object, dan kan alleen een verlopen heartbeat nog iets opleveren.
+        key = (src, code)
+        last = self._last.get(key)
+        if last is not None and last[0] is decoded and now < last[1]:
+            self.suppressed += 1
+            return
+
+        base = f"{self.prefix}/{src.replace(':', '_')}/{code}/"
+        published = self._published
+        next_due = now + self.max_interval
+        for field, value in decoded.items():
+            if field in _SKIP_FIELDS or (self.fields is not None and field not in self.fields):
+                continue
+            topic = base + field
+            prev = published.get(topic)
+            if prev is not None:
+                old, t = prev
+                due = t + self.max_interval
+                if now < due and not self._changed(field, old, value):
+                    self.suppressed += 1
+                    next_due = min(next_due, due)
+                    continue
+            self.client.publish(topic, json.dumps(value), retain=self.retain)
+            published[topic] = (value, now)
+            self.sent += 1
+        self._last[key] = (decoded, next_due)
+
+    def _changed(self, field, old, new):
+        if (
+            isinstance(new, (int, float)) and not isinstance(new, bool)
+            and isinstance(old, (int, float)) and not isinstance(old, bool)
+        ):
+            return abs(new - old) > self.deadbands.get(field, self.deadband)
+        return new != old
@@ -1,43 +1,173 @@
+# mitm/ramses.py
+# RAMSES-II frame parsing op vaste kolomposities.
+#
+# Canonieke evofw3-regel (offsets in bytes):
+#   095 RQ --- 18:262143 10:061315 --:------ 3220 005 00C0000300
+#   0   4  7   11        21        31        41   46  50
+# Regels die niet exact zo zijn opgemaakt (enkelvoudige "I", kleine letters,
+# extra spaties) worden één keer genormaliseerd naar deze vorm.
+import re
+from typing import Optional, Union
+
+_HEX = b"0123456789ABCDEF"
+_NO_ADDR = b"--:------"
+
+# Validatie van de canonieke vorm: één fullmatch zonder capture groups,
+# velden worden daarna lazy op vaste offsets uitgelezen.
+_ADDR = rb"(?:\d\d:\d{6}|--:------)"
+_is_canonical = re.compile(
+    rb"\d{3} (?: I|RQ|RP) --- \d\d:\d{6} " + _ADDR + b" " + _ADDR + rb" [0-9A-F]{4} [0-9A-F]{3} [0-9A-F]+"
+).fullmatch
+
+
+def patch_ch_value(buf: bytearray, value_c) -> None:
+    """
+    Overwrite the CH setpoint (last two payload bytes, /10 °C) of a 1F09
+    line in place; ``buf`` must hold a canonical line without line ending.
+    """
+    raw = int(value_c * 10) & 0xFFFF
+    buf[-4] = _HEX[raw >> 12]
+    buf[-3] = _HEX[(raw >> 8) & 0xF]
+    buf[-2] = _HEX[(raw >> 4) & 0xF]
+    buf[-1] = _HEX[raw & 0xF]
+
+
+def _is_addr(a: bytes, allow_empty: bool) -> bool:
+    if allow_empty and a == _NO_ADDR:
+        return True
+    return len(a) == 9 and a[2] == 58 and a[:2].isdigit() and a[3:].isdigit()
+
+
+def _normalise(b: bytes) -> Optional[bytes]:
+    parts = b.split()
+    if len(parts) != 9:
+        return None
+    rssi, verb, seq, src, dst, via, code, ln, payload = parts
+    verb = verb.upper()
+    code = code.upper()
+    ln = ln.upper()
+    payload = payload.upper()
+    if not (
+        rssi.isdigit() and int(rssi) <= 999
+        and verb in (b"I", b"RQ", b"RP")
+        and seq == b"---"
+        and _is_addr(src, False) and _is_addr(dst, True) and _is_addr(via, True)
+        and len(code) == 4 and not code.strip(_HEX)
+        and len(ln) == 3 and not ln.strip(_HEX)
+        and not payload.strip(_HEX)
+    ):
+        return None
+    return b"%03d %2s --- %s %s %s %s %s %s" % (int(rssi), verb, src, dst, via, code, ln, payload)
+
+
+def _as_bytes(raw) -> bytes:
+    return raw.encode() if isinstance(raw, str) else bytes(raw)
+
+
+def parse_frame(raw: Union[bytes, bytearray, str]) -> Optional["RamsesFrame"]:
+    """
+    Parse one evofw3 line into a RamsesFrame, or None if it is not a valid
+    RAMSES-II frame. Canonical lines are validated with one fullmatch and
+    kept as-is; fields are only sliced out and decoded when accessed.
+    """
+    if raw.__class__ is not bytes:
+        raw = _as_bytes(raw)
+    if _is_canonical(raw):
+        line = raw
+    else:
+        line = _normalise(raw)
+        if line is None:
+            return None
+    frame = _new(RamsesFrame)
+    frame.raw = raw
+    frame._line = line
+    return frame
+
+
 class RamsesFrame:
+    __slots__ = ("raw", "_line")
+
     def __init__(self, raw: bytes):
         self.raw = raw
-        self.text = raw.decode(errors="ignore").strip()
+        self._line = raw if _is_canonical(raw) else _normalise(raw)
 
-        parts = self.text.split()
-        self.code = parts[6] if len(parts) > 6 else None
-        self.payload = parts[8] if len(parts) > 8 else ""
+    @staticmethod
+    def unparsed(raw) -> "RamsesFrame":
+        """Wrap a line that parse_frame rejected; only ``raw``/``text`` are set."""
+        frame = _new(RamsesFrame)
+        frame.raw = raw if raw.__class__ is bytes else _as_bytes(raw)
+        frame._line = None
+        return frame
 
-    def is_ch_setpoint(self):
-        return " 1F09 " in self.text
-
-    def _payload_bytes(self):
-        # split: "... 1F09 003 FF0546"
-        parts = self.text.split()
-        try:
-            payload_hex = parts[-1]
-            return bytes.fromhex(payload_hex)
-        except Exception:
+    # --- lazily decoded fields -------------------------------------------
+
+    @property
+    def text(self) -> str:
+        if self._line is None:
+            return self.raw.decode(errors="ignore").strip()
+        return self._line.decode()
+
+    @property
+    def rssi(self) -> Optional[int]:
+        return int(self._line[0:3]) if self._line is not None else None
+
+    @property
+    def verb(self) -> Optional[str]:
+        return self._line[4:6].decode().lstrip() if self._line is not None else None
+
+    @property
+    def src(self) -> Optional[str]:
+        return self._line[11:20].decode() if self._line is not None else None
+
+    @property
+    def dst(self) -> Optional[str]:
+        return self._line[21:30].decode() if self._line is not None else None
+
+    @property
+    def via(self) -> Optional[str]:
+        return self._line[31:40].decode() if self._line is not None else None
+
+    @property
+    def code(self) -> Optional[str]:
+        return self._line[41:45].decode() if self._line is not None else None
+
+    @property
+    def len(self) -> Optional[int]:
+        # lengteveld is decimaal ("022" = 22 bytes)
+        if self._line is None or not self._line[46:49].isdigit():
             return None
+        return int(self._line[46:49])
+
+    @property
+    def payload(self) -> str:
+        return self._line[50:].decode() if self._line is not None else ""
+
+    # --- CH setpoint (1F09) ----------------------------------------------
+
+    def is_ch_setpoint(self):
+        return self._line is not None and self._line[41:45] == b"1F09"
 
     def get_ch_value(self):
-        payload = self._payload_bytes()
-        if not payload or len(payload) < 2:
+        line = self._line
+        if line is None or len(line) < 54 or len(line) % 2:
             return None
 
         # last two bytes = CH setpoint (big endian, /10 °C)
-        raw = (payload[-2] << 8) | payload[-1]
-        return raw / 10.0
+        return int(line[-4:], 16) / 10.0
 
     def with_new_ch(self, value_c):
-        payload = self._payload_bytes()
-        if not payload or len(payload) < 2:
+        line = self._line
+        if line is None or len(line) < 54 or len(line) % 2:
             return self
 
-        raw = int(value_c * 10)
-        new_payload = payload[:-2] + bytes([(raw >> 8) & 0xFF, raw & 0xFF])
+        buf = bytearray(line)
+        patch_ch_value(buf, value_c)
+        new_line = bytes(buf)
+
+        frame = _new(RamsesFrame)
+        frame.raw = new_line + b"\r\n"
+        frame._line = new_line
+        return frame
 
-        parts = self.text.split()
-        parts[-1] = new_payload.hex().upper()
-        new_text = " ".join(parts)
 
-        return RamsesFrame((new_text + "\r\n").encode())
+_new = RamsesFrame.__new__
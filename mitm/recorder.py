@@ -0,0 +1,203 @@
+# mitm/recorder.py
+# Append-only binaire opslag van RF-frames, zuinig voor de SD-kaart.
+#
+# Bestand = header + records van vaste grootte (beide RECORD_SIZE bytes),
+# record i staat dus op offset (i + 1) * RECORD_SIZE. Records worden in
+# het geheugen verzameld en pas per flush_interval in één write + fsync
+# weggeschreven (bij de volgende write of door de flush-thread, wat eerst
+# komt); bestanden roteren op tijd en grootte.
+import glob
+import logging
+import os
+import struct
+import threading
+import time
+
+MAGIC = b"EVOREC01"
+VERSION = 1
+PAYLOAD_MAX = 64
+
+# ts, rssi, verb, src, dst, via, code, payload_len, flags, payload
+RECORD = struct.Struct("<dBBIIIHBB64s6x")
+RECORD_SIZE = RECORD.size  # 96
+HEADER = struct.Struct("<8sHHd")
+
+VERBS = ("I", "RQ", "RP", "W")
+_VERB_CODE = {v: i for i, v in enumerate(VERBS)}
+NO_ADDR = 0xFFFFFFFF
+FLAG_TRUNCATED = 0x01
+
+SUFFIX = ".evr"
+
+
+def pack_address(addr: str) -> int:
+    # "10:061315" → (10 << 24) | 61315; "--:------" → NO_ADDR
+    if addr[0] == "-":
+        return NO_ADDR
+    return (int(addr[:2]) << 24) | int(addr[3:])
+
+
+def unpack_address(value: int) -> str:
+    if value == NO_ADDR:
+        return "--:------"
+    return f"{value >> 24:02d}:{value & 0xFFFFFF:06d}"
+
+
+class Recorder:
+    """
+    Pipeline sink writing one fixed-size record per parsed frame.
+    Unparsed lines are not recorded.
+    """
+
+    name = "recorder"
+    blocking = True
+
+    def __init__(self, directory, flush_interval=60.0, rotate_interval=86400.0,
+                 rotate_size=64 * 1024 * 1024, retention_days=0, max_buffer=1024 * 1024,
+                 clock=time.time):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.rotate_interval = rotate_interval
+        self.rotate_size = rotate_size
+        self.retention_days = retention_days
+        self.max_buffer = max_buffer
+        self.clock = clock
+        self._buf = bytearray()
+        self._file = None
+        self._path = None
+        self._opened = 0.0
+        self._size = 0
+        self._last_flush = clock()
+        # write (sink-thread) en flush (flush-thread) delen _buf en _file
+        self._lock = threading.Lock()
+        self._stop = None
+        self.records = 0
+        self.flushes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def start(self):
+        """Also flush every ``flush_interval`` seconds when no frames arrive."""
+        self._stop = threading.Event()
+        threading.Thread(target=self._flush_loop, args=(self._stop,), name="recorder-flush", daemon=True).start()
+
+    def _flush_loop(self, stop):
+        while not stop.wait(self.flush_interval):
+            if self.clock() - self._last_flush >= self.flush_interval:
+                try:
+                    self.flush()
+                except OSError as e:
+                    logging.error("Recorder flush failed: %s", e)
+
+    def stats(self):
+        return {"records": self.records, "flushes": self.flushes, "buffered": len(self._buf) // RECORD_SIZE}
+
+    def handle(self, frame, decoded):
+        if frame.code is not None:
+            self.write(frame)
+
+    def write(self, frame, now=None):
+        if now is None:
+            now = self.clock()
+        payload = bytes.fromhex(frame.payload) if len(frame.payload) % 2 == 0 else b""
+        flags = 0
+        if len(payload) > PAYLOAD_MAX:
+            flags |= FLAG_TRUNCATED
+        # eerst volledig inpakken: een fout laat geen half record achter
+        record = RECORD.pack(
+            now,
+            min(frame.rssi, 255),
+            _VERB_CODE.get(frame.verb, 0xFF),
+            pack_address(frame.src),
+            pack_address(frame.dst),
+            pack_address(frame.via),
+            int(frame.code, 16),
+            min(len(payload), 255),
+            flags,
+            payload[:PAYLOAD_MAX],
+        )
+        with self._lock:
+            self._buf += record
+            self.records += 1
+            if now - self._last_flush >= self.flush_interval or len(self._buf) >= self.max_buffer:
+                self._flush(now)
+
+    def flush(self, now=None):
+        with self._lock:
+            self._flush(self.clock() if now is None else now)
+
+    def _flush(self, now):
+        self._last_flush = now
+        if not self._buf:
+            return
+        if self._file is None or self._due_for_rotation(now):
+            self._rotate(now)
+        self._file.write(self._buf)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._size += len(self._buf)
+        self._buf.clear()
+        self.flushes += 1
+
+    def close(self):
+        if self._stop is not None:
+            self._stop.set()
+        with self._lock:
+            self._flush(self.clock())
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _due_for_rotation(self, now):
+        return (
+            (self.rotate_interval and now - self._opened >= self.rotate_interval)
+            or (self.rotate_size and self._size + len(self._buf) > self.rotate_size)
+        )
+
+    def _rotate(self, now):
+        if self._file is not None:
+            self._file.close()
+        name = time.strftime("capture-%Y%m%d-%H%M%S", time.localtime(now)) + SUFFIX
+        self._path = os.path.join(self.directory, name)
+        self._file = open(self._path, "ab")
+        if self._file.tell() == 0:
+            header = bytearray(RECORD_SIZE)
+            HEADER.pack_into(header, 0, MAGIC, VERSION, RECORD_SIZE, now)
+            self._file.write(header)
+        self._opened = now
+        self._size = self._file.tell()
+        logging.info("Recording RF traffic to %s", self._path)
+        self._expire(now)
+
+    def _expire(self, now):
+        if not self.retention_days:
+            return
+        cutoff = now - self.retention_days * 86400
+        for path in glob.glob(os.path.join(self.directory, "*" + SUFFIX)):
+            if path != self._path and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                logging.info("Removed expired capture %s", path)
+
+
+def read_records(path):
+    """
+    Yield (ts, rssi, verb, src, dst, via, code, payload_bytes) per record.
+    A partially written trailing record is ignored.
+    """
+    with open(path, "rb") as f:
+        header = f.read(RECORD_SIZE)
+        magic, version, size, _ = HEADER.unpack_from(header)
+        if magic != MAGIC or size != RECORD_SIZE:
+            raise ValueError(f"{path}: not an evohome-mitm capture")
+        data = f.read()
+    usable = len(data) - len(data) % RECORD_SIZE
+    for ts, rssi, verb, src, dst, via, code, plen, flags, payload in RECORD.iter_unpack(data[:usable]):
+        yield (
+            ts,
+            rssi,
+            VERBS[verb] if verb < len(VERBS) else "?",
+            unpack_address(src),
+            unpack_address(dst),
+            unpack_address(via),
+            f"{code:04X}",
+            payload[: min(plen, PAYLOAD_MAX)],
+        )
@@ -0,0 +1,232 @@
+# mitm/replay.py
+# Capture/replay van RF-verkeer via een pseudo-terminal (nep evofw3-stick).
+#
+# Capture-formaat: tekst, één frame per regel:
+#     <seconden sinds start>\t<evofw3-regel>
+# Regels beginnend met '#' zijn commentaar; regels zonder tab worden
+# zonder tijdstempel (zo snel mogelijk) afgespeeld.
+#
+# Gebruik:
+#     python -m mitm.replay record /dev/ttyUSB0 capture.txt
+#     python -m mitm.replay serve capture.txt --speed 10
+#     python -m mitm.replay bench capture.txt --max --runtime sync
+import argparse
+import asyncio
+import logging
+import os
+import pty
+import resource
+import sys
+import threading
+import time
+import tty
+from collections import deque
+
+from mitm import sinks
+from mitm.pipeline import Pipeline
+from mitm.serial_if import SerialInterface
+
+
+def load_capture(path):
+    """Return a list of (offset_seconds or None, line_bytes)."""
+    frames = []
+    with open(path, "rb") as f:
+        for line in f:
+            line = line.rstrip(b"\r\n")
+            if not line or line.startswith(b"#"):
+                continue
+            ts, sep, rest = line.partition(b"\t")
+            if sep:
+                frames.append((float(ts), rest))
+            else:
+                frames.append((None, line))
+    return frames
+
+
+def record(device, baud, out_path):
+    serial = SerialInterface(device, baud, "bulk")
+    t0 = time.monotonic()
+    n = 0
+    with open(out_path, "ab") as out:
+        out.write(b"# evohome-mitm capture %s\n" % device.encode())
+        try:
+            while True:
+                frames = serial.read_frames()
+                now = time.monotonic() - t0
+                for raw in frames:
+                    out.write(b"%.6f\t%s\n" % (now, raw))
+                n += len(frames)
+                out.flush()
+        except KeyboardInterrupt:
+            pass
+    print(f"{n} frames recorded to {out_path}", file=sys.stderr)
+
+
+class FakeStick:
+    """
+    pty-backed evofw3 stand-in: ``path`` can be opened by SerialInterface
+    unmodified. ``play`` writes the capture at original timing (speed=1),
+    N times faster, or as fast as possible (speed=None).
+    """
+
+    def __init__(self):
+        self.master, self.slave = pty.openpty()
+        tty.setraw(self.slave)
+        self.path = os.ttyname(self.slave)
+        self.sent = deque()
+
+    def play(self, frames, speed=1.0, track=False):
+        start = time.perf_counter()
+        for ts, line in frames:
+            if speed is not None and ts is not None:
+                delay = start + ts / speed - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            if track:
+                self.sent.append((line, time.perf_counter()))
+            os.write(self.master, line + b"\r\n")
+
+    def close(self):
+        os.close(self.master)
+        os.close(self.slave)
+
+
+class _TimedSink:
+    """Wraps a sink and records write-to-handled latency per frame."""
+
+    def __init__(self, inner, stick):
+        self.inner = inner
+        self.name = inner.name
+        self.blocking = inner.blocking
+        self.stick = stick
+        self.latencies = []
+        self.handled = 0
+        self.dropped = 0
+        self.first_sent = None
+        self.last_done = None
+
+    def handle(self, frame, decoded):
+        self.inner.handle(frame, decoded)
+        now = time.perf_counter()
+        sent = self.stick.sent
+        raw = frame.raw
+        # FIFO-match; frames die de pipeline heeft weggegooid worden overgeslagen
+        while sent:
+            line, t = sent.popleft()
+            if self.first_sent is None:
+                self.first_sent = t
+            if line == raw:
+                self.latencies.append(now - t)
+                break
+            self.dropped += 1
+        self.handled += 1
+        self.last_done = now
+
+
+def _percentile(values, q):
+    if not values:
+        return float("nan")
+    idx = min(len(values) - 1, int(round(q / 100.0 * (len(values) - 1))))
+    return values[idx]
+
+
+def bench(frames, speed, runtime, reader, queue_size, log_path):
+    handler = logging.FileHandler(log_path or os.devnull)
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(logging.INFO)
+
+    stick = FakeStick()
+    serial = SerialInterface(stick.path, 115200, reader)
+    probe = _TimedSink(sinks.LogSink(), stick)
+    pipeline = Pipeline([probe], queue_size=queue_size)
+
+    def drive():
+        stick.play(frames, speed, track=True)
+        # wachten tot de pipeline is leeggelopen (of 2 s stil blijft)
+        last, idle_since = -1, time.monotonic()
+        while time.monotonic() - idle_since < 2.0 and probe.handled + probe.dropped < len(frames):
+            if probe.handled != last:
+                last, idle_since = probe.handled, time.monotonic()
+            time.sleep(0.01)
+        pipeline.stop()
+
+    ru0 = resource.getrusage(resource.RUSAGE_SELF)
+    driver = threading.Thread(target=drive, name="fake-stick", daemon=True)
+    driver.start()
+    if runtime == "sync":
+        pipeline.run_sync(serial)
+    else:
+        asyncio.run(pipeline.run_async(serial))
+    driver.join()
+    ru1 = resource.getrusage(resource.RUSAGE_SELF)
+    stick.close()
+
+    lat = sorted(probe.latencies)
+    cpu = (ru1.ru_utime - ru0.ru_utime) + (ru1.ru_stime - ru0.ru_stime)
+    n = len(lat)
+    print(f"runtime={runtime} reader={reader} speed={'max' if speed is None else speed}")
+    print(f"frames   sent={len(frames)} handled={probe.handled} dropped={len(frames) - n}")
+    if n:
+        elapsed = max(probe.last_done - probe.first_sent, 1e-9)
+        print(f"rate     {n / elapsed:.0f} frames/s end-to-end (wall {elapsed:.2f}s)")
+        print(
+            "latency  p50={:.3f}ms p90={:.3f}ms p99={:.3f}ms max={:.3f}ms".format(
+                *(1000 * _percentile(lat, q) for q in (50, 90, 99)), 1000 * lat[-1]
+            )
+        )
+        print(f"cpu      {cpu:.3f}s total, {1e6 * cpu / n:.1f}us/frame (incl. fake stick)")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m mitm.replay", description="RF capture/replay")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    rec = sub.add_parser("record", help="capture frames from a real stick")
+    rec.add_argument("device")
+    rec.add_argument("out")
+    rec.add_argument("--baud", type=int, default=115200)
+
+    for name, help_ in (("serve", "replay into a pty for an external mitm.main"),
+                        ("bench", "replay through the in-process pipeline and report")):
+        p = sub.add_parser(name, help=help_)
+        p.add_argument("capture")
+        speed = p.add_mutually_exclusive_group()
+        speed.add_argument("--speed", type=float, default=1.0, help="N x original timing")
+        speed.add_argument("--max", action="store_true", help="as fast as possible")
+        if name == "serve":
+            p.add_argument("--loop", action="store_true", help="repeat the capture forever")
+        else:
+            p.add_argument("--runtime", choices=("async", "sync"), default="async")
+            p.add_argument("--reader", choices=("bulk", "line"), default="bulk")
+            p.add_argument("--queue-size", type=int, default=1000)
+            p.add_argument("--log-file", help="write RF log here (default: discard)")
+
+    args = ap.parse_args(argv)
+    if args.cmd == "record":
+        record(args.device, args.baud, args.out)
+        return
+
+    frames = load_capture(args.capture)
+    speed = None if args.max else args.speed
+    if args.cmd == "bench":
+        bench(frames, speed, args.runtime, args.reader, args.queue_size, args.log_file)
+        return
+
+    stick = FakeStick()
+    print(f"fake evofw3 stick on {stick.path}", file=sys.stderr, flush=True)
+    try:
+        while True:
+            stick.play(frames, speed)
+            if not args.loop:
+                break
+        input("capture done, press enter to close the pty\n")
+    except (KeyboardInterrupt, EOFError):
+        pass
+    finally:
+        stick.close()
+
+
+if __name__ == "__main__":
+    main()
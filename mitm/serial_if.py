@@ -1,12 +1,144 @@
 #serial interface
+import os
+import select
+import time
+from collections import deque
+
 import serial
 
+READERS = ("bulk", "line")
+
+# Zonder regeleinde groeit de buffer niet verder dan dit (ruis / verkeerde baud)
+_MAX_BUFFER = 64 * 1024
+
+
 class SerialInterface:
-    def __init__(self, device, baudrate):
-        self.ser = serial.Serial(device, baudrate, timeout=1)
+    """
+    evofw3 stick.
+
+    ``reader="line"`` polls ``readline()`` with a 1 s timeout (original
+    behaviour). ``reader="bulk"`` waits on the fd with poll(), drains all
+    available bytes in one read into a reusable buffer and splits out every
+    complete line, so frames are delivered as soon as they land.
+    """
+
+    def __init__(self, device, baudrate, reader="line", metrics=None):
+        if reader not in READERS:
+            raise ValueError(f"Unknown serial reader: {reader!r}")
+        self.reader = reader
+        self.metrics = metrics
+        self.ser = serial.Serial(device, baudrate, timeout=1 if reader == "line" else 0)
+        self._buf = bytearray()
+        self._pending = deque()
+        self._poll = None
+        self._fd = None
+        if reader == "bulk":
+            try:
+                self._fd = self.ser.fileno()
+            except Exception:
+                self._fd = None
+            else:
+                self._poll = select.poll()
+                self._poll.register(self._fd, select.POLLIN)
+
+    def fileno(self):
+        return self.ser.fileno()
 
     def read_frame(self):
-        line = self.ser.readline()
-        if not line:
+        if self._pending:
+            return self._pending.popleft()
+        if self.reader == "line":
+            if self.metrics is None:
+                line = self.ser.readline()
+            else:
+                line = self._timed_readline()
+            if not line:
+                return None
+            return line.rstrip(b"\r\n")
+        frames = self.read_frames()
+        if not frames:
             return None
-        return line.rstrip(b"\r\n")
+        self._pending.extend(frames[1:])
+        return frames[0]
+
+    def read_frames(self, timeout=1.0):
+        """
+        Wait up to ``timeout`` seconds for data and return all complete
+        frames received so far (possibly an empty list).
+        """
+        if self._pending:
+            frames = list(self._pending)
+            self._pending.clear()
+            return frames
+        if self.reader == "line":
+            line = self.read_frame()
+            return [line] if line else []
+
+        if self._poll is not None:
+            if not self._poll.poll(timeout * 1000):
+                return []
+            return self.read_available()
+        else:
+            # geen fd (bijv. rfc2217://): blokkerend lezen van wat er klaarstaat
+            self.ser.timeout = timeout
+            chunk = self.ser.read(max(self.ser.in_waiting, 1))
+            self.ser.timeout = 0
+            if not chunk:
+                return []
+        return self.feed(chunk)
+
+    def _timed_readline(self):
+        # net als bij bulk gemeten vanaf de eerste byte, zonder de wachttijd:
+        # eerst (met timeout) op één byte wachten, dan de rest van de regel
+        first = self.ser.read(1)
+        if not first:
+            return b""
+        t = time.perf_counter()
+        line = first + self.ser.readline() if first != b"\n" else first
+        self.metrics.observe("serial_read", time.perf_counter() - t)
+        return line
+
+    def read_available(self):
+        """
+        One non-blocking read of what the fd has ready (bulk reader; call
+        after poll/select reported it readable). Returns complete frames.
+        """
+        # gemeten vanaf het moment dat er data klaarstaat, zonder de wachttijd
+        t = time.perf_counter() if self.metrics is not None else 0.0
+        try:
+            chunk = os.read(self._fd, max(self.ser.in_waiting, 4096))
+        except BlockingIOError:
+            return []
+        if not chunk:
+            raise serial.SerialException("device disconnected")
+        frames = self.feed(chunk)
+        if self.metrics is not None:
+            self.metrics.observe("serial_read", time.perf_counter() - t)
+        return frames
+
+    def feed(self, chunk):
+        """Append raw bytes and return the complete frames they finish."""
+        buf = self._buf
+        buf += chunk
+        find = buf.find
+        frames = []
+        start = 0
+        # één kopie per frame: slices van een memoryview op de buffer
+        with memoryview(buf) as mv:
+            while True:
+                nl = find(b"\n", start)
+                if nl < 0:
+                    break
+                stop = nl - 1 if nl > start and buf[nl - 1] == 13 else nl
+                if stop > start:
+                    frames.append(bytes(mv[start:stop]))
+                start = nl + 1
+        if start:
+            del buf[:start]
+        elif len(buf) > _MAX_BUFFER:
+            buf.clear()
+        return frames
+
+    def write_frame(self, line):
+        """Transmit one frame; ``line`` is the evofw3 TX text without line ending."""
+        self.ser.write(line + b"\r\n")
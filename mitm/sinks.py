@@ -0,0 +1,187 @@
+# mitm/sinks.py
+# Eindpunten van de RF-pipeline (log, MQTT).
+#
+# Een sink heeft één methode ``handle(frame, decoded)``; ``decoded`` is het
+# resultaat van decoder.decode of None. Sinks met ``blocking = True`` doen
+# I/O die kan haperen (stdout in Docker) en draaien in de async runtime op
+# een eigen thread, zodat ze het uitlezen van de RF-stick nooit ophouden.
+import logging
+import time
+
+from mitm.cache import LRUCache
+from mitm.messages import DecodeError, Message
+
+_rf_log = logging.getLogger("mitm.rf")
+
+_summary_cache = LRUCache(1024)
+
+
+def _summary(code: str, payload: str, d) -> str:
+    # Samenvatting hangt alleen af van (code, payload): zelfde sleutel als decode_cache
+    key = (code, payload)
+    summary = _summary_cache.get(key)
+    if summary is None:
+        summary = _format_decoded(d)
+        _summary_cache.put(key, summary)
+    return summary
+
+
+# Message-klasse → opmaakfunctie; de keten in _format_mapping wordt per
+# klasse één keer tegen de (vaste) veldnamen uitgezet. Wijzig beide samen:
+# tests/test_sinks.py vergelijkt ze voor elke geregistreerde code.
+_formatters = {}
+
+
+def _format_decoded(d) -> str:
+    fmt = _formatters.get(d.__class__)
+    if fmt is None:
+        if not isinstance(d, Message) or d.__class__ is DecodeError:
+            return _format_mapping(d)
+        fmt = _formatters[d.__class__] = _compile_format(d.__class__)
+    return fmt(d)
+
+
+def _compile_format(cls):
+    """Formatter for one Message class, equivalent to _format_mapping."""
+    keys = frozenset(cls._keys)
+    meaning = cls.meaning
+    steps = []
+
+    if "percent" in keys:
+        def percent(d):
+            p = d.percent
+            return None if p is None else f"{meaning} | {p:.1f}%"
+        steps.append(percent)
+    if "force_off" in keys:
+        steps.append(lambda d: f"{meaning} | force_off" if d.force_off else None)
+
+    # vanaf hier levert de eerste passende stap altijd een tekst op
+    final = None
+    if "setpoint_c" in keys:
+        has_diff = "differential_c" in keys
+
+        def final(d):
+            sp = d.setpoint_c
+            if sp is None:
+                return f"{meaning} | setpoint=N/A"
+            diff = d.differential_c if has_diff else None
+            return f"{meaning} | setpoint={sp:.2f}°C" + ("" if diff is None else f" (diff={diff:.2f}°C)")
+    elif "value_c" in keys:
+        def final(d):
+            v = d.value_c
+            return f"{meaning} | {('N/A' if v is None else f'{v:.2f}°C')}"
+    elif "supply_c" in keys or "return_c" in keys:
+        def final(d):
+            sup = d.get("supply_c")
+            ret = d.get("return_c")
+            sup_s = "N/A" if sup is None else f"{sup:.2f}°C"
+            ret_s = "N/A" if ret is None else f"{ret:.2f}°C"
+            return f"{meaning} | supply={sup_s} return={ret_s}"
+    elif "os_number" in keys:
+        def final(d):
+            return f"{meaning} | os={d.os_number}"
+    elif "alarm_type_text" in keys:
+        def final(d):
+            return f"{meaning} | {d.alarm_type_text} (active={d.get('active')})"
+    elif meaning == "Device status":
+        def final(d):
+            inst = d.get("instantaneous_text", "Unknown")
+            seq = d.get("sequence_text", "Unknown")
+            flame = d.get("flame_current_na")
+            return f"{meaning} | inst={inst} seq={seq} flame={flame}nA"
+    if final is None:
+        final = lambda d: meaning  # noqa: E731
+
+    if not steps:
+        return final
+
+    def fmt(d):
+        for step in steps:
+            out = step(d)
+            if out is not None:
+                return out
+        return final(d)
+    return fmt
+
+
+def _format_mapping(d) -> str:
+    # Eén compacte “business-grade” beschrijving per frame
+    meaning = d.get("meaning", "known")
+
+    # Prefer meest relevante velden (temperaturen/setpoints/percent)
+    if "percent" in d and d["percent"] is not None:
+        return f"{meaning} | {d['percent']:.1f}%"
+    if d.get("force_off"):
+        return f"{meaning} | force_off"
+    if "setpoint_c" in d:
+        sp = d["setpoint_c"]
+        if sp is None:
+            return f"{meaning} | setpoint=N/A"
+        extra = []
+        if "differential_c" in d and d["differential_c"] is not None:
+            extra.append(f"diff={d['differential_c']:.2f}°C")
+        return f"{meaning} | setpoint={sp:.2f}°C" + (f" ({', '.join(extra)})" if extra else "")
+    if "value_c" in d:
+        v = d["value_c"]
+        return f"{meaning} | {('N/A' if v is None else f'{v:.2f}°C')}"
+    if "supply_c" in d or "return_c" in d:
+        sup = d.get("supply_c")
+        ret = d.get("return_c")
+        sup_s = "N/A" if sup is None else f"{sup:.2f}°C"
+        ret_s = "N/A" if ret is None else f"{ret:.2f}°C"
+        return f"{meaning} | supply={sup_s} return={ret_s}"
+    if "os_number" in d:
+        return f"{meaning} | os={d['os_number']}"
+    if "alarm_type_text" in d:
+        return f"{meaning} | {d['alarm_type_text']} (active={d.get('active')})"
+    if meaning == "Device status":
+        inst = d.get("instantaneous_text", "Unknown")
+        seq = d.get("sequence_text", "Unknown")
+        flame = d.get("flame_current_na")
+        return f"{meaning} | inst={inst} seq={seq} flame={flame}nA"
+
+    # Fallback: alleen meaning
+    return meaning
+
+
+class LogSink:
+    name = "log"
+    blocking = True
+
+    def __init__(self, sampler=None, metrics=None):
+        # sampler: logsetup.CodeSampler; None of leeg = elk frame loggen
+        self.sampler = sampler or None
+        self.metrics = metrics
+
+    def handle(self, frame, decoded):
+        # niets opbouwen als INFO toch niet gelogd wordt
+        if not _rf_log.isEnabledFor(logging.INFO):
+            return
+        code = frame.code
+        if self.sampler is not None and code is not None and not self.sampler.allow(code):
+            return
+        if decoded:
+            if self.metrics is None:
+                summary = _summary(code, frame.payload, decoded)
+            else:
+                t = time.perf_counter()
+                summary = _summary(code, frame.payload, decoded)
+                self.metrics.observe("format", time.perf_counter() - t)
+            _rf_log.info("RF %s | %s", frame.text, summary)
+            return
+        # Exact 1 logregel per frame, maar zonder extra decode-regel
+        text = frame.text
+        if text:
+            _rf_log.info("RF %s", text)
+
+
+class MQTTSink:
+    name = "mqtt"
+    blocking = False
+
+    def __init__(self, client):
+        self.client = client
+
+    def handle(self, frame, decoded):
+        if frame.text:
+            self.client.publish_frame(frame)
@@ -0,0 +1,252 @@
+# mitm/snapshot.py
+# Warme herstart: limiter-ramp, contextsignalen en apparaatstatus in een
+# klein memory-mapped bestand.
+#
+# Bestand = header + twee slots. Elke write gaat naar het oudste slot:
+# eerst de payload (compacte JSON), daarna de slot-header met volgnummer
+# en CRC32. Een half geschreven slot faalt op de CRC; dan wordt het andere
+# slot gebruikt. Tijdstempels blijven wall-clock (time.time), dus na het
+# herstellen gelden dezelfde staleness-regels als voor de herstart.
+#
+# Limiter en context gaan altijd mee; past de apparaatstatus niet meer in
+# een slot, dan gaan de meest recent bijgewerkte records mee en vervalt de
+# rest (geteld in `trimmed`).
+import atexit
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from types import MappingProxyType
+
+from mitm.state import DeviceState
+
+MAGIC = b"EVOSNAP1"
+VERSION = 1
+FILE_HEADER = struct.Struct("<8sHHI")  # magic, version, slots, slot_size
+SLOT_HEADER = struct.Struct("<QdII")  # seq, written, length, crc32
+SLOTS = 2
+
+
+def _dumps(obj):
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+class SnapshotFile:
+    """Double-buffered, CRC-checked JSON document in a memory-mapped file."""
+
+    def __init__(self, path, slot_size=64 * 1024):
+        self.path = path
+        self.slot_size = slot_size
+        size = FILE_HEADER.size + SLOTS * slot_size
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            existing = os.fstat(fd).st_size
+            header = os.pread(fd, FILE_HEADER.size, 0) if existing >= FILE_HEADER.size else b""
+            if existing != size or not header.startswith(MAGIC) or FILE_HEADER.unpack(header)[3] != slot_size:
+                # nieuw of ander formaat: opnieuw beginnen
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, size)
+                os.pwrite(fd, FILE_HEADER.pack(MAGIC, VERSION, SLOTS, slot_size), 0)
+            self._mm = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        self._lock = threading.Lock()
+        self._seq = max((seq for seq, _, _ in self._slots()), default=0)
+        self.writes = 0
+
+    @property
+    def capacity(self):
+        """Largest document (bytes) a slot holds."""
+        return self.slot_size - SLOT_HEADER.size
+
+    def _offset(self, slot):
+        return FILE_HEADER.size + slot * self.slot_size
+
+    def _slots(self):
+        """Valid slots as (seq, written, document bytes)."""
+        mm = self._mm
+        out = []
+        for slot in range(SLOTS):
+            offset = self._offset(slot)
+            seq, written, length, crc = SLOT_HEADER.unpack_from(mm, offset)
+            start = offset + SLOT_HEADER.size
+            if not seq or length > self.slot_size - SLOT_HEADER.size:
+                continue
+            data = mm[start:start + length]
+            if zlib.crc32(data) == crc:
+                out.append((seq, written, data))
+        return out
+
+    def read(self):
+        """(written, document) of the newest valid slot, or None."""
+        slots = self._slots()
+        if not slots:
+            return None
+        _, written, data = max(slots)
+        try:
+            return written, json.loads(data)
+        except ValueError:
+            return None
+
+    def write(self, document, now=None):
+        self.write_bytes(_dumps(document), now)
+
+    def write_bytes(self, data, now=None):
+        """Write an already encoded JSON document."""
+        if len(data) > self.capacity:
+            raise ValueError(f"snapshot of {len(data)} bytes does not fit slot of {self.slot_size}")
+        with self._lock:
+            seq = self._seq + 1
+            offset = self._offset(seq % SLOTS)
+            mm = self._mm
+            start = offset + SLOT_HEADER.size
+            mm[start:start + len(data)] = data
+            SLOT_HEADER.pack_into(mm, offset, seq, time.time() if now is None else now, len(data), zlib.crc32(data))
+            mm.flush()
+            self._seq = seq
+            self.writes += 1
+
+    def close(self):
+        self._mm.close()
+
+
+class WarmState:
+    """
+    Collects limiter ramp state, context signals and device state into a
+    SnapshotFile every ``interval`` seconds (and at exit), and restores
+    them at startup. Limiter state older than ``max_age`` is not restored.
+    """
+
+    def __init__(self, path, interval=30.0, max_age=900.0, slot_size=64 * 1024):
+        self.file = SnapshotFile(path, slot_size)
+        self.interval = interval
+        self.max_age = max_age
+        self.limiters = {}
+        self.contexts = {}
+        self.state = None
+        self._stop = threading.Event()
+        self._thread = None
+        self.trimmed = 0
+
+    def stats(self):
+        return {"writes": self.file.writes, "trimmed": self.trimmed}
+
+    # --- opslaan ------------------------------------------------------------
+
+    def capture(self):
+        doc = {
+            "limiters": {
+                name: [lim.last_value, lim.last_time] for name, lim in self.limiters.items()
+            },
+            "contexts": {
+                topic: {name: list(entry) for name, entry in ctx.snapshot().items()}
+                for topic, ctx in self.contexts.items()
+            },
+        }
+        if self.state is not None:
+            doc["state"] = [
+                [rec.src, rec.code, None if rec.values is None else dict(rec.values),
+                 rec.first_seen, rec.updated, rec.count]
+                for rec in self.state.snapshot()
+            ]
+        return doc
+
+    def encode(self):
+        """
+        Encoded snapshot that fits one slot: limiters and contexts always,
+        device records newest-updated first for as long as they fit.
+        """
+        doc = self.capture()
+        state = doc.pop("state", None)
+        data = _dumps(doc)
+        if state is None:
+            return data
+        room = self.file.capacity - len(data) - len(',"state":[]')
+        parts = []
+        state.sort(key=lambda rec: rec[4], reverse=True)
+        for rec in state:
+            part = _dumps(rec)
+            room -= len(part) + (1 if parts else 0)
+            if room < 0:
+                break
+            parts.append(part)
+        trimmed = len(state) - len(parts)
+        if trimmed:
+            if not self.trimmed:
+                logging.warning(
+                    "Snapshot slot of %d bytes too small, %d of %d device records left out (snapshot.size_kb)",
+                    self.file.slot_size, trimmed, len(state),
+                )
+            self.trimmed += trimmed
+        return data[:-1] + b',"state":[' + b",".join(parts) + b"]}"
+
+    def save(self):
+        try:
+            self.file.write_bytes(self.encode())
+        except (OSError, TypeError, ValueError) as e:
+            logging.warning("Snapshot write failed: %s", e)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="snapshot", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        if not self._stop.is_set():
+            self._stop.set()
+            self.save()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.save()
+
+    # --- herstellen ---------------------------------------------------------
+
+    def restore(self, now=None):
+        """Restore what the snapshot holds into the registered objects; returns counts."""
+        t = time.perf_counter()
+        found = self.file.read()
+        if found is None:
+            return None
+        written, doc = found
+        now = time.time() if now is None else now
+        age = now - written
+        counts = {"limiters": 0, "signals": 0, "devices": 0}
+
+        if age <= self.max_age:
+            for name, (last_value, last_time) in doc.get("limiters", {}).items():
+                lim = self.limiters.get(name)
+                if lim is not None and last_value is not None:
+                    lim.last_value = last_value
+                    lim.last_time = last_time
+                    counts["limiters"] += 1
+
+        for topic, signals in doc.get("contexts", {}).items():
+            ctx = self.contexts.get(topic)
+            if ctx is None:
+                continue
+            for name, (value, updated) in signals.items():
+                # oorspronkelijk tijdstip: get() past de gewone max_age toe
+                if ctx.signal(name) is not None:
+                    ctx.set(name, value, updated)
+                    counts["signals"] += 1
+
+        if self.state is not None:
+            for src, code, values, first_seen, updated, count in doc.get("state", ()):
+                if self.state.get(src, code) is not None:
+                    continue
+                rec = DeviceState(src, code, None if values is None else MappingProxyType(values), first_seen)
+                rec.updated = updated
+                rec.count = count
+                self.state.restore(rec)
+                counts["devices"] += 1
+
+        logging.info(
+            "Warm restart from %s (%.0f s old) in %.1f ms: %s",
+            self.file.path, age, (time.perf_counter() - t) * 1000, counts,
+        )
+        return counts
@@ -0,0 +1,104 @@
+# mitm/state.py
+# Laatst bekende waarden per apparaat en message code.
+#
+# Per (src, code) één DeviceState-record; de waarden zijn het (read-only,
+# gedeelde) resultaat van decoder.decode, dus er wordt niets gekopieerd.
+import time
+
+
+class DeviceState:
+    __slots__ = ("src", "code", "values", "first_seen", "updated", "count")
+
+    def __init__(self, src, code, values, now):
+        self.src = src
+        self.code = code
+        self.values = values
+        self.first_seen = now
+        self.updated = now
+        self.count = 1
+
+    def get(self, field, default=None):
+        if self.values is None:
+            return default
+        return self.values.get(field, default)
+
+    def __repr__(self):
+        return f"DeviceState({self.src} {self.code} count={self.count} values={dict(self.values or {})})"
+
+
+class StateStore:
+    """
+    Pipeline sink holding the latest decoded values per (src address, code).
+    Frames with unknown codes are counted with ``values`` None; decode
+    errors do not overwrite the last good values.
+    """
+
+    name = "state"
+    blocking = False
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self._records = {}
+        # code → meest recent bijgewerkte record, ongeacht apparaat
+        self._by_code = {}
+
+    def __len__(self):
+        return len(self._records)
+
+    def __iter__(self):
+        return iter(self.snapshot())
+
+    def handle(self, frame, decoded):
+        code = frame.code
+        if code is not None:
+            self.update(frame.src, code, decoded)
+
+    def update(self, src, code, values, now=None):
+        if now is None:
+            now = self.clock()
+        if values is not None and "decode_error" in values:
+            values = None
+        key = (src, code)
+        rec = self._records.get(key)
+        if rec is None:
+            rec = self._records[key] = DeviceState(src, code, values, now)
+        else:
+            rec.count += 1
+            rec.updated = now
+            if values is not None:
+                rec.values = values
+        self._by_code[code] = rec
+        return rec
+
+    def get(self, src, code):
+        return self._records.get((src, code))
+
+    def restore(self, rec):
+        """Insert a record from a warm-restart snapshot (keeps its timestamps)."""
+        self._records[(rec.src, rec.code)] = rec
+        latest = self._by_code.get(rec.code)
+        if latest is None or latest.updated < rec.updated:
+            self._by_code[rec.code] = rec
+
+    def latest(self, code):
+        """Most recently updated record for ``code`` across all devices."""
+        return self._by_code.get(code)
+
+    def latest_value(self, code, field, max_age=None):
+        """
+        Latest ``field`` of ``code`` from any device, e.g.
+        ``latest_value("3200", "supply_c", max_age=300)``; None if unknown or stale.
+        """
+        rec = self._by_code.get(code)
+        if rec is None:
+            return None
+        if max_age is not None and self.clock() - rec.updated > max_age:
+            return None
+        return rec.get(field)
+
+    def snapshot(self):
+        """Point-in-time list of records, safe to iterate from other threads."""
+        return list(self._records.values())
+
+    def devices(self):
+        return sorted({src for src, _ in self._records})
@@ -0,0 +1,98 @@
+# mitm/sticks.py
+# Meerdere evofw3-sticks in één proces.
+#
+# Alle sticks gebruiken de bulk-lezer; één selector wacht op alle fd's en
+# StickSet.read_frames geeft, net als SerialInterface.read_frames, een
+# lijst ruwe frames terug. De pipeline (en dus decoder-caches, sinks en
+# de MQTT-verbinding) is gedeeld.
+#
+# Hetzelfde RF-frame dat door meer dan één stick wordt ontvangen (overlap
+# in bereik) gaat maar één keer door: de eerste stick wint, kopieën van
+# andere sticks binnen dedup_window seconden vervallen. Herhalingen op
+# dezelfde stick gaan gewoon door. Per stick kan een eigen Forwarder
+# (met eigen limiter en context) hangen; die ziet alleen frames die de
+# dedup passeren, zodat één frame niet door twee sticks wordt herhaald.
+import logging
+import selectors
+import time
+
+import serial
+
+_PURGE_INTERVAL = 1.0
+
+
+class Stick:
+    __slots__ = ("name", "serial", "forwarder", "frames", "duplicates")
+
+    def __init__(self, name, serial_if, forwarder=None):
+        self.name = name
+        self.serial = serial_if
+        self.forwarder = forwarder
+        self.frames = 0
+        self.duplicates = 0
+
+
+class StickSet:
+    """Selector-multiplexed group of sticks with cross-stick deduplication."""
+
+    def __init__(self, sticks, dedup_window=1.0):
+        self.sticks = list(sticks)
+        self.dedup_window = dedup_window
+        self._sel = selectors.DefaultSelector()
+        for index, stick in enumerate(self.sticks):
+            if stick.serial.reader != "bulk" or stick.serial._fd is None:
+                raise ValueError(f"stick {stick.name}: multi-stick mode needs the bulk reader on a local device")
+            self._sel.register(stick.serial._fd, selectors.EVENT_READ, (index, stick))
+        # frame zonder RSSI → (index stick, tijdstip)
+        self._seen = {}
+        self._purged = 0.0
+
+    def __len__(self):
+        return len(self.sticks)
+
+    def stats(self):
+        return {
+            stick.name: {"frames": stick.frames, "duplicates": stick.duplicates}
+            for stick in self.sticks
+        }
+
+    def read_frames(self, timeout=1.0):
+        events = self._sel.select(timeout)
+        if not events:
+            return []
+        t_read = time.perf_counter()
+        now = time.monotonic()
+        seen = self._seen
+        window = self.dedup_window
+        out = []
+        for key, _ in events:
+            index, stick = key.data
+            try:
+                frames = stick.serial.read_available()
+            except (OSError, serial.SerialException) as e:
+                logging.error("Stick %s failed, removed: %s", stick.name, e)
+                self._sel.unregister(key.fileobj)
+                if not self._sel.get_map():
+                    raise
+                continue
+            forward = stick.forwarder.handle if stick.forwarder is not None else None
+            for raw in frames:
+                # RSSI verschilt per stick; de rest van de regel is het frame
+                body = raw[5:] if raw[4:5] == b" " else raw[4:]
+                prev = seen.get(body)
+                if prev is not None and prev[0] != index and now - prev[1] <= window:
+                    stick.duplicates += 1
+                    continue
+                seen[body] = (index, now)
+                stick.frames += 1
+                if forward is not None:
+                    try:
+                        forward(raw, t_read)
+                    except Exception:
+                        logging.exception("Forwarding on stick %s failed", stick.name)
+                out.append(raw)
+        if now - self._purged > _PURGE_INTERVAL:
+            self._purged = now
+            for body in [b for b, (_, t) in seen.items() if now - t > window]:
+                del seen[body]
+        return out
@@ -0,0 +1,544 @@
+# mitm/synth.py
+# Synthetisch RAMSES-II verkeer voor stress- en soaktests.
+#
+# Een Mix beschrijft een installatie: een aantal apparaten (verdeeld over
+# apparaattypes) en per message code welke types die zenden en hoe vaak.
+# Alle codes die de decoder kent zitten erin, plus codes die hij niet
+# kent (1F09, 30C9, ...), kapotte regels (afgekapt, rommel, ongeldige
+# hex, oneven lengte) en geldige maar niet-canonieke regels. Payloads
+# worden uit de decoder-layouts opgebouwd, met realistische waarden voor
+# temperaturen en percentages.
+#
+# Vooraf wordt een pool unieke regels gemaakt (groter dan de decode-cache);
+# tijdens het afspelen wordt die pool rondgelopen, dus de generator zelf
+# haalt ruim 10k frames/s zonder het resultaat te beïnvloeden.
+#
+# Gebruik:
+#     python -m mitm.synth serve --devices 200 --rate 2000          # pty voor een externe mitm.main
+#     python -m mitm.synth capture out.txt --devices 50 --seconds 3600
+#     python -m mitm.synth run --rate 10000 --seconds 60            # in-process bron
+#     python -m mitm.synth run --pty --rate 2000 --seconds 14400 --report 300 --tracemalloc
+import argparse
+import asyncio
+import bisect
+import itertools
+import logging
+import os
+import random
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+
+from mitm import decoder, sinks
+from mitm.metrics import Histogram
+from mitm.pipeline import Pipeline
+from mitm.replay import FakeStick
+from mitm.serial_if import SerialInterface
+from mitm.state import StateStore
+
+# apparaattype → aandeel in de populatie (minstens één van elk)
+POPULATION = {
+    "01": 0.02,  # controller
+    "04": 0.55,  # radiatorkraan
+    "07": 0.05,  # DHW-sensor
+    "10": 0.05,  # OpenTherm-bridge
+    "13": 0.15,  # BDR-relais
+    "34": 0.18,  # thermostaat
+}
+
+# code → (zendende apparaattypes, frames/s per apparaat)
+CODES = {
+    "1081": (("10",), 1 / 300),
+    "10A0": (("07", "10"), 1 / 300),
+    "10A1": (("10",), 1 / 600),
+    "10E0": (("01", "04", "07", "10", "13", "34"), 1 / 3600),
+    "10E1": (("01", "10", "13"), 1 / 3600),
+    "1260": (("07",), 1 / 60),
+    "1280": (("10",), 1 / 300),
+    "1290": (("10",), 1 / 300),
+    "12C0": (("04", "34"), 1 / 300),
+    "22D9": (("10",), 1 / 60),
+    "22DB": (("10",), 1 / 300),
+    "30D0": (("07",), 1 / 60),
+    "3110": (("13",), 1 / 60),
+    "3114": (("10",), 1 / 60),
+    "3120": (("10",), 1 / 3600),
+    "3200": (("10",), 1 / 30),
+    "3E70": (("10",), 1 / 10),
+    # onbekend voor de decoder; 1F09 is wat de limiter herschrijft
+    "1F09": (("01",), 1 / 180),
+    "30C9": (("34",), 1 / 60),
+    "2309": (("04",), 1 / 600),
+    "0008": (("13",), 1 / 300),
+}
+# codes die later in de decoder bijkomen krijgen dit
+_DEFAULT_CODE = (("10",), 1 / 300)
+
+# payloadlengte (bytes) van de onbekende codes
+_UNKNOWN_SIZES = {"1F09": 3, "30C9": 3, "2309": 3, "0008": 2}
+
+MALFORMED = ("truncated", "garbage", "bad_hex", "odd_length")
+_GARBAGE = b"0123456789ABCDEFabcdef:-.!?*=xyz"
+
+_NO_ADDR = "--:------"
+
+
+def _field_value(rnd, scale, current, signed):
+    # realistische waarden voor wat de decoder schaalt; de rest willekeurig
+    if scale is decoder._c_from_u16_0p01:
+        return rnd.randint(1000, 8000)
+    if scale is decoder._c_or_none:
+        if rnd.random() < 0.02:
+            return 0x7FFF
+        return rnd.randint(-1500 if signed else 0, 4000 if signed else 8000)
+    if scale in (decoder._pct_or_none, decoder._pct_from_0_200):
+        return 0xFC if scale is decoder._pct_or_none and rnd.random() < 0.05 else rnd.randint(0, 200)
+    if scale is float:
+        return rnd.randint(20, 100)
+    return current
+
+
+def _signed(fmt):
+    # per waarde in de struct-tuple: signed integer? ("3s" is één waarde)
+    out = []
+    count = ""
+    for c in fmt.lstrip("<>=!@"):
+        if c.isdigit():
+            count += c
+            continue
+        out.extend([c.islower() and c not in "s?"] * (1 if c == "s" else int(count or 1)))
+        count = ""
+    return out
+
+
+class Mix:
+    """Device population, per-code rates and error shares of a synthetic network."""
+
+    def __init__(self, devices=20, code_rates=None, malformed=0.01, noncanonical=0.01,
+                 duplicates=0.05, seed=0):
+        self.rnd = random.Random(seed)
+        self.malformed = malformed
+        self.noncanonical = noncanonical
+        self.duplicates = duplicates
+
+        self.devices = []
+        used = set()
+        for dtype, share in POPULATION.items():
+            for _ in range(max(1, round(devices * share))):
+                while True:
+                    addr = f"{dtype}:{self.rnd.randrange(1000000):06d}"
+                    if addr not in used:
+                        break
+                used.add(addr)
+                self.devices.append((dtype, addr))
+        self.controller = next(addr for dtype, addr in self.devices if dtype == "01")
+
+        codes = dict(CODES)
+        for code in decoder.codes():
+            codes.setdefault(code, _DEFAULT_CODE)
+        for code, rate in (code_rates or {}).items():
+            codes[code.upper()] = (codes.get(code.upper(), _DEFAULT_CODE)[0], float(rate))
+        self.codes = codes
+
+        # (adres, code) per stroom, met cumulatieve frequentie
+        self.streams = []
+        cum = []
+        total = 0.0
+        for dtype, addr in self.devices:
+            for code, (types, rate) in codes.items():
+                if dtype in types and rate > 0:
+                    self.streams.append((addr, code))
+                    total += rate
+                    cum.append(total)
+        self._cum = cum
+        # natuurlijke frames/s van deze installatie (zonder kapotte regels)
+        self.rate = total
+
+    # --- één regel ----------------------------------------------------------
+
+    def payload(self, code):
+        rnd = self.rnd
+        entry = decoder.layouts(code)
+        if entry is not None:
+            lay = rnd.choice(entry[1])
+            values = list(lay.struct.unpack(rnd.randbytes(lay.size)))
+            scales = {}
+            for _, idx, scale in lay.fields:
+                scales.setdefault(idx, scale)
+            signed = _signed(lay.struct.format)
+            for idx, scale in scales.items():
+                if not isinstance(values[idx], bytes):
+                    values[idx] = _field_value(rnd, scale, values[idx], signed[idx])
+            return lay.struct.pack(*values)
+        if code == "10E0":
+            if rnd.random() < 0.5:
+                return b"%04d%c" % (rnd.randrange(10000), rnd.choice(b"ABCDE"))
+            return b"\x00\x00" + rnd.randbytes(6)
+        if code == "12C0":
+            return bytes((rnd.randrange(10, 60), rnd.choice((0, 1)), 0))
+        if code == "1F09":
+            return b"\xFF" + rnd.randrange(100, 800).to_bytes(2, "big")
+        return rnd.randbytes(_UNKNOWN_SIZES.get(code, rnd.randrange(1, 9)))
+
+    def frame(self, addr, code):
+        rnd = self.rnd
+        payload = self.payload(code)
+        r = rnd.random()
+        if r < 0.85:
+            verb, src, dst, via = " I", addr, _NO_ADDR, addr
+        elif r < 0.93:
+            verb, src, dst, via = "RP", addr, self.controller, _NO_ADDR
+        else:
+            verb, src, dst, via = "RQ", self.controller, addr, _NO_ADDR
+        return b"%03d %s --- %s %s %s %s %03d %s" % (
+            rnd.randint(40, 95), verb.encode(), src.encode(), dst.encode(), via.encode(),
+            code.encode(), len(payload), payload.hex().upper().encode(),
+        )
+
+    def _malformed(self, line):
+        rnd = self.rnd
+        kind = rnd.choice(MALFORMED)
+        if kind == "truncated":
+            return line[: rnd.randrange(1, len(line) - 1)]
+        if kind == "garbage":
+            return bytes(rnd.choices(_GARBAGE, k=rnd.randrange(1, 80)))
+        if kind == "bad_hex":
+            return line[:-2] + b"ZZ"
+        return line + b"0"
+
+    def _noncanonical(self, line):
+        # geldig, maar enkele spaties ("I" zonder voorloopspatie) en kleine letters
+        return b" ".join(line.split()).lower()
+
+    # --- pool ---------------------------------------------------------------
+
+    def pool(self, size):
+        """``size`` lines in emission order, drawn according to the mix."""
+        rnd = self.rnd
+        cum, streams, total = self._cum, self.streams, self.rate
+        known = set(decoder.codes())
+        out = []
+        self.composition = Counter()
+        while len(out) < size:
+            addr, code = streams[bisect.bisect_left(cum, rnd.random() * total)]
+            line = self.frame(addr, code)
+            r = rnd.random()
+            if r < self.malformed:
+                out.append(self._malformed(line))
+                self.composition["malformed"] += 1
+                continue
+            if r < self.malformed + self.noncanonical:
+                line = self._noncanonical(line)
+                self.composition["noncanonical"] += 1
+            self.composition[code if code in known else "unknown"] += 1
+            out.append(line)
+            if rnd.random() < self.duplicates:
+                # herhaling door het apparaat: zelfde frame, andere RSSI
+                out.append(b"%03d" % rnd.randint(40, 95) + line[3:])
+                self.composition["duplicate"] += 1
+        return out[:size]
+
+
+class SyntheticSource:
+    """
+    In-process stand-in for SerialInterface: ``read_frames`` returns the
+    lines that are due at ``rate`` per second, cycling through ``lines``.
+    With ``track`` every line is queued with its emission time in ``sent``.
+    """
+
+    def __init__(self, lines, rate, track=False, tick=0.001):
+        self.lines = lines
+        self.rate = rate
+        self.track = track
+        self.tick = tick
+        self.sent = deque()
+        self.emitted = 0
+        self._cycle = itertools.cycle(lines)
+        self._start = None
+        self._stop = False
+
+    def stop(self):
+        self._stop = True
+
+    def read_frames(self, timeout=1.0):
+        if self._stop:
+            time.sleep(min(timeout, 0.05))
+            return []
+        now = time.perf_counter()
+        if self._start is None:
+            self._start = now
+        due = int((now - self._start) * self.rate) - self.emitted
+        if due <= 0:
+            time.sleep(min(timeout, max(self.tick, (self.emitted + 1) / self.rate - (now - self._start))))
+            now = time.perf_counter()
+            due = int((now - self._start) * self.rate) - self.emitted
+            if due <= 0:
+                return []
+        frames = list(itertools.islice(self._cycle, due))
+        self.emitted += due
+        if self.track:
+            self.sent.extend(zip(frames, itertools.repeat(now)))
+        return frames
+
+
+def play_pty(stick, source, stop):
+    """Write the frames ``source`` makes due into the FakeStick until ``stop`` is set."""
+    while not stop.is_set():
+        frames = source.read_frames(0.05)
+        if frames:
+            # blokkeert als de lezer achterloopt: de pty-buffer is de backpressure
+            os.write(stick.master, b"\r\n".join(frames) + b"\r\n")
+
+
+# --- meten ------------------------------------------------------------------
+
+# eind-tot-eind latency: 10 µs … 10 s
+LATENCY_BUCKETS = (
+    10e-6, 25e-6, 50e-6, 100e-6, 250e-6, 500e-6, 1e-3, 2.5e-3, 5e-3,
+    10e-3, 25e-3, 50e-3, 100e-3, 250e-3, 500e-3, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class LatencyProbe:
+    """
+    Wraps a sink and records emission-to-handled latency in fixed-bucket
+    histograms (bounded memory, also over hours); frames the pipeline
+    dropped are skipped in the FIFO match and counted.
+    """
+
+    def __init__(self, inner, sent):
+        self.inner = inner
+        self.name = inner.name
+        self.blocking = inner.blocking
+        self.sent = sent
+        self.total = Histogram(LATENCY_BUCKETS)
+        self.interval = Histogram(LATENCY_BUCKETS)
+        self.interval_max = 0.0
+        self.max = 0.0
+        self.handled = 0
+        self.dropped = 0
+
+    def handle(self, frame, decoded):
+        self.inner.handle(frame, decoded)
+        now = time.perf_counter()
+        raw = frame.raw
+        sent = self.sent
+        while sent:
+            line, t = sent.popleft()
+            if line == raw:
+                latency = now - t
+                self.total.observe(latency)
+                self.interval.observe(latency)
+                if latency > self.interval_max:
+                    self.interval_max = latency
+                break
+            self.dropped += 1
+        self.handled += 1
+
+    def roll(self):
+        """Return and reset the interval histogram and maximum."""
+        hist, peak = self.interval, self.interval_max
+        self.interval = Histogram(LATENCY_BUCKETS)
+        self.interval_max = 0.0
+        self.max = max(self.max, peak)
+        return hist, peak
+
+
+def _rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _q(hist, q):
+    value = hist.quantile(q)
+    if value is None:
+        return "-"
+    return ">10s" if value == float("inf") else f"{value * 1000:g}"
+
+
+def run(lines, rate, seconds, report, runtime="async", use_pty=False, queue_size=1000,
+        log_path=None, dedup=None, trace=False):
+    """
+    Drive Pipeline with LogSink and StateStore for ``seconds`` at ``rate``
+    frames/s and print throughput, tail latency, CPU and RSS every
+    ``report`` seconds. The first interval is warm-up: RSS growth (and
+    with ``trace`` the tracemalloc diff) is measured against its end.
+    """
+    handler = logging.FileHandler(log_path or os.devnull)
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(logging.INFO)
+
+    synthetic = SyntheticSource(lines, rate, track=True)
+    stop = threading.Event()
+    stick = writer = None
+    if use_pty:
+        stick = FakeStick()
+        source = SerialInterface(stick.path, 115200, "bulk")
+        writer = threading.Thread(target=play_pty, args=(stick, synthetic, stop), name="synth-pty", daemon=True)
+    else:
+        source = synthetic
+
+    state = StateStore()
+    probe = LatencyProbe(sinks.LogSink(), synthetic.sent)
+    pipeline = Pipeline([probe, state], queue_size=queue_size)
+    if dedup:
+        from mitm.dedup import Deduplicator
+
+        pipeline.dedup = Deduplicator(dedup)
+
+    def reporter():
+        t0 = last_t = time.monotonic()
+        last_ru = resource.getrusage(resource.RUSAGE_SELF)
+        last_handled = 0
+        baseline = None
+        print(f"{'t s':>7}{'sent':>11}{'handled':>11}{'skipped':>9}{'fr/s':>8}"
+              f"{'p50 ms':>8}{'p99 ms':>8}{'p99.9':>8}{'max ms':>9}{'cpu %':>7}{'rss MB':>8}{'drss':>7}", flush=True)
+        while not stop.wait(max(0.0, min(report, t0 + seconds - last_t))):
+            now = time.monotonic()
+            ru = resource.getrusage(resource.RUSAGE_SELF)
+            hist, peak = probe.roll()
+            handled = probe.handled
+            cpu = (ru.ru_utime - last_ru.ru_utime) + (ru.ru_stime - last_ru.ru_stime)
+            rss = _rss_mb()
+            if baseline is None:
+                # eerste interval = opwarmen (decode-cache, state-tabel)
+                baseline = (now, rss, None)
+                if trace:
+                    tracemalloc.start()
+                    baseline = (now, rss, tracemalloc.take_snapshot())
+            print(f"{now - t0:>7.0f}{synthetic.emitted:>11}{handled:>11}{probe.dropped:>9}"
+                  f"{(handled - last_handled) / (now - last_t):>8.0f}"
+                  f"{_q(hist, 0.5):>8}{_q(hist, 0.99):>8}{_q(hist, 0.999):>8}{peak * 1000:>9.2f}"
+                  f"{100 * cpu / (now - last_t):>7.0f}{rss:>8.1f}{rss - baseline[1]:>+7.1f}", flush=True)
+            last_t, last_ru, last_handled = now, ru, handled
+            if now - t0 >= seconds:
+                break
+        stop.set()
+        synthetic.stop()
+        pipeline.stop()
+        summary(time.monotonic() - t0, baseline)
+
+    def summary(elapsed, baseline):
+        hist = probe.total
+        print(f"\nhandled {probe.handled} frames in {elapsed:.0f} s ({probe.handled / elapsed:.0f}/s), "
+              f"skipped {probe.dropped} (queue drops: {sum(pipeline.dropped.values())})")
+        print(f"latency p50≤{_q(hist, 0.5)} p99≤{_q(hist, 0.99)} p99.9≤{_q(hist, 0.999)} ms, max {probe.max * 1000:.2f} ms")
+        if pipeline.dedup is not None:
+            print(f"dedup suppressed {sum(pipeline.dedup.suppressed.values())}")
+        print(f"state records {len(state)}")
+        if baseline is not None:
+            span = time.monotonic() - baseline[0]
+            growth = _rss_mb() - baseline[1]
+            print(f"rss growth after warm-up {growth:+.1f} MB over {span / 60:.1f} min "
+                  f"({growth / span * 3600 if span > 0 else 0.0:+.1f} MB/h)")
+            if baseline[2] is not None:
+                snap = tracemalloc.take_snapshot()
+                tracemalloc.stop()
+                print("\ntracemalloc growth after warm-up (top 10):")
+                for stat in snap.compare_to(baseline[2], "lineno")[:10]:
+                    print(f"  {stat}")
+        sys.stdout.flush()
+
+    if writer is not None:
+        writer.start()
+    threading.Thread(target=reporter, name="synth-report", daemon=True).start()
+    try:
+        if runtime == "sync":
+            pipeline.run_sync(source)
+        else:
+            asyncio.run(pipeline.run_async(source))
+    finally:
+        stop.set()
+        synthetic.stop()
+        if writer is not None:
+            # de lezer is gestopt: pty leeghalen zodat een blokkerende write terugkeert
+            while writer.is_alive():
+                source.ser.reset_input_buffer()
+                writer.join(0.05)
+            stick.close()
+
+
+def _code_rates(values):
+    rates = {}
+    for value in values:
+        code, _, rate = value.partition("=")
+        rates[code] = float(rate)
+    return rates
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m mitm.synth", description="synthetic RAMSES-II traffic")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    parsers = {
+        "serve": sub.add_parser("serve", help="write into a pty for an external mitm.main"),
+        "capture": sub.add_parser("capture", help="write a replay capture file"),
+        "run": sub.add_parser("run", help="drive the in-process pipeline and report (bench/soak)"),
+    }
+    parsers["capture"].add_argument("out")
+    for name, p in parsers.items():
+        p.add_argument("--devices", type=int, default=20, help="number of devices (spread over types)")
+        p.add_argument("--rate", type=float, help="frames/s (default: the natural rate of the mix)")
+        p.add_argument("--code-rate", action="append", default=[], metavar="CODE=R",
+                       help="frames/s per sending device for CODE (repeatable)")
+        p.add_argument("--malformed", type=float, default=0.01, help="share of broken lines")
+        p.add_argument("--noncanonical", type=float, default=0.01, help="share of valid, non-canonical lines")
+        p.add_argument("--duplicates", type=float, default=0.05, help="share of frames repeated by the device")
+        p.add_argument("--pool", type=int, default=20000, help="unique lines generated up front")
+        p.add_argument("--seed", type=int, default=0)
+        p.add_argument("--seconds", type=float, default=60.0 if name != "serve" else float("inf"))
+    run_p = parsers["run"]
+    run_p.add_argument("--report", type=float, default=10.0, help="report interval in seconds")
+    run_p.add_argument("--pty", action="store_true", help="through a pty and SerialInterface instead of in-process")
+    run_p.add_argument("--runtime", choices=("async", "sync"), default="async")
+    run_p.add_argument("--queue-size", type=int, default=1000)
+    run_p.add_argument("--dedup", type=float, metavar="WINDOW", help="enable RF dedup with this window")
+    run_p.add_argument("--log-file", help="write RF log here (default: discard)")
+    run_p.add_argument("--tracemalloc", action="store_true", help="report allocation growth after warm-up (slows the pipeline)")
+    args = ap.parse_args(argv)
+
+    mix = Mix(args.devices, _code_rates(args.code_rate), args.malformed, args.noncanonical, args.duplicates, args.seed)
+    rate = args.rate or mix.rate
+    t = time.perf_counter()
+    lines = mix.pool(args.pool)
+    print(f"{len(mix.devices)} devices, {len(mix.streams)} streams, natural rate {mix.rate:.1f} frames/s, "
+          f"running at {rate:.0f}/s; pool of {len(lines)} lines in {time.perf_counter() - t:.1f} s", file=sys.stderr)
+    print("mix: " + ", ".join(f"{k}={v}" for k, v in sorted(mix.composition.items())), file=sys.stderr)
+
+    if args.cmd == "capture":
+        count = int(args.seconds * rate)
+        with open(args.out, "wb") as f:
+            f.write(b"# evohome-mitm synthetic capture, %d devices, %.1f frames/s\n" % (len(mix.devices), rate))
+            for i, line in zip(range(count), itertools.cycle(lines)):
+                f.write(b"%.6f\t%s\n" % (i / rate, line))
+        print(f"{count} frames written to {args.out}", file=sys.stderr)
+        return
+
+    if args.cmd == "serve":
+        stick = FakeStick()
+        stop = threading.Event()
+        print(f"fake evofw3 stick on {stick.path}", file=sys.stderr, flush=True)
+        if args.seconds != float("inf"):
+            threading.Timer(args.seconds, stop.set).start()
+        try:
+            play_pty(stick, SyntheticSource(lines, rate), stop)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            stop.set()
+            stick.close()
+        return
+
+    run(lines, rate, args.seconds, args.report, args.runtime, args.pty, args.queue_size,
+        args.log_file, args.dedup, args.tracemalloc)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+import pytest
+
+from mitm.config import Config
+
+# verplichte secties, verder alles standaard
+MINIMAL = {
+    "serial": {"device": "/dev/ttyMITM"},
+    "ch": {"max": 60, "idle": 10, "ramp_step": 2, "ramp_interval": 30},
+    "mqtt": {"host": "localhost"},
+}
+
+
+@pytest.fixture
+def make_config():
+    def make(**sections):
+        return Config(**dict(MINIMAL, **sections))
+
+    return make
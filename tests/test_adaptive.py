@@ -0,0 +1,79 @@
+import math
+
+import pytest
+
+from mitm.adaptive import AdaptiveCHMax, Curve, interpolate
+from mitm.limiter import CHLimiter
+
+POINTS = [
+    {"outdoor": -10, "ch_max": 55},
+    {"outdoor": 0, "ch_max": 45},
+    {"outdoor": 12, "ch_max": 38},
+]
+
+
+@pytest.mark.parametrize("lut", [False, True])
+def test_curve_interpolates_and_holds_end_values(lut):
+    curve = Curve(POINTS, 38, 55, lut)
+    assert curve(-20) == 55
+    assert curve(20) == 38
+    assert curve(-5) == pytest.approx(50)
+    for t in (-9.3, -0.1, 3.7, 11.9):
+        x0, y0, x1, y1 = (-10, 55, 0, 45) if t < 0 else (0, 45, 12, 38)
+        assert curve(t) == pytest.approx(interpolate(t, x0, y0, x1, y1), abs=0.1 if lut else 1e-9)
+
+
+@pytest.mark.parametrize("lut", [False, True])
+@pytest.mark.parametrize("t", [math.nan, math.inf, -math.inf])
+def test_curve_rejects_non_finite(lut, t):
+    assert Curve(POINTS, 38, 55, lut)(t) is None
+
+
+def test_curve_many():
+    curve = Curve(POINTS, 38, 55)
+    assert curve.many([None, -20, math.nan]) == [None, 55, None]
+
+
+class _Context:
+    def __init__(self, outdoor):
+        self.outdoor = outdoor
+
+    def get_outdoor_temperature(self):
+        return self.outdoor
+
+
+def _adaptive(make_config):
+    return make_config(ch={"max": 60, "idle": 10, "ramp_step": 2, "ramp_interval": 30,
+                           "adaptive": {"enabled": True, "min": 38, "max": 55, "curve": POINTS}})
+
+
+def test_limiter_falls_back_to_ch_max_on_nan(make_config):
+    cfg = _adaptive(make_config)
+    limiter = CHLimiter(cfg, _Context(math.nan), AdaptiveCHMax(cfg), clock=lambda: 0.0)
+    assert limiter.effective_max() == 60
+    assert limiter.limit(70.0) == 60
+
+
+def test_limiter_uses_curve(make_config):
+    cfg = _adaptive(make_config)
+    limiter = CHLimiter(cfg, _Context(0.0), AdaptiveCHMax(cfg), clock=lambda: 0.0)
+    assert limiter.limit(70.0) == 45
+
+
+def test_limiter_ramps_up_and_drops_immediately(make_config):
+    now = [0.0]
+    cfg = make_config()
+    limiter = CHLimiter(cfg, _Context(None), AdaptiveCHMax(cfg), clock=lambda: now[0])
+    assert limiter.limit(40.0) == 40.0
+    now[0] = 10.0
+    assert limiter.limit(50.0) == 40.0
+    now[0] = 40.0
+    assert limiter.limit(50.0) == 42.0
+    assert limiter.limit(30.0) == 30.0
+
+
+def test_curve_many_numpy_matches_scalar():
+    np = pytest.importorskip("numpy")
+    curve = Curve(POINTS, 38, 55)
+    temps = np.array([-20.0, -10.0, -5.0, 0.0, 3.7, 12.0, 20.0])
+    assert curve.many(temps).tolist() == pytest.approx([curve(t) for t in temps.tolist()])
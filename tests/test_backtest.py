@@ -0,0 +1,53 @@
+from mitm import backtest
+from mitm.ramses import parse_frame
+from mitm.recorder import Recorder
+
+POINTS = [{"outdoor": -10, "ch_max": 55}, {"outdoor": 10, "ch_max": 35}]
+
+
+def _line(code, payload):
+    return b"045  I --- 01:123456 --:------ 01:123456 %s %03d %s" % (code, len(payload) // 2, payload)
+
+
+def _config(make_config, **context):
+    return make_config(
+        ch={"max": 60, "idle": 10, "ramp_step": 2, "ramp_interval": 30,
+            "adaptive": {"enabled": True, "min": 35, "max": 55, "curve": POINTS}},
+        context=context,
+    )
+
+
+def test_evr_events_match_text_capture(tmp_path):
+    frames = [(1000.0, _line(b"1290", b"01F4")), (1010.0, _line(b"1F09", b"FF0258")), (1020.0, _line(b"1290", b"7FFF"))]
+    rec = Recorder(str(tmp_path / "evr"), flush_interval=3600)
+    for ts, line in frames:
+        rec.write(parse_frame(line), ts)
+    rec.close()
+    capture = tmp_path / "capture.txt"
+    capture.write_bytes(b"".join(b"%.6f\t%s\n" % (ts - 1000.0, line) for ts, line in frames))
+
+    expected = [(1000.0, backtest.OUTDOOR, "5.00"), (1010.0, backtest.SETPOINT, 60.0)]
+    assert backtest.load_events([str(tmp_path / "evr")]) == expected
+    assert backtest.load_events([str(capture)], start=1000.0) == expected
+
+
+def test_outdoor_values_are_validated_like_mqtt(tmp_path, make_config):
+    csv = tmp_path / "outdoor.csv"
+    csv.write_text("ts,value\n0,0\n10,nan\n20,unavailable\n")
+    events = backtest.load_events([], str(csv)) + [(30.0, backtest.SETPOINT, 60.0)]
+    trace = backtest.run(_config(make_config), events)
+    # nan en tekst worden genegeerd: 0 °C blijft gelden → curve 45
+    assert trace == [(30.0, 0.0, 45.0, 60.0, 45.0)]
+
+
+def test_context_signals_from_config_apply(make_config):
+    events = [(0.0, backtest.OUTDOOR, "5"), (10.0, backtest.SETPOINT, 60.0), (1000.0, backtest.SETPOINT, 60.0)]
+    cfg = _config(make_config, signals={"outdoor_temperature": {"max": 0, "max_age": 100}})
+    trace = backtest.run(cfg, events)
+    # 5 °C ligt buiten het ingestelde bereik: geen buitentemperatuur, vaste max
+    assert [t[1:3] for t in trace] == [(None, 60), (None, 60)]
+
+    cfg = _config(make_config, signals={"outdoor_temperature": {"max_age": 100}})
+    trace = backtest.run(cfg, events)
+    # binnen max_age de curve, daarna de vaste max
+    assert [t[1:3] for t in trace] == [(5.0, 40.0), (None, 60)]
@@ -0,0 +1,54 @@
+from mitm.cache import LRUCache
+from mitm.decoder import decode, decode_cache
+
+
+def test_least_recently_used_is_evicted():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.evictions == 1 and len(cache) == 2
+
+
+def test_put_existing_key_refreshes_it():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.put("a", 10)
+    cache.put("c", 3)
+    assert cache.get("a") == 10 and cache.get("b", "gone") == "gone"
+
+
+def test_counters_and_hit_ratio():
+    cache = LRUCache(4)
+    assert cache.stats()["hit_ratio"] == 0.0
+    cache.put("a", 1)
+    cache.get("a")
+    cache.get("a")
+    cache.get("x")
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"], stats["maxsize"]) == (2, 1, 1, 4)
+    assert stats["hit_ratio"] == 2 / 3
+
+
+def test_zero_size_disables_and_resize_evicts():
+    cache = LRUCache(0)
+    cache.put("a", 1)
+    assert len(cache) == 0
+    cache.resize(3)
+    for key in "abc":
+        cache.put(key, key)
+    cache.resize(1)
+    assert len(cache) == 1 and cache.get("c") == "c" and cache.evictions == 2
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_decode_cache_returns_shared_result():
+    decode_cache.clear()
+    first = decode("3200", "1D4C")
+    assert decode("3200", "1D4C") is first
+    assert decode_cache.stats()["hits"] >= 1
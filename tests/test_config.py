@@ -0,0 +1,49 @@
+import os
+
+import yaml
+
+from mitm.config import Config
+
+SHIPPED = os.path.join(os.path.dirname(__file__), "..", "config", "config.yaml")
+
+
+def _shipped():
+    with open(SHIPPED) as f:
+        return Config(**yaml.safe_load(f))
+
+
+def test_shipped_config_loads():
+    cfg = _shipped()
+    assert cfg.serial_device == "/dev/ttyMITM"
+
+
+def test_shipped_config_logs_every_frame(make_config):
+    # elk frame loggen, zoals zonder config
+    for cfg in (_shipped(), make_config()):
+        assert not cfg.log_sample_every and not cfg.log_max_per_minute
+
+
+def test_runtime_defaults_to_sync_loop(make_config):
+    assert make_config().runtime_mode == "sync"
+    assert _shipped().runtime_mode == "sync"
+
+
+def test_serial_reader_defaults_to_line(make_config):
+    assert make_config().serial_reader == "line"
+    assert _shipped().serial_reader == "line"
+    sticks = make_config(serial={"sticks": [{"device": "/dev/ttyA"}, {"device": "/dev/ttyB"}]})
+    assert sticks.serial_reader == "bulk"
+
+
+def test_logging_defaults_to_synchronous(make_config):
+    assert make_config().log_async is False
+    assert _shipped().log_async is False
+
+
+def test_opt_in_features_are_off_by_default(make_config):
+    cfg = _shipped()
+    defaults = make_config()
+    for attr in ("state_enabled", "dedup_enabled", "profile_enabled", "snapshot_enabled", "recorder_enabled",
+                 "forward_enabled", "publish_enabled", "metrics_enabled", "mqtt_publish_raw"):
+        assert getattr(cfg, attr) is False, attr
+        assert getattr(defaults, attr) is False, attr
@@ -0,0 +1,53 @@
+import pytest
+
+from mitm.context import Context, Signal
+
+
+@pytest.mark.parametrize("payload", ["nan", "NaN", "inf", "-inf", "1e999", "", "warm", "-31", "50.5"])
+def test_outdoor_temperature_rejects_invalid(payload):
+    ctx = Context(clock=lambda: 0.0)
+    assert ctx.update("outdoor_temperature", payload) is None
+    assert ctx.get_outdoor_temperature() is None
+    assert ctx.rejected == 1
+
+
+def test_outdoor_temperature_accepts_and_expires():
+    now = [0.0]
+    ctx = Context(clock=lambda: now[0])
+    assert ctx.update("outdoor_temperature", " 7.4\n") == 7.4
+    now[0] = 900.0
+    assert ctx.get_outdoor_temperature() == 7.4
+    now[0] = 901.0
+    assert ctx.get_outdoor_temperature() is None
+
+
+@pytest.mark.parametrize("payload", ["NaN", '{"power": NaN}', '[1, Infinity]', '{"power": -Infinity}', '{"power": 1e999}'])
+def test_json_rejects_non_finite(payload):
+    with pytest.raises(ValueError):
+        Signal("heatpump", type="json").parse(payload)
+
+
+def test_json_and_values():
+    assert Signal("heatpump", type="json").parse('{"power": 1.5, "on": true}') == {"power": 1.5, "on": True}
+    tariff = Signal("tariff", type="str", values=["low", "high"])
+    assert tariff.parse("low") == "low"
+    with pytest.raises(ValueError):
+        tariff.parse("peak")
+
+
+def test_bool():
+    signal = Signal("away", type="bool")
+    assert signal.parse("ON") is True and signal.parse("0") is False
+    with pytest.raises(ValueError):
+        signal.parse("maybe")
+
+
+def test_wildcard_signals_and_snapshot():
+    ctx = Context({"room/+": {"type": "float", "min": 5, "max": 35}}, clock=lambda: 0.0)
+    assert ctx.update("room/woonkamer", "21.5") == 21.5
+    assert ctx.update("room/woonkamer", "nan") is None
+    assert ctx.update("unknown", "1") is None
+    snap = ctx.snapshot()
+    assert dict(snap) == {"room/woonkamer": (21.5, 0.0)}
+    with pytest.raises(TypeError):
+        snap["x"] = 1
@@ -0,0 +1,112 @@
+import math
+import random
+
+import pytest
+
+from bench import legacy_decoder
+from bench.bench_decoder import SAMPLES
+from mitm import decoder
+from mitm.decoder import Layout
+
+
+@pytest.mark.parametrize("code,payload", sorted(SAMPLES.items()))
+def test_matches_legacy_decoder(code, payload):
+    assert decoder._decode(code, payload) == legacy_decoder.decode(code, payload)
+
+
+def test_matches_legacy_decoder_on_random_payloads():
+    rnd = random.Random(7)
+    for code in decoder.codes():
+        for size in range(0, 12):
+            for _ in range(20):
+                payload = rnd.randbytes(size).hex().upper()
+                assert decoder._decode(code, payload) == legacy_decoder.decode(code, payload), (code, payload)
+
+
+def test_unknown_code():
+    assert decoder.decode("1F09", "FF0546") is None
+
+
+def test_short_payload_is_decode_error():
+    result = decoder.decode("3200", "1D")
+    assert result["decode_error"] == "payload_too_short"
+    assert result["payload"] == "1D"
+
+
+def test_each_code_has_its_own_message_class():
+    for code in decoder.codes():
+        entry = decoder.layouts(code)
+        if entry is None:
+            continue
+        for lay in entry[1]:
+            assert lay.message.code == code
+
+
+def test_shared_layout_is_rejected():
+    lay = Layout("B", ("value", 0, None))
+    decoder.register("7FF0", "test", lay)
+    try:
+        with pytest.raises(ValueError):
+            decoder.register("7FF1", "test", lay)
+    finally:
+        for code in ("7FF0", "7FF1"):
+            decoder._REGISTRY.pop(code, None)
+            decoder._LAYOUTS.pop(code, None)
+
+
+def test_results_are_immutable():
+    result = decoder.decode("3200", "1D4C1770")
+    assert result["supply_c"] == 75.0
+    with pytest.raises(AttributeError):
+        result.supply_c = 1.0
+
+
+def _same(column_value, ref):
+    # kolomvorm: NaN voor None, ruwe integer voor _hex8, bytes voor _hexstr
+    if ref is None:
+        return column_value is None or (isinstance(column_value, float) and math.isnan(column_value))
+    if isinstance(column_value, bytes):
+        return decoder._hexstr(column_value) == ref
+    if isinstance(ref, str) and ref.startswith("0x") and isinstance(column_value, int):
+        return decoder._hex8(column_value) == ref
+    return column_value == ref
+
+
+def _payloads(rnd):
+    for size in range(0, 12):
+        for _ in range(10):
+            payload = rnd.randbytes(size)
+            yield payload.hex().upper()
+            yield payload.hex()
+            yield payload
+        # afgekapt (oneven aantal hex-tekens) en N/A-markers
+        yield rnd.randbytes(size + 1).hex().upper()[:-1]
+        yield "7FFF" * (size // 2) + "FC" * (size % 2)
+
+
+@pytest.mark.parametrize("code", decoder.codes())
+def test_decode_many_matches_decode(code):
+    rnd = random.Random(code)
+    payloads = list(_payloads(rnd))
+    items = [(code, p) for p in payloads] + [("FFFF", "00")]
+    result = decoder.decode_many(items)
+    assert set(result) == {code}
+    batch = result[code]
+
+    rows = dict(zip(batch.index, range(len(batch))))
+    assert sorted(list(rows) + batch.errors) == list(range(len(payloads)))
+    for i, p in enumerate(payloads):
+        hex_ = p.hex() if isinstance(p, bytes) else p
+        try:
+            ref = decoder._decode(code, hex_)
+        except ValueError:
+            ref = None
+        if ref is None or "decode_error" in ref:
+            assert i in batch.errors, (code, p)
+            continue
+        row = rows[i]
+        assert batch.meaning == ref["meaning"]
+        for field in set(batch.columns) | (set(ref) - {"meaning"}):
+            column = batch.columns.get(field)
+            assert column is not None, (code, p, field)
+            assert _same(column[row], ref.get(field)), (code, p, field, column[row], ref.get(field))
@@ -0,0 +1,68 @@
+import pytest
+
+from mitm.dedup import Deduplicator
+
+A = b"045  I --- 04:123456 --:------ 04:123456 30C9 003 0007D0"
+B = b"045  I --- 04:123456 --:------ 04:123456 30C9 003 0007D1"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_repeat_within_window_is_suppressed():
+    clock = Clock()
+    dedup = Deduplicator(1.0, clock=clock)
+    assert dedup.filter([A, B, A]) == [A, B]
+    clock.now += 0.5
+    assert dedup.filter([A]) == []
+    assert dedup.stats() == {"30C9": 2}
+    assert dedup.passed == 2
+
+
+def test_rssi_is_not_part_of_the_key():
+    dedup = Deduplicator(1.0, clock=Clock())
+    assert dedup.filter([A, b"072" + A[3:]]) == [A]
+
+
+def test_window_expires():
+    clock = Clock()
+    dedup = Deduplicator(1.0, clock=clock)
+    dedup.filter([A])
+    clock.now += 1.2
+    assert dedup.filter([A]) == [A]
+
+
+def test_suppressed_copies_do_not_extend_the_window():
+    clock = Clock()
+    dedup = Deduplicator(1.0, clock=clock)
+    seen = []
+    for _ in range(25):
+        seen += dedup.filter([A])
+        clock.now += 0.1
+    # elke ~1 s één kopie door, ondanks een continue stroom
+    assert 2 <= len(seen) <= 3
+
+
+def test_expired_keys_are_removed():
+    clock = Clock()
+    dedup = Deduplicator(1.0, clock=clock)
+    dedup.filter([A, B])
+    assert len(dedup) == 2
+    for _ in range(12):
+        clock.now += 0.1
+        dedup.filter([])
+    dedup.filter([b"045  I --- 01:000001 --:------ 01:000001 1F09 003 FF0546"])
+    assert len(dedup) == 1
+    clock.now += 60
+    dedup.filter([A])
+    assert len(dedup) == 1
+
+
+def test_window_must_be_positive():
+    with pytest.raises(ValueError):
+        Deduplicator(0)
@@ -0,0 +1,76 @@
+import pytest
+
+from mitm.filters import FilteredSink, FrameFilter, build
+from mitm.ramses import parse_frame
+
+CTL = b"045  I --- 01:123456 --:------ 01:123456 1F09 003 FF0546"
+TRV = b"060  I --- 04:111111 --:------ 04:111111 30C9 003 0007D0"
+OTB = b"050 RP --- 10:061315 01:123456 --:------ 3200 003 001234"
+OTB_LOOSE = b"50 rp --- 10:061315 01:123456 --:------ 3200 003 001234"
+
+
+def test_no_rules_pass_everything():
+    f = FrameFilter()
+    assert f.filter([CTL, TRV, OTB]) == [CTL, TRV, OTB]
+
+
+def test_include_codes_from_yaml_ints():
+    # YAML levert 1290 als int en 0004 als 4
+    f = FrameFilter(include=[{"code": [3200, "30c9"]}])
+    assert f.filter([CTL, TRV, OTB]) == [TRV, OTB]
+    assert f.dropped == 1
+
+
+def test_exclude_by_device_type_alias():
+    f = FrameFilter(exclude=[{"src_type": "trv"}])
+    assert f.filter([CTL, TRV, OTB]) == [CTL, OTB]
+
+
+def test_addr_matches_src_or_dst():
+    f = FrameFilter(include=[{"addr": "01:123456"}])
+    assert f.filter([CTL, TRV, OTB]) == [CTL, OTB]
+
+
+def test_multi_field_rule_needs_all_fields():
+    f = FrameFilter(include=[{"verb": "RP", "code": "1F09"}, {"verb": "rp", "code": "3200"}])
+    assert f.filter([CTL, TRV, OTB]) == [OTB]
+
+
+def test_include_and_exclude():
+    f = FrameFilter(include=[{"type": "01"}], exclude=[{"verb": "I"}])
+    assert f.filter([CTL, TRV, OTB]) == [OTB]
+
+
+def test_non_canonical_lines_are_normalised_and_garbage_never_matches():
+    f = FrameFilter(include=[{"code": "3200"}])
+    assert f.filter([OTB_LOOSE, b"# evofw3 0.7.1", b""]) == [OTB_LOOSE]
+    assert FrameFilter(exclude=[{"code": "3200"}]).filter([b"!V"]) == [b"!V"]
+
+
+def test_unknown_field_is_rejected():
+    with pytest.raises(ValueError):
+        FrameFilter(include=[{"colour": "red"}])
+    with pytest.raises(ValueError):
+        FrameFilter(include=[{}])
+
+
+class Sink:
+    name = "log"
+    blocking = True
+
+    def __init__(self):
+        self.seen = []
+
+    def handle(self, frame, decoded):
+        self.seen.append(frame.code)
+
+
+def test_build_and_filtered_sink():
+    pre, per_sink = build({"all": {"exclude": [{"code": "30C9"}]}, "log": {"include": [{"code": "1F09"}]}})
+    assert pre.filter([CTL, TRV]) == [CTL]
+    sink = FilteredSink(Sink(), per_sink["log"])
+    assert (sink.name, sink.blocking) == ("log", True)
+    for raw in (CTL, OTB):
+        sink.handle(parse_frame(raw), None)
+    assert sink.inner.seen == ["1F09"]
+    assert per_sink["log"].dropped == 1
@@ -0,0 +1,135 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from mitm import forward
+from mitm.context import Context
+from mitm.forward import Forwarder
+from mitm.limiter import CHLimiter
+
+LINE_1F09 = b"045  I --- 01:123456 --:------ 01:123456 1F09 003 FF0546"
+LINE_3200 = b"073  I --- 10:061315 --:------ 10:061315 3200 004 1D4C1770"
+
+
+class FakeTx:
+    def __init__(self):
+        self.lines = []
+
+    def write_frame(self, line):
+        self.lines.append(line)
+
+
+class FixedLimiter:
+    def __init__(self, value):
+        self.value = value
+        self.requests = []
+
+    def limit(self, requested):
+        self.requests.append(requested)
+        return min(requested, self.value)
+
+    def checkpoint(self):
+        return len(self.requests)
+
+    def rollback(self, state):
+        del self.requests[state:]
+
+
+def _forwarder(limit=60.0, budget=1.0):
+    tx = FakeTx()
+    return Forwarder(tx, FixedLimiter(limit), budget), tx
+
+
+def test_other_codes_pass_unchanged_without_rssi():
+    fwd, tx = _forwarder()
+    fwd.handle(LINE_3200, 0.0)
+    assert tx.lines == [LINE_3200[5:]]
+
+
+def test_1f09_is_rewritten():
+    fwd, tx = _forwarder(limit=60.0)
+    fwd.handle(LINE_1F09, time.perf_counter())
+    assert tx.lines == [b"I --- 01:123456 --:------ 01:123456 1F09 003 FF0258"]
+    assert fwd.rewritten == 1
+
+
+def test_1f09_below_limit_is_not_rewritten():
+    fwd, tx = _forwarder(limit=200.0)
+    fwd.handle(LINE_1F09, 0.0)
+    assert tx.lines == [LINE_1F09[5:]]
+    assert fwd.rewritten == 0
+
+
+def test_over_budget_sends_original():
+    fwd, tx = _forwarder(limit=60.0, budget=0.0)
+    fwd.handle(LINE_1F09, 0.0)
+    assert tx.lines == [LINE_1F09[5:]]
+    assert fwd.over_budget == 1
+
+
+def test_non_canonical_1f09_is_limited():
+    fwd, tx = _forwarder(limit=60.0)
+    fwd.handle(b"45 i --- 01:123456 --:------ 01:123456 1f09 003 ff0546", time.perf_counter())
+    assert tx.lines == [b"I --- 01:123456 --:------ 01:123456 1F09 003 FF0258"]
+
+
+@pytest.mark.parametrize("raw", [
+    b"",
+    b"!V",
+    b"# evofw3 0.7.1",
+    b"*CRC",
+    b"045  I --- 01:123456 --:------ 01:123456 1F09 003 FF05ZZ",
+    b"\x00\xff garbage",
+])
+def test_non_frames_are_not_forwarded(raw):
+    fwd, tx = _forwarder()
+    fwd.handle(raw, 0.0)
+    assert tx.lines == []
+    assert fwd.rejected == 1
+
+
+def test_echo_is_not_forwarded_again():
+    fwd, tx = _forwarder()
+    fwd.handle(LINE_3200, 0.0)
+    fwd.handle(b"080" + LINE_3200[3:], 0.0)
+    assert len(tx.lines) == 1
+    assert fwd.echoes == 1
+
+
+class FailingLimiter(FixedLimiter):
+    def __init__(self):
+        super().__init__(None)
+
+    def limit(self, requested):
+        raise IndexError("curve")
+
+
+def test_limiter_error_sends_original():
+    tx = FakeTx()
+    fwd = Forwarder(tx, FailingLimiter(), 1.0)
+    fwd.handle(LINE_1F09, time.perf_counter())
+    assert tx.lines == [LINE_1F09[5:]]
+    assert fwd.errors == 1
+
+
+def test_over_budget_before_limiter_leaves_limiter_untouched():
+    fwd, tx = _forwarder(limit=60.0, budget=0.0)
+    fwd.handle(LINE_1F09, 0.0)
+    assert fwd.limiter.requests == []
+
+
+def test_discarded_rewrite_rolls_back_limiter(monkeypatch):
+    cfg = SimpleNamespace(ch_max=60, ramp_step=2, ramp_interval=30)
+    limiter = CHLimiter(cfg, Context(), SimpleNamespace(compute=lambda t: None), clock=lambda: 1000.0)
+    tx = FakeTx()
+    fwd = Forwarder(tx, limiter, budget=0.005)
+
+    def slow_patch(buf, value):
+        time.sleep(0.02)
+
+    monkeypatch.setattr(forward, "patch_ch_value", slow_patch)
+    fwd.handle(LINE_1F09, time.perf_counter())
+    assert tx.lines == [LINE_1F09[5:]]
+    assert fwd.over_budget == 1
+    assert (limiter.last_value, limiter.last_time) == (None, 0)
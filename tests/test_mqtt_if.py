@@ -0,0 +1,111 @@
+from types import SimpleNamespace
+
+import paho.mqtt.client as mqtt
+
+from mitm.mqtt_if import RAW_TOPIC, Outbox
+
+
+class Client:
+    """Fake paho client: records publishes, answers with a settable rc."""
+
+    def __init__(self):
+        self.connected = True
+        self.rc = mqtt.MQTT_ERR_SUCCESS
+        self.published = []
+        self.on_publish = None
+
+    def is_connected(self):
+        return self.connected
+
+    def publish(self, topic, payload, retain=False):
+        if self.on_publish is not None:
+            self.on_publish()
+        rc = self.rc if self.connected else mqtt.MQTT_ERR_NO_CONN
+        if rc == mqtt.MQTT_ERR_SUCCESS:
+            self.published.append((topic, payload, retain))
+        return SimpleNamespace(rc=rc)
+
+
+def _balanced(outbox):
+    stats = outbox.stats()
+    return stats["queued"] == stats["sent"] + stats["dropped"] + stats["failed"] + stats["pending"]
+
+
+def test_full_ring_drops_oldest_and_counts():
+    outbox = Outbox(Client(), size=3)
+    for i in range(5):
+        outbox.put("t", str(i))
+    assert outbox.stats()["dropped"] == 2
+    outbox._drain()
+    assert [p for _, p, _ in outbox.client.published] == ["2", "3", "4"]
+    assert _balanced(outbox)
+
+
+def test_disconnected_send_is_retried_after_reconnect():
+    client = Client()
+    outbox = Outbox(client, size=10)
+    client.connected = False
+    outbox.put("a", "1", retain=True)
+    outbox.put("b", "2")
+    outbox._drain()
+    assert client.published == [] and outbox.stats()["pending"] == 2
+    client.connected = True
+    outbox._drain()
+    assert client.published == [("a", "1", True), ("b", "2", False)]
+    assert outbox.stats()["failed"] == 0 and _balanced(outbox)
+
+
+def test_requeue_keeps_newest_when_put_refilled_the_ring():
+    client = Client()
+    outbox = Outbox(client, size=3)
+    for i in range(3):
+        outbox.put("t", f"old{i}")
+
+    def refill():
+        # RF-pad vult de ring terwijl paho de verbinding kwijt is
+        client.on_publish = None
+        client.connected = False
+        for i in range(3):
+            outbox.put("t", f"new{i}")
+
+    client.on_publish = refill
+    outbox._drain()
+    client.connected = True
+    outbox._drain()
+    assert [p for _, p, _ in client.published] == ["new0", "new1", "new2"]
+    assert outbox.stats()["dropped"] == 3 and _balanced(outbox)
+
+
+def test_batching_joins_payloads_per_topic():
+    client = Client()
+    outbox = Outbox(client, size=10, batch_interval=1.0)
+    outbox.put(RAW_TOPIC, "line1")
+    outbox.put("evohome/mitm/metrics", "{}")
+    outbox.put(RAW_TOPIC, "line2")
+    outbox._drain()
+    assert client.published == [("evohome/mitm/metrics", "{}", False), (RAW_TOPIC, "line1\nline2", False)]
+    assert outbox.stats()["sent"] == 3 and _balanced(outbox)
+
+
+def test_failed_batch_is_requeued_not_discarded():
+    client = Client()
+    outbox = Outbox(client, size=10, batch_interval=1.0)
+    outbox.put(RAW_TOPIC, "line1")
+    outbox.put(RAW_TOPIC, "line2")
+    client.rc = mqtt.MQTT_ERR_QUEUE_SIZE
+    outbox._drain()
+    assert outbox.stats()["pending"] == 2 and outbox.stats()["failed"] == 0
+    client.rc = mqtt.MQTT_ERR_SUCCESS
+    outbox._drain()
+    assert client.published == [(RAW_TOPIC, "line1\nline2", False)]
+    assert _balanced(outbox)
+
+
+def test_hard_publish_error_counts_as_failed():
+    client = Client()
+    outbox = Outbox(client, size=10)
+    client.rc = mqtt.MQTT_ERR_PAYLOAD_SIZE
+    outbox.put("t", "x" * 10)
+    outbox._drain()
+    assert outbox.stats()["failed"] == 1 and outbox.stats()["pending"] == 0
+    assert _balanced(outbox)
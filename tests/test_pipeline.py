@@ -0,0 +1,139 @@
+import asyncio
+import time
+
+import pytest
+
+from mitm.dedup import Deduplicator
+from mitm.filters import FrameFilter
+from mitm.metrics import Metrics
+from mitm.pipeline import Pipeline
+
+CTL = b"045  I --- 01:123456 --:------ 01:123456 1F09 003 FF0546"
+TRV = b"060  I --- 04:111111 --:------ 04:111111 30C9 003 0007D0"
+GARBAGE = b"# evofw3 0.7.1"
+
+
+class Source:
+    """Fake serial: hands out the given blocks, then stops the pipeline."""
+
+    def __init__(self, pipeline, blocks):
+        self.pipeline = pipeline
+        self.blocks = list(blocks)
+
+    def read_frames(self, timeout=1.0):
+        if not self.blocks:
+            self.pipeline.stop()
+            return []
+        return self.blocks.pop(0)
+
+
+class Sink:
+    name = "test"
+    blocking = False
+
+    def __init__(self):
+        self.frames = []
+
+    def handle(self, frame, decoded):
+        self.frames.append(frame.raw)
+
+
+def _pipeline(**kw):
+    sink = Sink()
+    pipeline = Pipeline([sink], metrics=Metrics(), **kw)
+    pipeline.filter = FrameFilter(exclude=[{"code": "30C9"}])
+    pipeline.dedup = Deduplicator(60.0)
+    return pipeline, sink
+
+
+BLOCKS = [[CTL, TRV, CTL], [GARBAGE, TRV]]
+
+
+def test_frames_in_counts_lines_before_filter_and_dedup_sync():
+    pipeline, sink = _pipeline()
+    pipeline.run_sync(Source(pipeline, BLOCKS))
+    assert sink.frames == [CTL, GARBAGE]
+    counters = pipeline.metrics.counters
+    assert counters["frames_in"] == 5
+    assert counters["parse_failures"] == 1
+    # gelezen = doorgelaten + weggefilterd + onderdrukt
+    assert pipeline.filter.dropped == 2 and pipeline.dedup.stats() == {"1F09": 1}
+
+
+def test_frames_in_counts_lines_before_filter_and_dedup_async():
+    pipeline, sink = _pipeline()
+    asyncio.run(pipeline.run_async(Source(pipeline, BLOCKS)))
+    assert pipeline.metrics.counters["frames_in"] == 5
+
+
+def _drain(queue):
+    out = []
+    while not queue.empty():
+        out.append(queue.get_nowait())
+    return out
+
+
+@pytest.mark.parametrize("policy,kept", [
+    ("drop_oldest", [3, 4]),
+    ("drop_newest", [1, 2]),
+])
+def test_full_queue_applies_drop_policy(policy, kept):
+    pipeline = Pipeline([], queue_size=2, drop_policy=policy)
+    queue = asyncio.Queue(2)
+    pipeline._offer_many("serial", queue, [1, 2, 3, 4])
+    assert _drain(queue) == kept
+    assert pipeline.dropped == {"serial": 2}
+
+
+def test_drop_oldest_keeps_unfinished_task_count():
+    pipeline = Pipeline([], queue_size=1)
+    queue = asyncio.Queue(1)
+    pipeline._offer("log", queue, "a")
+    pipeline._offer("log", queue, "b")
+    queue.get_nowait()
+    queue.task_done()
+    # join() zou blijven hangen als het weggegooide item nog meetelde
+    assert queue._unfinished_tasks == 0
+
+
+def test_unknown_drop_policy_is_rejected():
+    with pytest.raises(ValueError):
+        Pipeline([], drop_policy="block")
+
+
+class PacedSource:
+    """One block per read, a few ms apart, then idle until stopped."""
+
+    def __init__(self, blocks):
+        self.blocks = list(blocks)
+
+    def read_frames(self, timeout=1.0):
+        time.sleep(0.005)
+        return self.blocks.pop(0) if self.blocks else []
+
+
+class SlowSink(Sink):
+    name = "slow"
+    blocking = True
+
+    def handle(self, frame, decoded):
+        time.sleep(0.05)
+        super().handle(frame, decoded)
+
+
+def test_slow_sink_drops_instead_of_blocking_the_reader():
+    slow, fast = SlowSink(), Sink()
+    pipeline = Pipeline([slow, fast], queue_size=2)
+    lines = [b"%03d" % i + CTL[3:] for i in range(20)]
+    source = PacedSource([[line] for line in lines])
+
+    async def run():
+        task = asyncio.create_task(pipeline.run_async(source))
+        while len(fast.frames) < 20 and not task.done():
+            await asyncio.sleep(0.01)
+        pipeline.stop()
+        await task
+
+    asyncio.run(run())
+    assert len(fast.frames) == 20
+    assert pipeline.dropped["slow"] > 0
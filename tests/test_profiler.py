@@ -0,0 +1,42 @@
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import yaml
+
+from mitm.replay import FakeStick
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+def test_sigusr1_with_profiling_disabled_keeps_running(tmp_path):
+    stick = FakeStick()
+    try:
+        config = {
+            "serial": {"device": stick.path, "reader": "bulk"},
+            "ch": {"max": 60, "idle": 10, "ramp_step": 2, "ramp_interval": 30},
+            "mqtt": {"host": "localhost"},
+            "logging": {"async": False},
+            "profile": {"enabled": False},
+        }
+        path = tmp_path / "config.yaml"
+        path.write_text(yaml.safe_dump(config))
+        env = dict(os.environ, MITM_CONFIG=str(path), PYTHONPATH=ROOT)
+        proc = subprocess.Popen([sys.executable, "-m", "mitm.main"], env=env, cwd=ROOT,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        try:
+            time.sleep(1.0)
+            proc.send_signal(signal.SIGUSR1)
+            time.sleep(0.5)
+            assert proc.poll() is None
+            proc.send_signal(signal.SIGTERM)
+            assert proc.wait(10) == 0
+            assert b"profiling is disabled" in proc.stderr.read()
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+            proc.stderr.close()
+    finally:
+        stick.close()
@@ -0,0 +1,73 @@
+import pytest
+
+from mitm import publisher
+from mitm.publisher import ChangePublisher
+from mitm.ramses import parse_frame
+
+FRAME = parse_frame(b"050  I --- 10:061315 --:------ 10:061315 3200 002 1D4C")
+TOPIC = "evohome/mitm/10_061315/3200/"
+
+
+class Client:
+    def __init__(self):
+        self.published = []
+
+    def publish(self, topic, payload, retain=False):
+        self.published.append((topic, payload, retain))
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(publisher.time, "monotonic", lambda: now[0])
+    return now
+
+
+def _publisher(**kw):
+    client = Client()
+    return ChangePublisher(client, **kw), client
+
+
+def test_first_value_is_published_retained(clock):
+    pub, client = _publisher()
+    pub.handle(FRAME, {"meaning": "Boiler output", "supply_c": 75.0})
+    assert client.published == [(TOPIC + "supply_c", "75.0", True)]
+
+
+def test_deadband_suppresses_small_changes(clock):
+    pub, client = _publisher(deadband=0.5, deadbands={"percent": 2.0})
+    pub.handle(FRAME, {"supply_c": 75.0, "percent": 50.0})
+    pub.handle(FRAME, {"supply_c": 75.4, "percent": 51.5})
+    assert len(client.published) == 2
+    assert pub.suppressed == 2
+    pub.handle(FRAME, {"supply_c": 75.6, "percent": 51.9})
+    assert client.published[2:] == [(TOPIC + "supply_c", "75.6", True)]
+
+
+def test_non_numbers_publish_on_any_change(clock):
+    pub, client = _publisher(deadband=10.0)
+    pub.handle(FRAME, {"active": False, "mode": "auto"})
+    pub.handle(FRAME, {"active": True, "mode": "auto"})
+    assert [t for t, _, _ in client.published] == [TOPIC + "active", TOPIC + "mode", TOPIC + "active"]
+
+
+def test_max_interval_republishes_unchanged_value(clock):
+    pub, client = _publisher(max_interval=300)
+    decoded = {"supply_c": 75.0}
+    pub.handle(FRAME, decoded)
+    clock[0] += 299
+    pub.handle(FRAME, decoded)
+    assert len(client.published) == 1
+    clock[0] += 2
+    pub.handle(FRAME, decoded)
+    assert len(client.published) == 2
+
+
+def test_skipped_and_selected_fields(clock):
+    pub, client = _publisher(fields=["supply_c"], retain=False)
+    pub.handle(FRAME, {"meaning": "x", "payload": "1D4C", "supply_c": 75.0, "return_c": 60.0})
+    assert client.published == [(TOPIC + "supply_c", "75.0", False)]
+    pub.handle(FRAME, {"decode_error": "payload_too_short"})
+    pub.handle(FRAME, None)
+    assert len(client.published) == 1
+    assert pub.stats() == {"sent": 1, "suppressed": 0, "topics": 1}
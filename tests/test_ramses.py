@@ -0,0 +1,65 @@
+import pytest
+
+from mitm.ramses import RamsesFrame, parse_frame, patch_ch_value
+
+LINE = b"045  I --- 01:123456 --:------ 01:123456 1F09 003 FF0546"
+
+
+def test_canonical_fields():
+    frame = parse_frame(LINE)
+    assert frame.raw is LINE
+    assert (frame.rssi, frame.verb, frame.src, frame.dst, frame.via) == (45, "I", "01:123456", "--:------", "01:123456")
+    assert (frame.code, frame.len, frame.payload) == ("1F09", 3, "FF0546")
+
+
+def test_length_is_decimal():
+    frame = parse_frame(b"073 RP --- 10:061315 01:123456 --:------ 3E70 022 " + b"00" * 22)
+    assert frame.len == 22
+
+
+@pytest.mark.parametrize("raw", [
+    b"45 I --- 01:123456 --:------ 01:123456 1f09 003 ff0546",
+    b"045  i  ---  01:123456 --:------ 01:123456 1F09 003 FF0546  ",
+    "045  I --- 01:123456 --:------ 01:123456 1F09 003 FF0546",
+])
+def test_non_canonical_lines_are_normalised(raw):
+    frame = parse_frame(raw)
+    assert frame.text == LINE.decode()
+    assert frame.code == "1F09"
+
+
+@pytest.mark.parametrize("raw", [
+    b"",
+    b"# evofw3 0.7.1",
+    b"!V",
+    b"045  I --- 01:123456 --:------ 01:123456 1F09 003",
+    b"045  X --- 01:123456 --:------ 01:123456 1F09 003 FF0546",
+    b"045  I --- 01:12345 --:------ 01:123456 1F09 003 FF0546",
+    b"045  I --- 01:123456 --:------ 01:123456 1F09 003 FF05ZZ",
+    b"1000  I --- 01:123456 --:------ 01:123456 1F09 003 FF0546",
+])
+def test_invalid_lines(raw):
+    assert parse_frame(raw) is None
+
+
+def test_unparsed():
+    frame = RamsesFrame.unparsed(b"garbage")
+    assert frame.code is None and frame.len is None and frame.payload == ""
+    assert frame.text == "garbage"
+
+
+def test_ch_value_rewrite():
+    frame = parse_frame(LINE)
+    assert frame.is_ch_setpoint()
+    assert frame.get_ch_value() == 135.0
+    new = frame.with_new_ch(55.0)
+    assert new.get_ch_value() == 55.0
+    assert new.raw == LINE[:-4] + b"0226\r\n"
+    # oorspronkelijk frame ongewijzigd
+    assert frame.get_ch_value() == 135.0
+
+
+def test_patch_ch_value_in_place():
+    buf = bytearray(LINE)
+    patch_ch_value(buf, 40.5)
+    assert bytes(buf) == LINE[:-4] + b"0195"
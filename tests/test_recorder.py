@@ -0,0 +1,91 @@
+import glob
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import yaml
+
+from mitm.ramses import parse_frame
+from mitm.recorder import RECORD_SIZE, SUFFIX, Recorder, pack_address, read_records, unpack_address
+from mitm.replay import FakeStick
+
+LINE = b"045  I --- 01:123456 --:------ 01:123456 1F09 003 FF0546"
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+def _records(directory):
+    out = []
+    for path in sorted(glob.glob(os.path.join(directory, "*" + SUFFIX))):
+        out += list(read_records(path))
+    return out
+
+
+def test_address_round_trip():
+    for addr in ("10:061315", "01:123456", "--:------"):
+        assert unpack_address(pack_address(addr)) == addr
+
+
+def test_write_flush_read(tmp_path):
+    rec = Recorder(str(tmp_path), flush_interval=3600, clock=lambda: 1000.0)
+    rec.write(parse_frame(LINE))
+    assert _records(tmp_path) == []
+    rec.close()
+    assert _records(tmp_path) == [
+        (1000.0, 45, "I", "01:123456", "--:------", "01:123456", "1F09", bytes.fromhex("FF0546")),
+    ]
+
+
+def test_rssi_above_255_does_not_leave_a_blank_record(tmp_path):
+    rec = Recorder(str(tmp_path), flush_interval=3600, clock=lambda: 1000.0)
+    rec.write(parse_frame(b"999" + LINE[3:]))
+    rec.write(parse_frame(LINE))
+    rec.close()
+    records = _records(tmp_path)
+    assert [(r[1], r[6], r[3]) for r in records] == [(255, "1F09", "01:123456"), (45, "1F09", "01:123456")]
+    path = glob.glob(os.path.join(tmp_path, "*" + SUFFIX))[0]
+    assert os.path.getsize(path) == 3 * RECORD_SIZE
+
+
+def test_flush_thread_writes_without_new_frames(tmp_path):
+    rec = Recorder(str(tmp_path), flush_interval=0.05)
+    rec.start()
+    try:
+        rec.write(parse_frame(LINE))
+        deadline = time.monotonic() + 2
+        while not _records(tmp_path) and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert len(_records(tmp_path)) == 1
+    finally:
+        rec.close()
+
+
+def test_sigterm_flushes_recorder(tmp_path):
+    stick = FakeStick()
+    try:
+        config = {
+            "serial": {"device": stick.path, "reader": "bulk"},
+            "ch": {"max": 60, "idle": 10, "ramp_step": 2, "ramp_interval": 30},
+            "mqtt": {"host": "localhost"},
+            "logging": {"async": False},
+            "recorder": {"enabled": True, "directory": str(tmp_path / "capture"), "flush_interval": 3600},
+        }
+        path = tmp_path / "config.yaml"
+        path.write_text(yaml.safe_dump(config))
+        env = dict(os.environ, MITM_CONFIG=str(path), PYTHONPATH=ROOT)
+        proc = subprocess.Popen([sys.executable, "-m", "mitm.main"], env=env, cwd=ROOT,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        try:
+            time.sleep(1.0)
+            os.write(stick.master, LINE + b"\r\n")
+            time.sleep(0.5)
+            proc.send_signal(signal.SIGTERM)
+            assert proc.wait(10) == 0, proc.stderr.read().decode()
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+            proc.stderr.close()
+        assert [r[6] for r in _records(tmp_path / "capture")] == ["1F09"]
+    finally:
+        stick.close()
@@ -0,0 +1,53 @@
+import os
+
+import pytest
+
+from mitm.metrics import Metrics
+from mitm.replay import FakeStick
+from mitm.serial_if import SerialInterface
+
+LINES = [
+    b"045  I --- 01:123456 --:------ 01:123456 1F09 003 FF0546",
+    b"073  I --- 10:061315 --:------ 10:061315 3200 004 1D4C1770",
+]
+
+
+@pytest.fixture
+def stick():
+    stick = FakeStick()
+    yield stick
+    stick.close()
+
+
+def _read(serial, count):
+    frames = []
+    for _ in range(20):
+        frames += serial.read_frames(timeout=0.2)
+        if len(frames) >= count:
+            break
+    return frames
+
+
+@pytest.mark.parametrize("reader", ["line", "bulk"])
+def test_reads_frames_and_records_serial_read(stick, reader):
+    metrics = Metrics()
+    serial = SerialInterface(stick.path, 115200, reader, metrics)
+    os.write(stick.master, b"\r\n".join(LINES) + b"\r\n")
+    assert _read(serial, len(LINES)) == LINES
+    assert metrics.stages["serial_read"].count >= 1
+
+
+@pytest.mark.parametrize("reader", ["line", "bulk"])
+def test_no_metrics_by_default(stick, reader):
+    serial = SerialInterface(stick.path, 115200, reader)
+    os.write(stick.master, LINES[0] + b"\r\n")
+    assert _read(serial, 1) == LINES[:1]
+    assert serial.metrics is None
+
+
+def test_feed_splits_partial_lines():
+    serial = SerialInterface.__new__(SerialInterface)
+    serial._buf = bytearray()
+    assert serial.feed(LINES[0][:20]) == []
+    assert serial.feed(LINES[0][20:] + b"\r\n\r\n" + LINES[1][:5]) == [LINES[0]]
+    assert serial.feed(LINES[1][5:] + b"\n") == [LINES[1]]
@@ -0,0 +1,45 @@
+import random
+
+import pytest
+
+from mitm import decoder, sinks
+from mitm.messages import DecodeError, Message
+from mitm.synth import Mix
+
+
+def _payloads(code, rnd, mix):
+    entry = decoder.layouts(code)
+    sizes = {rnd.randrange(1, 12) for _ in range(4)}
+    if entry is not None:
+        sizes |= {lay.size for lay in entry[1]}
+    for size in sorted(sizes):
+        # randgevallen: N/A-markers (7FFF/FF) en nullen, dan willekeurig
+        yield b"\x7f\xff" * (size // 2) + b"\xff" * (size % 2)
+        yield b"\xff" * size
+        yield b"\x00" * size
+        for _ in range(50):
+            yield rnd.randbytes(size)
+    for _ in range(50):
+        yield mix.payload(code)
+
+
+@pytest.mark.parametrize("code", decoder.codes())
+def test_compiled_format_matches_mapping_format(code):
+    rnd = random.Random(code)
+    mix = Mix(seed=1)
+    classes = set()
+    for data in _payloads(code, rnd, mix):
+        d = decoder._decode(code, data.hex().upper())
+        if not isinstance(d, Message) or d.__class__ is DecodeError:
+            continue
+        classes.add(d.__class__)
+        expected = sinks._format_mapping(d.as_dict())
+        assert sinks._compile_format(d.__class__)(d) == expected, (code, data.hex())
+        assert sinks._format_decoded(d) == expected
+    assert classes, f"no message decoded for {code}"
+
+
+def test_decode_error_uses_mapping_format():
+    d = decoder._decode("3200", "00")
+    assert d.__class__ is DecodeError
+    assert sinks._format_decoded(d) == sinks._format_mapping(d.as_dict())
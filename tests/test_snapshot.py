@@ -0,0 +1,136 @@
+import os
+import signal
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+
+import yaml
+
+from mitm.context import Context
+from mitm.limiter import CHLimiter
+from mitm.replay import FakeStick
+from mitm.snapshot import FILE_HEADER, SLOT_HEADER, SnapshotFile, WarmState
+from mitm.state import StateStore
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+CH = SimpleNamespace(ch_max=60, ramp_step=2, ramp_interval=30)
+
+
+def _limiter():
+    return CHLimiter(CH, Context(), SimpleNamespace(compute=lambda t: None))
+
+
+def _warm(path, slot_size=64 * 1024, devices=0):
+    warm = WarmState(str(path), slot_size=slot_size)
+    warm.limiters = {"main": _limiter()}
+    warm.contexts = {"evohome/context": Context()}
+    warm.state = StateStore()
+    for i in range(devices):
+        warm.state.update(f"04:{i:06d}", "30C9", {"temperature": 20.0 + i / 100, "zone_idx": f"{i:02X}"}, now=1000.0 + i)
+    return warm
+
+
+def test_write_read_round_trip(tmp_path):
+    snap = SnapshotFile(str(tmp_path / "s.bin"), 4096)
+    assert snap.read() is None
+    snap.write({"a": 1}, now=10.0)
+    snap.write({"a": 2}, now=20.0)
+    assert snap.read() == (20.0, {"a": 2})
+    snap.close()
+    assert SnapshotFile(str(tmp_path / "s.bin"), 4096).read() == (20.0, {"a": 2})
+
+
+def test_corrupt_newest_slot_falls_back_to_other_slot(tmp_path):
+    path = str(tmp_path / "s.bin")
+    snap = SnapshotFile(path, 4096)
+    snap.write({"a": 1}, now=10.0)
+    snap.write({"a": 2}, now=20.0)
+    snap.close()
+    # seq 2 staat in slot 0: payload beschadigen
+    offset = FILE_HEADER.size + SLOT_HEADER.size
+    with open(path, "r+b") as f:
+        f.seek(offset)
+        f.write(b"X")
+    assert SnapshotFile(path, 4096).read() == (10.0, {"a": 1})
+
+
+def test_other_slot_size_starts_cold(tmp_path):
+    path = str(tmp_path / "s.bin")
+    SnapshotFile(path, 4096).write({"a": 1})
+    assert SnapshotFile(path, 8192).read() is None
+
+
+def test_restore_limiter_context_and_state(tmp_path):
+    warm = _warm(tmp_path / "s.bin", devices=3)
+    warm.limiters["main"].last_value = 45.0
+    warm.limiters["main"].last_time = 123.0
+    warm.contexts["evohome/context"].set("outdoor_temperature", 7.5)
+    warm.save()
+    warm.file.close()
+
+    again = _warm(tmp_path / "s.bin")
+    counts = again.restore()
+    assert counts == {"limiters": 1, "signals": 1, "devices": 3}
+    assert again.limiters["main"].last_value == 45.0
+    assert again.contexts["evohome/context"].get_outdoor_temperature() == 7.5
+    assert again.state.get("04:000002", "30C9").get("temperature") == 20.02
+
+
+def test_stale_limiter_not_restored(tmp_path):
+    warm = _warm(tmp_path / "s.bin")
+    warm.limiters["main"].last_value = 45.0
+    warm.save()
+    again = _warm(tmp_path / "s.bin")
+    assert again.restore(now=time.time() + 3600)["limiters"] == 0
+    assert again.limiters["main"].last_value is None
+
+
+def test_oversized_state_is_trimmed_not_dropped(tmp_path):
+    warm = _warm(tmp_path / "s.bin", slot_size=4096, devices=200)
+    warm.limiters["main"].last_value = 45.0
+    warm.contexts["evohome/context"].set("outdoor_temperature", 7.5)
+    warm.save()
+    assert warm.file.writes == 1
+    assert 0 < warm.trimmed < 200
+
+    again = _warm(tmp_path / "s.bin", slot_size=4096)
+    counts = again.restore()
+    assert counts["limiters"] == 1 and counts["signals"] == 1
+    assert counts["devices"] == 200 - warm.trimmed
+    # de meest recent bijgewerkte apparaten blijven bewaard
+    assert again.state.get("04:000199", "30C9") is not None
+    assert again.state.get("04:000000", "30C9") is None
+
+
+def test_sigterm_writes_final_snapshot(tmp_path):
+    stick = FakeStick()
+    try:
+        config = {
+            "serial": {"device": stick.path, "reader": "bulk"},
+            "ch": {"max": 60, "idle": 10, "ramp_step": 2, "ramp_interval": 30},
+            "mqtt": {"host": "localhost"},
+            "logging": {"async": False},
+            "state": {"enabled": True},
+            "snapshot": {"enabled": True, "path": str(tmp_path / "s.bin"), "interval": 3600},
+        }
+        path = tmp_path / "config.yaml"
+        path.write_text(yaml.safe_dump(config))
+        env = dict(os.environ, MITM_CONFIG=str(path), PYTHONPATH=ROOT)
+        proc = subprocess.Popen([sys.executable, "-m", "mitm.main"], env=env, cwd=ROOT,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        try:
+            time.sleep(1.0)
+            os.write(stick.master, b"045  I --- 04:123456 --:------ 04:123456 30C9 003 0007D0\r\n")
+            time.sleep(0.5)
+            proc.send_signal(signal.SIGTERM)
+            assert proc.wait(10) == 0, proc.stderr.read().decode()
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+            proc.stderr.close()
+        found = SnapshotFile(str(tmp_path / "s.bin")).read()
+        assert found is not None
+        assert [rec[:2] for rec in found[1]["state"]] == [["04:123456", "30C9"]]
+    finally:
+        stick.close()
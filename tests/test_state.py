@@ -0,0 +1,60 @@
+from mitm.ramses import RamsesFrame, parse_frame
+from mitm.state import StateStore
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_update_counts_and_keeps_first_seen():
+    clock = Clock()
+    store = StateStore(clock)
+    store.update("10:061315", "3200", {"supply_c": 75.0})
+    clock.now += 10
+    rec = store.update("10:061315", "3200", {"supply_c": 76.0})
+    assert (rec.count, rec.first_seen, rec.updated) == (2, 1000.0, 1010.0)
+    assert rec.get("supply_c") == 76.0
+    assert store.get("10:061315", "3200") is rec
+    assert len(store) == 1
+
+
+def test_decode_errors_and_unknown_codes_keep_last_good_values():
+    store = StateStore(Clock())
+    store.update("10:061315", "3200", {"supply_c": 75.0})
+    store.update("10:061315", "3200", {"decode_error": "payload_too_short"})
+    store.update("10:061315", "3200", None)
+    rec = store.get("10:061315", "3200")
+    assert rec.count == 3 and rec.get("supply_c") == 75.0
+    unknown = store.update("10:061315", "FFFF", None)
+    assert unknown.values is None and unknown.get("x", "n/a") == "n/a"
+
+
+def test_latest_across_devices_and_staleness():
+    clock = Clock()
+    store = StateStore(clock)
+    store.update("04:000001", "30C9", {"temperature": 20.0})
+    clock.now += 5
+    store.update("04:000002", "30C9", {"temperature": 21.0})
+    assert store.latest("30C9").src == "04:000002"
+    assert store.latest_value("30C9", "temperature") == 21.0
+    clock.now += 100
+    assert store.latest_value("30C9", "temperature", max_age=60) is None
+    assert store.latest_value("30C9", "temperature", max_age=200) == 21.0
+    assert store.latest("1F09") is None and store.latest_value("1F09", "setpoint_c") is None
+
+
+def test_snapshot_devices_and_sink_interface():
+    store = StateStore(Clock())
+    store.handle(parse_frame(b"045  I --- 01:123456 --:------ 01:123456 1F09 003 FF0546"), {"setpoint_c": 13.5})
+    # regels zonder code (banner, ruis) komen niet in de tabel
+    store.handle(RamsesFrame.unparsed(b"# evofw3 0.7.1"), None)
+    store.update("04:000001", "30C9", {"temperature": 20.0})
+    snap = store.snapshot()
+    store.update("04:000002", "30C9", {"temperature": 21.0})
+    assert len(snap) == 2 and len(list(store)) == 3
+    assert store.devices() == ["01:123456", "04:000001", "04:000002"]
+
@@ -0,0 +1,104 @@
+import os
+import time
+
+import pytest
+
+from mitm.sticks import Stick, StickSet
+
+LINE = b"045  I --- 04:111111 --:------ 04:111111 30C9 003 0007D0"
+
+
+def _rssi(rssi):
+    return b"%03d" % rssi + LINE[3:]
+
+
+class FakeSerial:
+    """Bulk reader stand-in: a pipe makes the fd readable for the selector."""
+
+    reader = "bulk"
+
+    def __init__(self):
+        self._fd, self._w = os.pipe()
+        self.pending = []
+        self.error = None
+
+    def feed(self, *lines):
+        self.pending.extend(lines)
+        os.write(self._w, b"x")
+
+    def read_available(self):
+        os.read(self._fd, 4096)
+        if self.error is not None:
+            raise self.error
+        out, self.pending = self.pending, []
+        return out
+
+    def close(self):
+        os.close(self._fd)
+        os.close(self._w)
+
+
+class Forwarder:
+    def __init__(self):
+        self.lines = []
+
+    def handle(self, raw, t_read):
+        self.lines.append(raw)
+
+
+@pytest.fixture
+def pair():
+    a, b = FakeSerial(), FakeSerial()
+    fa, fb = Forwarder(), Forwarder()
+    yield StickSet([Stick("a", a, fa), Stick("b", b, fb)], dedup_window=0.1), a, b, fa, fb
+    a.close()
+    b.close()
+
+
+def test_same_frame_on_two_sticks_within_window_passes_once(pair):
+    sticks, a, b, fa, fb = pair
+    a.feed(_rssi(45))
+    b.feed(_rssi(70))
+    out = sticks.read_frames(0.1)
+    assert len(out) == 1
+    stats = sticks.stats()
+    assert stats["a"]["frames"] + stats["b"]["frames"] == 1
+    assert stats["a"]["duplicates"] + stats["b"]["duplicates"] == 1
+    # alleen de stick die het frame doorliet stuurt het door
+    assert len(fa.lines) + len(fb.lines) == 1
+
+
+def test_same_frame_outside_window_passes_again(pair):
+    sticks, a, b, fa, fb = pair
+    a.feed(_rssi(45))
+    assert len(sticks.read_frames(0.1)) == 1
+    time.sleep(0.15)
+    b.feed(_rssi(70))
+    assert sticks.read_frames(0.1) == [_rssi(70)]
+    assert fb.lines == [_rssi(70)]
+    assert sticks.stats()["b"]["duplicates"] == 0
+
+
+def test_repeats_on_the_same_stick_pass(pair):
+    sticks, a, b, fa, fb = pair
+    a.feed(_rssi(45), _rssi(46))
+    assert sticks.read_frames(0.1) == [_rssi(45), _rssi(46)]
+
+
+def test_failed_stick_is_removed_others_continue(pair):
+    sticks, a, b, fa, fb = pair
+    a.error = OSError("unplugged")
+    a.feed(_rssi(45))
+    assert sticks.read_frames(0.1) == []
+    b.feed(_rssi(70))
+    assert sticks.read_frames(0.1) == [_rssi(70)]
+
+
+def test_line_reader_is_rejected():
+    serial_if = FakeSerial()
+    serial_if.reader = "line"
+    try:
+        with pytest.raises(ValueError):
+            StickSet([Stick("a", serial_if)])
+    finally:
+        serial_if.close()